@@ -1 +1 @@
-from .core import HSDSClient, Statistics, TimeRange
+from .core import HSDSClient, Statistics, TimeRange, QueryCancelledError
@@ -0,0 +1,148 @@
+import os
+import json
+import sqlite3
+import threading
+
+import numpy as np
+
+from hsds_client.config import CONFIG_PATH
+
+CATALOG_PATH = os.path.join(os.path.dirname(CONFIG_PATH), "catalog.db")
+CATALOG_VERSION = 2
+
+_DROP = """
+DROP TABLE IF EXISTS domains;
+DROP TABLE IF EXISTS signals;
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS domains (
+    endpoint      TEXT NOT NULL,
+    domain        TEXT NOT NULL,
+    last_modified REAL,
+    frequency     REAL,
+    trigger_time  TEXT,
+    t_min         REAL,
+    t_max         REAL,
+    PRIMARY KEY (endpoint, domain)
+);
+CREATE TABLE IF NOT EXISTS signals (
+    endpoint   TEXT NOT NULL,
+    domain     TEXT NOT NULL,
+    path       TEXT NOT NULL,
+    attributes TEXT,
+    PRIMARY KEY (endpoint, domain, path)
+);
+CREATE INDEX IF NOT EXISTS signals_by_path ON signals (endpoint, path);
+"""
+
+
+def _to_json_value(val):
+    if isinstance(val, np.ndarray):
+        return _to_json_value(val.tolist())
+    elif isinstance(val, (list, tuple)):
+        return [_to_json_value(x) for x in val]
+    elif isinstance(val, (bytes, np.bytes_)):
+        try:
+            return val.decode('utf-8')
+        except Exception:
+            return str(val)
+    elif isinstance(val, np.generic):
+        return val.item()
+    return val
+
+
+class TraceCatalog:
+    """
+    本地 trace 元数据缓存（SQLite，默认位于 ~/.hscli/catalog.db）。
+    以 endpoint + domain 为键，记录 lastModified、采样频率、触发时间、时间范围
+    以及每个信号的属性；domain 的 lastModified 不变时无需再访问服务器。
+    """
+
+    def __init__(self, path=CATALOG_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != CATALOG_VERSION:
+                # 缓存格式变化时直接重建，数据会在下次同步时重新读取
+                self._conn.executescript(_DROP)
+                self._conn.execute(f"PRAGMA user_version = {CATALOG_VERSION}")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def last_modified(self, endpoint):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT domain, last_modified FROM domains WHERE endpoint = ?", (endpoint,)
+            ).fetchall()
+        return {domain: lm for domain, lm in rows}
+
+    def update_domain(self, endpoint, domain, last_modified, time_info, signals):
+        """
+        time_info: {"frequency", "trigger_time", "t_min", "t_max"} 或 None
+        signals:   {signal_path: [(attr_name, attr_type, attr_value), ...]}
+        """
+        time_info = time_info or {}
+        frequency = time_info.get("frequency")
+        row = (endpoint, domain, last_modified,
+               float(frequency) if frequency is not None else None,
+               time_info.get("trigger_time"), time_info.get("t_min"), time_info.get("t_max"))
+        signal_rows = [
+            (endpoint, domain, path,
+             json.dumps([[name, attr_type, _to_json_value(value)] for name, attr_type, value in attrs]))
+            for path, attrs in signals.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM signals WHERE endpoint = ? AND domain = ?", (endpoint, domain))
+            self._conn.execute("INSERT OR REPLACE INTO domains VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            self._conn.executemany("INSERT INTO signals VALUES (?, ?, ?, ?)", signal_rows)
+
+    def remove_domains(self, endpoint, domains):
+        params = [(endpoint, d) for d in domains]
+        if not params:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM signals WHERE endpoint = ? AND domain = ?", params)
+            self._conn.executemany("DELETE FROM domains WHERE endpoint = ? AND domain = ?", params)
+
+    def domains_with_signal(self, endpoint, signal_path):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT domain FROM signals WHERE endpoint = ? AND path = ? ORDER BY domain",
+                (endpoint, signal_path)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def signal_paths(self, endpoint):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT path FROM signals WHERE endpoint = ? ORDER BY path", (endpoint,)
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def signal_attributes(self, endpoint, domain, signal_path):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attributes FROM signals WHERE endpoint = ? AND domain = ? AND path = ?",
+                (endpoint, domain, signal_path)
+            ).fetchone()
+        if row is None:
+            return None
+        return [tuple(item) for item in json.loads(row[0])]
+
+    def time_info(self, endpoint, domain):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT frequency, trigger_time, t_min, t_max FROM domains "
+                "WHERE endpoint = ? AND domain = ?", (endpoint, domain)
+            ).fetchone()
+        if row is None or row[1] is None:
+            return None
+        frequency, trigger_time, t_min, t_max = row
+        return {"frequency": frequency, "trigger_time": trigger_time, "t_min": t_min, "t_max": t_max}
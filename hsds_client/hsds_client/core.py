@@ -1,12 +1,17 @@
 
 import os
-import subprocess
+import time
+import bisect
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 import requests
-import h5pyd
 import numpy as np
 import base64
 
+from hsds_client.catalog import TraceCatalog, CATALOG_PATH
+from hsds_client.handles import DomainHandleCache, DEFAULT_HANDLE_CACHE_SIZE, DEFAULT_HANDLE_TTL
+from hsds_client.stats import StreamingStatistics
+
 # ===================== GLOBAL CONST =====================
 DOMAIN_PREFIX = "/home/admin/"        
 ADMIN_USERNAME = "admin"               
@@ -15,6 +20,14 @@ TIME_SIGNAL_NAME = "@Time@"
 SAMPLE_FREQUENCY_ATTR = "sampleFrequency"
 TRIGGER_TIME_ATTR = "triggerTimeSystemText"
 DEFAULT_SAMPLE_FREQUENCY = 4000       
+CATALOG_REFRESH_INTERVAL = 5          # 秒，间隔内的查询复用上次的元数据同步结果
+DOMAIN_PAGE_SIZE = 500               # GET /domains 每页返回的 domain 数
+DOMAIN_OBJECTS_LIMIT = 10000          # getobjs 一次最多返回的对象数（服务器另有上限）
+HTTP_TIMEOUT = 30                     # 秒
+DEFAULT_MAX_WORKERS = 8               # 多文件查询的并发数
+CANCEL_POLL_INTERVAL = 0.1            # 秒，检查取消请求的间隔
+DEFAULT_BLOCK_ROWS = 65536            # 数据集无分块信息时流式读取的块大小（行）
+TIME_SEARCH_WINDOW = 256              # 时间索引查找时一次读取的 @Time@ 样本数
 GLOBAL_ENDPOINT = None
 
 
@@ -41,6 +54,15 @@ class Attributes:
         cleaned = self._clean_value(self.value)
         return f"{self.name:<20}: {cleaned}"
 
+class DomainRecord:
+    def __init__(self, name, size, last_modified):
+        self.name = name
+        self.size = size
+        self.last_modified = last_modified
+
+    def __repr__(self):
+        return f"{self.name} ({self.size} bytes, lastModified={self.last_modified})"
+
 class SignalInfo:
     def __init__(self, relative_path, attributes):
         self.relative_path = relative_path
@@ -85,16 +107,30 @@ class FrequencyInfo:
     def __repr__(self):
         return f"file={self.file_name}, frequency={self.frequency}, time_range={self.time_range}"
 
+class QueryCancelledError(Exception):
+    pass
+
 class Statistics:
-    def __init__(self, mean, max_val, min_val, three_sigma):
+    def __init__(self, mean, max_val, min_val, three_sigma, percentiles=None):
         self.mean = mean
         self.max = max_val
         self.min = min_val
         self.three_sigma = three_sigma
+        self.percentiles = percentiles or {}
+
+    @classmethod
+    def from_accumulator(cls, acc: StreamingStatistics, percentiles=None):
+        if acc.count == 0:
+            return cls(0, 0, 0, 0)
+        pct = {q: acc.percentile(q) for q in percentiles} if percentiles else None
+        return cls(acc.mean, acc.max, acc.min, 3 * acc.std, pct)
 
     def __repr__(self):
-        return (f"Statistics(mean={self.mean}, max={self.max}, "
-                f"min={self.min}, three_sigma={self.three_sigma})")
+        text = (f"Statistics(mean={self.mean}, max={self.max}, "
+                f"min={self.min}, three_sigma={self.three_sigma}")
+        if self.percentiles:
+            text += ", percentiles=" + ", ".join(f"p{q}={v}" for q, v in self.percentiles.items())
+        return text + ")"
 
 # ===================== 帮助函数 =====================
 
@@ -114,56 +150,204 @@ def merge_time_intervals(intervals):
             merged.append((current_start, current_end))
     return merged
 
+def _dtype_from_base(base):
+    """HDF5 预定义类型名（如 H5T_STD_I64LE、H5T_IEEE_F32BE）对应的 numpy dtype"""
+    order = ">" if base.endswith("BE") else "<"
+    if base.startswith("H5T_STD_"):
+        kind = "i" if base[8] == "I" else "u"
+        return np.dtype(f"{order}{kind}{int(base[9:-2]) // 8}")
+    if base.startswith("H5T_IEEE_F"):
+        return np.dtype(f"{order}f{int(base[10:-2]) // 8}")
+    return None
+
+def attribute_from_json(item):
+    """
+    把 REST 接口返回的属性 JSON 转为 (name, type_name, value)，
+    类型名与通过 h5pyd 读取时一致（int64、float64、str、ndarray ...）
+    """
+    value = item.get("value")
+    type_json = item.get("type", {})
+    is_scalar = item.get("shape", {}).get("class") == "H5S_SCALAR"
+    dtype = None
+    if isinstance(type_json, dict) and type_json.get("class") in ("H5T_INTEGER", "H5T_FLOAT"):
+        dtype = _dtype_from_base(type_json.get("base", ""))
+    if value is None or (type_json.get("class") == "H5T_STRING" and is_scalar):
+        pass
+    elif is_scalar and dtype is not None:
+        value = dtype.type(value)
+    elif not is_scalar:
+        value = np.asarray(value, dtype=dtype)
+    return item["name"], type(value).__name__, value
+
+def find_time_index(time_dset, t, side="left", frequency=None):
+    """
+    在单调递增的 @Time@ 数据集中查找 t 的插入位置，语义与 np.searchsorted 相同，
+    但只读取少量样本：先按采样频率估算位置并读取一个小窗口验证，
+    未命中时在服务端做二分查找。时间轴不单调时返回 None，由调用方回退到全量读取。
+    """
+    n = time_dset.shape[0]
+    if n == 0:
+        return 0
+    lo, hi = 0, n
+    if frequency:
+        t0 = float(time_dset[0])
+        est = int(round((t - t0) * float(frequency)))
+        est = min(max(est, 0), n)
+        w_lo = max(min(est - TIME_SEARCH_WINDOW // 2, n - TIME_SEARCH_WINDOW), 0)
+        w_hi = min(w_lo + TIME_SEARCH_WINDOW, n)
+        window = np.asarray(time_dset[w_lo:w_hi]).ravel()
+        if np.any(np.diff(window) < 0):
+            return None
+        pos = int(np.searchsorted(window, t, side=side))
+        if 0 < pos < len(window) or (pos == 0 and w_lo == 0) or (pos == len(window) and w_hi == n):
+            return w_lo + pos
+        # 估算偏离，用窗口结果收窄二分范围
+        if pos == 0:
+            hi = w_lo
+        else:
+            lo = w_hi
+
+    while hi - lo > TIME_SEARCH_WINDOW:
+        mid = (lo + hi) // 2
+        value = float(time_dset[mid])
+        if value < t or (side == "right" and value == t):
+            lo = mid + 1
+        else:
+            hi = mid
+    window = np.asarray(time_dset[lo:hi]).ravel()
+    if np.any(np.diff(window) < 0):
+        return None
+    return lo + int(np.searchsorted(window, t, side=side))
+
+def block_rows(dset, block_size=None):
+    """流式读取的块大小（行），对齐到数据集在 HSDS 中的分块"""
+    chunks = dset.chunks
+    if isinstance(chunks, tuple) and chunks:
+        chunk_rows = int(chunks[0])
+    else:
+        chunk_rows = DEFAULT_BLOCK_ROWS
+    if not block_size:
+        return chunk_rows
+    return max(1, -(-int(block_size) // chunk_rows)) * chunk_rows
+
+class TimeIntervalIndex:
+    """
+    按起始时间排序的区间索引，用于快速找出与查询时间窗重叠的文件。
+    起点落在 [start - 最长区间, end] 之外的区间不可能重叠，二分即可排除。
+    """
+
+    def __init__(self, intervals):
+        # intervals: [(start, end, key), ...]
+        self._intervals = sorted(intervals, key=lambda x: x[0])
+        self._starts = [iv[0] for iv in self._intervals]
+        self._max_span = max((iv[1] - iv[0] for iv in self._intervals), default=timedelta(0))
+
+    def __len__(self):
+        return len(self._intervals)
+
+    def overlapping(self, start, end):
+        lo = bisect.bisect_left(self._starts, start - self._max_span)
+        hi = bisect.bisect_right(self._starts, end)
+        return [key for iv_start, iv_end, key in self._intervals[lo:hi] if iv_end >= start]
+
 # ===================== HSDS 数据访问客户端 =====================
 
 class HSDSClient:
-    def __init__(self, endpoint):
+    def __init__(self, endpoint, catalog_path=CATALOG_PATH, max_workers=DEFAULT_MAX_WORKERS,
+                 handle_cache_size=DEFAULT_HANDLE_CACHE_SIZE, handle_ttl=DEFAULT_HANDLE_TTL):
         self.endpoint = endpoint
         self.admin_username = ADMIN_USERNAME
         self.admin_password = ADMIN_PASSWORD
+        self.session = requests.Session()
+        self.session.auth = (self.admin_username, self.admin_password)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.catalog = TraceCatalog(catalog_path)
+        self._catalog_refreshed = 0
+        self._handles = DomainHandleCache(self.endpoint, self.admin_username, self.admin_password,
+                                          max_size=handle_cache_size, ttl=handle_ttl)
         global GLOBAL_ENDPOINT
         GLOBAL_ENDPOINT = self.endpoint  
         print("HSDSClient initialized.")
 
-    def traverse_signals(self, domain):
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._handles.clear()
+        self.session.close()
+        self.catalog.close()
+
+    def _fan_out(self, func, items, cancel_event=None):
+        """
+        在线程池中并发执行 func(item)，结果按 items 的顺序返回。
+        cancel_event 被设置后，尚未开始的任务会被取消并抛出 QueryCancelledError。
+        """
+        futures = [self._executor.submit(func, item) for item in items]
+        results = []
+        try:
+            for future in futures:
+                while cancel_event is not None and not future.done():
+                    if cancel_event.is_set():
+                        raise QueryCancelledError()
+                    wait([future], timeout=CANCEL_POLL_INTERVAL)
+                results.append(future.result())
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return results
+
+    @staticmethod
+    def _collect_datasets(f):
         signals = {}
         def visitor(name, obj):
             if hasattr(obj, "shape"):
                 full_path = name if name.startswith("/") else "/" + name
                 signals[full_path] = obj
-        with h5pyd.File(domain, 'r', endpoint=self.endpoint,
-                        username=self.admin_username, password=self.admin_password) as f:
-            f.visititems(visitor)
+        f.visititems(visitor)
         return signals
 
+    def traverse_signals(self, domain):
+        with self._handles.open(domain) as f:
+            return self._collect_datasets(f)
+
+    def list_domains(self, folder=DOMAIN_PREFIX):
+        """
+        通过 GET /domains 分页列出 folder 下的所有 domain（Marker/Limit），
+        返回 DomainRecord 列表，name 为相对 folder 的文件名。
+        """
+        records = []
+        marker = None
+        while True:
+            params = {"domain": folder, "verbose": 1, "Limit": DOMAIN_PAGE_SIZE}
+            if marker:
+                params["Marker"] = marker
+            rsp = self.session.get(self.endpoint + "/domains", params=params, timeout=HTTP_TIMEOUT)
+            rsp.raise_for_status()
+            items = rsp.json().get("domains", [])
+            for item in items:
+                if item.get("class") != "domain":
+                    continue
+                path = item["name"]
+                name = path[len(folder):] if path.startswith(folder) else path
+                records.append(DomainRecord(name=name, size=item.get("total_size"),
+                                            last_modified=item.get("lastModified")))
+            # 服务器可能按自身上限截短每页，只有空页才表示列举结束
+            if not items or items[-1]["name"] == marker:
+                break
+            marker = items[-1]["name"]
+        return records
+
+    def _list_strc_records(self):
+        return [r for r in self.list_domains() if r.name.lower().endswith(".strc")]
+
     def list_all_files_name(self):
         try:
-            result = subprocess.run([
-            "hsls",
-            "-e", self.endpoint,
-            "-u", self.admin_username,
-            "-p", self.admin_password,
-            DOMAIN_PREFIX
-        ],
-                                    capture_output=True, text=True, check=True)
-            output = result.stdout.strip()
-            lines = output.splitlines()
-            strc_files = []
-            for line in lines:
-                if not line.strip():
-                    continue
-                tokens = line.split()
-                if len(tokens) >= 5 and tokens[1].lower() == "domain":
-                    path_token = tokens[-1]
-                    if path_token.startswith(DOMAIN_PREFIX):
-                        fname = path_token[len(DOMAIN_PREFIX):]
-                    else:
-                        fname = path_token
-                    if fname.lower().endswith(".strc"):
-                        strc_files.append(fname)
-            return strc_files
+            return [r.name for r in self._list_strc_records()]
         except Exception as e:
-            print("Error listing folder with hsls:", e)
+            print("Error listing domains:", e)
             return []
 
     def _get_all_domains(self):
@@ -171,60 +355,228 @@ class HSDSClient:
         domains = [DOMAIN_PREFIX + fname for fname in strc_files]
         return domains
 
+    def _get_domain_objects(self, domain, include_attrs=False):
+        """
+        GET /?getobjs=1 一次取回 domain 内所有对象的元数据（含链接，可选含属性）。
+        返回 (root_id, {obj_id: obj_json})；对象数超过服务器限制时第二项为 None。
+        """
+        params = {"domain": domain, "getobjs": 1, "max_objects_limit": DOMAIN_OBJECTS_LIMIT}
+        if include_attrs:
+            params["include_attrs"] = 1
+        rsp = self.session.get(self.endpoint + "/", params=params, timeout=HTTP_TIMEOUT)
+        rsp.raise_for_status()
+        rsp_json = rsp.json()
+        return rsp_json["root"], rsp_json.get("domain_objs")
+
+    @staticmethod
+    def _walk_datasets(root_id, objs):
+        """沿硬链接遍历 getobjs 的结果，返回按路径排序的 {dataset_path: dataset_json}"""
+        datasets = {}
+        visited = set()
+        stack = [("", root_id)]
+        while stack:
+            prefix, group_id = stack.pop()
+            if group_id in visited:
+                continue
+            visited.add(group_id)
+            for title, link in objs.get(group_id, {}).get("links", {}).items():
+                obj_id = link.get("id")
+                if link.get("class") != "H5L_TYPE_HARD" or obj_id not in objs:
+                    continue
+                path = prefix + "/" + title
+                if obj_id.startswith("d-"):
+                    datasets.setdefault(path, objs[obj_id])
+                elif obj_id.startswith("g-"):
+                    stack.append((path, obj_id))
+        return dict(sorted(datasets.items()))
+
+    def _get_domain_signals(self, domain):
+        """
+        返回 (root_id, {dataset_path: dataset_json}, {dataset_path: [(name, type_name, value), ...]})。
+        通常只需一次 getobjs 请求；对象数超过服务器限制时改为逐组遍历加一次 POST_Attributes。
+        """
+        root_id, objs = self._get_domain_objects(domain, include_attrs=True)
+        if objs is None:
+            with self._handles.open(domain) as f:
+                dataset_ids = {path: ds.id.id for path, ds in self._collect_datasets(f).items()}
+            datasets = {path: {"id": obj_id} for path, obj_id in dataset_ids.items()}
+            return root_id, datasets, self._post_attributes(domain, root_id, dataset_ids)
+        datasets = self._walk_datasets(root_id, objs)
+        attributes = {}
+        for path, obj in datasets.items():
+            items = obj.get("attributes", {})
+            attributes[path] = [attribute_from_json(dict(item, name=name)) for name, item in items.items()]
+        return root_id, datasets, attributes
+
+    def get_signal_tree(self, filename):
+        """
+        用一次请求取回文件的信号层级，返回嵌套字典，例如
+        {"AxisTrans1": {"Monitor": {"PosAct": SignalInfo, ...}}}
+        """
+        _, _, attributes = self._get_domain_signals(DOMAIN_PREFIX + filename)
+        tree = {}
+        for path, attrs in attributes.items():
+            node = tree
+            names = path.strip("/").split("/")
+            for name in names[:-1]:
+                node = node.setdefault(name, {})
+            node[names[-1]] = SignalInfo(relative_path=path, attributes=[
+                Attributes(name=name, type=attr_type, value=value) for name, attr_type, value in attrs])
+        return tree
+
+    def _post_attributes(self, domain, root_id, dataset_ids):
+        """一次 POST /groups/<root>/attributes 请求取回 dataset_ids 中所有数据集的属性"""
+        if not dataset_ids:
+            return {}
+        obj_ids = sorted(set(dataset_ids.values()))
+        rsp = self.session.post(f"{self.endpoint}/groups/{root_id}/attributes",
+                                params={"domain": domain, "IncludeData": 1},
+                                json={"obj_ids": obj_ids},
+                                timeout=HTTP_TIMEOUT)
+        rsp.raise_for_status()
+        attributes = rsp.json().get("attributes", {})
+        if isinstance(attributes, list):
+            # 只请求一个对象时服务器直接返回其属性列表
+            attributes = {obj_ids[0]: attributes}
+        return {path: [attribute_from_json(item) for item in attributes.get(obj_id, [])]
+                for path, obj_id in dataset_ids.items()}
+
+    def get_domain_attributes(self, domain):
+        """
+        批量读取 domain 内所有数据集的属性。
+        返回 {dataset_path: [(name, type_name, value), ...]}
+        """
+        _, _, attributes = self._get_domain_signals(domain)
+        return attributes
+
+    def _read_domain_metadata(self, domain):
+        """
+        读取 domain 的信号属性与时间信息，共两次请求（含属性的 getobjs、
+        @Time@ 的服务器端 min/max）。返回 (signals, time_info)，
+        time_info 为 {"frequency", "trigger_time", "t_min", "t_max"} 或 None。
+        """
+        _, datasets, signals = self._get_domain_signals(domain)
+        time_path = "/" + TIME_SIGNAL_NAME
+        if time_path not in signals:
+            return signals, None
+        attrs = {name: value for name, _, value in signals[time_path]}
+        trigger_str = attrs.get(TRIGGER_TIME_ATTR)
+        if not trigger_str:
+            return signals, None
+        if isinstance(trigger_str, bytes):
+            trigger_str = trigger_str.decode('utf-8')
+        rsp = self.session.get(f"{self.endpoint}/datasets/{datasets[time_path]['id']}/value",
+                               params={"domain": domain, "reduce": "count,min,max"},
+                               timeout=HTTP_TIMEOUT)
+        rsp.raise_for_status()
+        result = rsp.json()["reduce"]
+        if not result["count"]:
+            return signals, None
+        time_info = {
+            "frequency": attrs.get(SAMPLE_FREQUENCY_ATTR, DEFAULT_SAMPLE_FREQUENCY),
+            "trigger_time": trigger_str,
+            "t_min": float(result["min"]),
+            "t_max": float(result["max"]),
+        }
+        return signals, time_info
+
     def _has_signal(self, domain, signal_path):
-        with h5pyd.File(domain, 'r', endpoint=self.endpoint,
-                        username=self.admin_username, password=self.admin_password) as f:
+        with self._handles.open(domain) as f:
             return signal_path.lstrip('/') in f
 
+    # ===================== 元数据缓存 =====================
+
+    def refresh_catalog(self, force=False):
+        """
+        同步本地元数据缓存：只重新读取 lastModified 发生变化的 domain，
+        并删除服务器上已不存在的 domain。
+        """
+        if not force and time.time() - self._catalog_refreshed < CATALOG_REFRESH_INTERVAL:
+            return
+        try:
+            records = self._list_strc_records()
+        except Exception as e:
+            print("Error listing domains:", e)
+            return
+        known = self.catalog.last_modified(self.endpoint)
+        current = set()
+        changed = []
+        for record in records:
+            domain = DOMAIN_PREFIX + record.name
+            current.add(domain)
+            if known.get(domain) != record.last_modified:
+                changed.append((domain, record.last_modified))
+        removed = set(known) - current
+        for domain in removed.union(d for d, _ in changed):
+            self._handles.invalidate(domain)
+        self._fan_out(lambda item: self._index_domain(*item), changed)
+        self.catalog.remove_domains(self.endpoint, removed)
+        self._catalog_refreshed = time.time()
+
+    def _index_domain(self, domain, last_modified):
+        try:
+            signals, time_info = self._read_domain_metadata(domain)
+            self.catalog.update_domain(self.endpoint, domain, last_modified, time_info, signals)
+        except Exception as e:
+            print(f"Error indexing domain {domain}: {e}")
+
+    def _domains_with_signal(self, signal_path):
+        self.refresh_catalog()
+        return self.catalog.domains_with_signal(self.endpoint, "/" + signal_path.lstrip('/'))
+
     def list_files_with_signal(self, signal_path):
         print(f"signal {signal_path} exists in files:")
-        for domain in self._get_all_domains():
-            if self._has_signal(domain, signal_path):
-                file_name = domain[len(DOMAIN_PREFIX):]
-                print(f"{file_name}")
+        for domain in self._domains_with_signal(signal_path):
+            file_name = domain[len(DOMAIN_PREFIX):]
+            print(f"{file_name}")
 
     def get_signal_attributes(self, signal_path: str) -> list:
-        for domain in self._get_all_domains():
-            if self._has_signal(domain, signal_path):
-                try:
-                    with h5pyd.File(domain, 'r', endpoint=self.endpoint,
-                                    username=self.admin_username, password=self.admin_password) as f:
-                        if signal_path.lstrip('/') in f:
-                            ds = f[signal_path.lstrip('/')]
-                            attributes_list = []
-                            for key, value in ds.attrs.items():
-                                attr_type = type(value).__name__
-                                attr_obj = Attributes(name=key, type=attr_type, value=value)
-                                attributes_list.append(attr_obj)
-                            return attributes_list
-                except Exception as e:
-                    print(f"Error reading attributes for {signal_path} in domain {domain}: {e}")
+        for domain in self._domains_with_signal(signal_path):
+            attrs = self.catalog.signal_attributes(self.endpoint, domain, "/" + signal_path.lstrip('/'))
+            if attrs is not None:
+                return [Attributes(name=name, type=attr_type, value=value) for name, attr_type, value in attrs]
         return []
 
     def get_signals_in_all_files(self):
-        domains = self._get_all_domains()
-        signal_set = set()
-        for d in domains:
-            ds = self.traverse_signals(d)
-            for path in ds.keys():
-                signal_set.add(path)
-        return sorted(list(signal_set))
+        self.refresh_catalog()
+        return self.catalog.signal_paths(self.endpoint)
+
+    def _domains_by_trigger_time(self, signal_path):
+        domain_infos = []
+        for domain in self._domains_with_signal(signal_path):
+            info = self._get_time_signal_info(domain)
+            if info:
+                domain_infos.append((domain, info))
+        domain_infos.sort(key=lambda item: item[1]["trigger_dt"])
+        return domain_infos
+
+    def _time_index(self, signal_path):
+        intervals = []
+        for domain, info in self._domains_by_trigger_time(signal_path):
+            start_dt = info["trigger_dt"] + timedelta(seconds=info["t_min"])
+            end_dt = info["trigger_dt"] + timedelta(seconds=info["t_max"])
+            intervals.append((start_dt, end_dt, domain))
+        return TimeIntervalIndex(intervals)
 
     def _get_time_signal_info(self, domain):
-        with h5pyd.File(domain, 'r', endpoint=self.endpoint,
-                        username=self.admin_username, password=self.admin_password) as f:
+        info = self.catalog.time_info(self.endpoint, domain)
+        if not info:
+            return None
+        trigger_dt = parse_trigger_time(info["trigger_time"])
+        return {"frequency": info["frequency"], "trigger_dt": trigger_dt,
+                "t_min": info["t_min"], "t_max": info["t_max"]}
+
+    def _get_trigger_time(self, domain):
+        info = self._get_time_signal_info(domain)
+        if info:
+            return info["trigger_dt"]
+        with self._handles.open(domain) as f:
             if TIME_SIGNAL_NAME not in f:
                 return None
-            time_dset = f[TIME_SIGNAL_NAME]
-            freq = time_dset.attrs.get(SAMPLE_FREQUENCY_ATTR, DEFAULT_SAMPLE_FREQUENCY)
-            trigger_str = time_dset.attrs.get(TRIGGER_TIME_ATTR, None)
+            trigger_str = f[TIME_SIGNAL_NAME].attrs.get(TRIGGER_TIME_ATTR, None)
             if not trigger_str:
                 return None
-            trigger_dt = parse_trigger_time(trigger_str)
-            time_data = time_dset[...]
-            t_min = float(np.min(time_data))
-            t_max = float(np.max(time_data))
-            return {"frequency": freq, "trigger_dt": trigger_dt, "t_min": t_min, "t_max": t_max}
+            return parse_trigger_time(trigger_str)
 
     def get_file_info(self, filename: str) -> FileInfo:
         domain = DOMAIN_PREFIX + filename
@@ -232,43 +584,29 @@ class HSDSClient:
         time_range_obj = None
         signals_list = []
         try:
-            with h5pyd.File(domain, 'r', endpoint=self.endpoint,
-                            username=self.admin_username, password=self.admin_password) as f:
-                if TIME_SIGNAL_NAME in f:
-                    time_dset = f[TIME_SIGNAL_NAME]
-                    freq = time_dset.attrs.get(SAMPLE_FREQUENCY_ATTR, DEFAULT_SAMPLE_FREQUENCY)
-                    trigger_str = time_dset.attrs.get(TRIGGER_TIME_ATTR, None)
-                    if trigger_str:
-                        trigger_dt = parse_trigger_time(trigger_str)
-                        time_data = time_dset[...]
-                        t_min = float(np.min(time_data))
-                        t_max = float(np.max(time_data))
-                        frequency = freq
-                        time_range_obj = TimeRange(trigger_dt + timedelta(seconds=t_min),
-                                                  trigger_dt + timedelta(seconds=t_max))
-            ds_dict = self.traverse_signals(domain)
-            for ds_path, _ in ds_dict.items():
+            signals, time_info = self._read_domain_metadata(domain)
+            if time_info:
+                trigger_dt = parse_trigger_time(time_info["trigger_time"])
+                frequency = time_info["frequency"]
+                time_range_obj = TimeRange(trigger_dt + timedelta(seconds=time_info["t_min"]),
+                                           trigger_dt + timedelta(seconds=time_info["t_max"]))
+            for ds_path, attrs in signals.items():
                 if ds_path == "/" + TIME_SIGNAL_NAME:
                     continue
-                ds_attrs = self.get_signal_attributes(ds_path)
+                ds_attrs = [Attributes(name=name, type=attr_type, value=value)
+                            for name, attr_type, value in attrs]
                 signals_list.append(SignalInfo(relative_path=ds_path, attributes=ds_attrs))
         except Exception as e:
             print(f"Error reading file info from {domain}: {e}")
         return FileInfo(name=filename, frequency=frequency, time_range=time_range_obj, signals=signals_list)
 
     def list_all_files_info(self) -> list:
-        file_infos = []
         strc_files = self.list_all_files_name()
-        for fname in strc_files:
-            fi = self.get_file_info(fname)
-            file_infos.append(fi)
-        return file_infos
+        return self._fan_out(self.get_file_info, strc_files)
 
     def get_signal_time_ranges(self, signal_path: str):
         intervals = []
-        for domain in self._get_all_domains():
-            if not self._has_signal(domain, signal_path):
-                continue
+        for domain in self._domains_with_signal(signal_path):
             info = self._get_time_signal_info(domain)
             if not info:
                 continue
@@ -280,12 +618,7 @@ class HSDSClient:
 
     def get_signal_frequency_info(self, signal_path: str):
         result = []
-        for domain in self._get_all_domains():
-            if not self._has_signal(domain, signal_path):
-                continue
-            info = self._get_time_signal_info(domain)
-            if not info:
-                continue
+        for domain, info in self._domains_by_trigger_time(signal_path):
             freq = info["frequency"]
             start_dt = info["trigger_dt"] + timedelta(seconds=info["t_min"])
             end_dt = info["trigger_dt"] + timedelta(seconds=info["t_max"])
@@ -296,45 +629,248 @@ class HSDSClient:
 
     def get_file_signal_data_in_absolute_time_range(self, filename: str, signal_name: str, start: datetime, end: datetime):
         domain = DOMAIN_PREFIX + filename
-        info = self._get_time_signal_info(domain)
-        if not info:
+        trigger_dt = self._get_trigger_time(domain)
+        if trigger_dt is None:
             print(f"Error: No time signal info for {filename}")
             return None
-        trigger_dt = info["trigger_dt"]
         relative_start = (start - trigger_dt).total_seconds()
         relative_end = (end - trigger_dt).total_seconds()
         return self.get_file_signal_data_in_relative_time_range(filename, signal_name, relative_start, relative_end)
 
+    @staticmethod
+    def _locate_time_window(f, signal_name, t_start, t_end):
+        """返回 (time_dset, signal_dset, i0, i1)；时间轴不单调时 i0、i1 为 None"""
+        time_dset = f[TIME_SIGNAL_NAME]
+        signal_dset = f[signal_name]
+        freq = time_dset.attrs.get(SAMPLE_FREQUENCY_ATTR, DEFAULT_SAMPLE_FREQUENCY)
+        i0 = find_time_index(time_dset, t_start, "left", freq)
+        i1 = find_time_index(time_dset, t_end, "right", freq)
+        if i0 is None or i1 is None:
+            return time_dset, signal_dset, None, None
+        return time_dset, signal_dset, i0, min(i1, signal_dset.shape[0])
+
     def get_file_signal_data_in_relative_time_range(self, filename, signal_name, t_start, t_end):
         domain = DOMAIN_PREFIX + filename
-        with h5pyd.File(domain, 'r', endpoint=self.endpoint,
-                        username=ADMIN_USERNAME, password=ADMIN_PASSWORD) as f:
+        with self._handles.open(domain) as f:
             if TIME_SIGNAL_NAME not in f or signal_name not in f:
                 return None
-            time_data = f[TIME_SIGNAL_NAME][...]
-            data = f[signal_name][...]
-            indices = np.where((time_data >= t_start) & (time_data <= t_end))[0]
-            return data[indices]
-
-    def get_signal_data_in_absolute_time_range(self, signal_name, start: datetime, end: datetime):
+            time_dset, signal_dset, i0, i1 = self._locate_time_window(f, signal_name, t_start, t_end)
+            if i0 is None:
+                # 时间轴不单调，回退到全量读取后筛选
+                time_data = time_dset[...]
+                data = signal_dset[...]
+                indices = np.where((time_data >= t_start) & (time_data <= t_end))[0]
+                return data[indices]
+            if i0 >= i1:
+                return np.empty((0,) + tuple(signal_dset.shape[1:]), dtype=signal_dset.dtype)
+            return signal_dset[i0:i1]
+
+    def iter_file_signal_data(self, filename, signal_name, t_start, t_end, block_size=None, prefetch=True):
+        """
+        按块流式读取单个文件中 [t_start, t_end]（相对触发时间的秒数）内的信号，
+        逐块产出 (time_block, value_block)。块边界与数据集分块对齐，
+        prefetch=True 时产出当前块的同时在线程池中读取下一块
+        （在线程池任务内部调用时须关闭，避免占满线程池）。
+        """
+        domain = DOMAIN_PREFIX + filename
+        with self._handles.open(domain) as f:
+            if TIME_SIGNAL_NAME not in f or signal_name not in f:
+                return
+            time_dset, signal_dset, i0, i1 = self._locate_time_window(f, signal_name, t_start, t_end)
+            if i0 is None:
+                time_data = time_dset[...]
+                data = signal_dset[...]
+                indices = np.where((time_data >= t_start) & (time_data <= t_end))[0]
+                if indices.size > 0:
+                    yield time_data[indices], data[indices]
+                return
+
+            step = block_rows(signal_dset, block_size)
+            bounds = []
+            lo = i0
+            while lo < i1:
+                hi = min((lo // step + 1) * step, i1)
+                bounds.append((lo, hi))
+                lo = hi
+
+            def read_block(bound):
+                return time_dset[bound[0]:bound[1]], signal_dset[bound[0]:bound[1]]
+
+            future = None
+            try:
+                for k, bound in enumerate(bounds):
+                    block = future.result() if future is not None else read_block(bound)
+                    if prefetch and k + 1 < len(bounds):
+                        future = self._executor.submit(read_block, bounds[k + 1])
+                    else:
+                        future = None
+                    yield block
+            finally:
+                if future is not None and not future.cancel():
+                    wait([future])
+
+    def iter_signal_data(self, signal_name, start: datetime, end: datetime, block_size=None):
+        """
+        跨文件流式读取 [start, end] 内的信号，按触发时间顺序逐块产出
+        (timestamps, values)，timestamps 为 datetime64[us] 绝对时间。
+        """
+        for domain in self._time_index(signal_name).overlapping(start, end):
+            trigger_dt = self._get_trigger_time(domain)
+            relative_start = (start - trigger_dt).total_seconds()
+            relative_end = (end - trigger_dt).total_seconds()
+            trigger = np.datetime64(trigger_dt, "us")
+            blocks = self.iter_file_signal_data(domain[len(DOMAIN_PREFIX):], signal_name,
+                                                relative_start, relative_end, block_size)
+            for time_block, value_block in blocks:
+                offsets = np.round(np.asarray(time_block, dtype=np.float64) * 1e6).astype("timedelta64[us]")
+                yield trigger + offsets, value_block
+
+    def get_signal_data_in_absolute_time_range(self, signal_name, start: datetime, end: datetime, cancel_event=None):
+        def read_domain(domain):
+            f = domain[len(DOMAIN_PREFIX):]
+            return self.get_file_signal_data_in_absolute_time_range(f, signal_name, start, end)
+
+        domains = self._time_index(signal_name).overlapping(start, end)
         combined = []
-        for d in self._get_all_domains():
-            f = d[len(DOMAIN_PREFIX):]
-            d_data = self.get_file_signal_data_in_absolute_time_range(f, signal_name, start, end)
+        for d_data in self._fan_out(read_domain, domains, cancel_event):
             if d_data is not None and d_data.size > 0:
                 combined.append(d_data)
         if combined:
             return np.concatenate(combined)
         return np.array([])
 
-    def analyze_data(self, data):
-        if data.size == 0:
-            return Statistics(0, 0, 0, 0)
-        mean = np.mean(data)
-        maximum = np.max(data)
-        minimum = np.min(data)
-        three_sigma = 3 * np.std(data)
-        return Statistics(mean, maximum, minimum, three_sigma)
+    def analyze_data(self, data, percentiles=None):
+        acc = StreamingStatistics(track_percentiles=bool(percentiles))
+        acc.update(data)
+        return Statistics.from_accumulator(acc, percentiles)
+
+    def _get_selection_value(self, domain, dset, i0, i1, **params):
+        """GET /datasets/<id>/value，选择第一维的 [i0, i1)，其余维度全选"""
+        dims = [f"{i0}:{i1}"] + [f"0:{extent}" for extent in dset.shape[1:]]
+        params["domain"] = domain
+        params["select"] = "[" + ",".join(dims) + "]"
+        rsp = self.session.get(f"{self.endpoint}/datasets/{dset.id.id}/value",
+                               params=params, timeout=HTTP_TIMEOUT)
+        rsp.raise_for_status()
+        return rsp.json()
+
+    def reduce_file_signal_data(self, filename, signal_name, t_start, t_end):
+        """
+        在服务器端统计单个文件中 [t_start, t_end]（相对触发时间的秒数）内的信号
+        （GET /datasets/<id>/value?reduce=...），只传回 count/mean/var/min/max。
+        返回 StreamingStatistics；时间轴不单调时返回 None，由调用方回退到本地统计。
+        """
+        domain = DOMAIN_PREFIX + filename
+        acc = StreamingStatistics()
+        with self._handles.open(domain) as f:
+            if TIME_SIGNAL_NAME not in f or signal_name not in f:
+                return acc
+            _, signal_dset, i0, i1 = self._locate_time_window(f, signal_name, t_start, t_end)
+            if i0 is None:
+                return None
+            if i0 >= i1:
+                return acc
+            result = self._get_selection_value(domain, signal_dset, i0, i1,
+                                               reduce="count,mean,var,min,max")["reduce"]
+        if not result["count"]:
+            return acc
+        return StreamingStatistics.from_moments(result["count"], result["mean"],
+                                                result["var"] * result["count"],
+                                                result["min"], result["max"])
+
+    def get_file_signal_envelope(self, filename, signal_name, t_start, t_end, n_points):
+        """
+        单个文件中 [t_start, t_end]（相对触发时间的秒数）内信号的包络：
+        把数据按行均分为至多 n_points 段，由 HSDS 在各 DN 上计算每段的最小、最大值
+        （GET /datasets/<id>/value?envelope=n），@Time@ 用同样的分段取每段起始时间。
+        返回 (times, min_values, max_values)，文件中没有该信号时返回 None。
+        """
+        domain = DOMAIN_PREFIX + filename
+        with self._handles.open(domain) as f:
+            if TIME_SIGNAL_NAME not in f or signal_name not in f:
+                return None
+            time_dset, signal_dset, i0, i1 = self._locate_time_window(f, signal_name, t_start, t_end)
+            if i0 is None:
+                # 时间轴不单调，回退到全量读取后在本地分段
+                time_data = np.asarray(time_dset[...]).ravel()
+                data = signal_dset[...]
+                indices = np.where((time_data >= t_start) & (time_data <= t_end))[0]
+                if indices.size == 0:
+                    return np.empty(0), np.empty(0), np.empty(0)
+                times, mins, maxs = [], [], []
+                for part in np.array_split(indices, min(n_points, indices.size)):
+                    times.append(time_data[part].min())
+                    mins.append(data[part].min())
+                    maxs.append(data[part].max())
+                return np.array(times), np.array(mins), np.array(maxs)
+            if i0 >= i1:
+                return np.empty(0), np.empty(0), np.empty(0)
+            time_env = self._get_selection_value(domain, time_dset, i0, i1, envelope=n_points)
+            signal_env = self._get_selection_value(domain, signal_dset, i0, i1, envelope=n_points)
+        time_env = time_env["envelope"]
+        signal_env = signal_env["envelope"]
+        return (np.asarray(time_env["min"], dtype=np.float64),
+                np.asarray(signal_env["min"]), np.asarray(signal_env["max"]))
+
+    def get_signal_envelope(self, signal_name, start: datetime, end: datetime, n_points=2000,
+                            cancel_event=None):
+        """
+        用于绘图的 [start, end] 内信号包络（每段的最小、最大值），总段数约为 n_points，
+        按各文件与查询时间窗重叠的时长分配。各文件在线程池中并行请求，
+        返回 (timestamps, min_values, max_values)，timestamps 为每段起始的 datetime64[us]。
+        """
+        span = max((end - start).total_seconds(), 0.0)
+
+        def envelope_domain(domain):
+            info = self._get_time_signal_info(domain)
+            relative_start = (start - info["trigger_dt"]).total_seconds()
+            relative_end = (end - info["trigger_dt"]).total_seconds()
+            overlap = min(relative_end, info["t_max"]) - max(relative_start, info["t_min"])
+            points = max(1, int(np.ceil(n_points * overlap / span))) if span > 0 else 1
+            result = self.get_file_signal_envelope(domain[len(DOMAIN_PREFIX):], signal_name,
+                                                   relative_start, relative_end, points)
+            if result is None:
+                return None
+            times, mins, maxs = result
+            trigger = np.datetime64(info["trigger_dt"], "us")
+            offsets = np.round(times * 1e6).astype("timedelta64[us]")
+            return trigger + offsets, mins, maxs
+
+        domains = self._time_index(signal_name).overlapping(start, end)
+        results = [r for r in self._fan_out(envelope_domain, domains, cancel_event) if r is not None]
+        if not results:
+            return (np.empty(0, dtype="datetime64[us]"), np.empty(0), np.empty(0))
+        timestamps, mins, maxs = (np.concatenate(parts) for parts in zip(*results))
+        return timestamps, mins, maxs
+
+    def analyze_signal(self, signal_name, start: datetime, end: datetime, percentiles=None,
+                       block_size=None, cancel_event=None, server_side=True):
+        """
+        不落地整段数据，直接统计 [start, end] 内的信号：各文件在线程池中并行地
+        逐块累加，再合并各文件的部分结果。
+        server_side=True 且不需要分位数时由 HSDS 在各 DN 上完成统计，只传回几个数值。
+        """
+        def analyze_domain(domain):
+            trigger_dt = self._get_trigger_time(domain)
+            relative_start = (start - trigger_dt).total_seconds()
+            relative_end = (end - trigger_dt).total_seconds()
+            if server_side and not percentiles:
+                acc = self.reduce_file_signal_data(domain[len(DOMAIN_PREFIX):], signal_name,
+                                                   relative_start, relative_end)
+                if acc is not None:
+                    return acc
+            acc = StreamingStatistics(track_percentiles=bool(percentiles))
+            blocks = self.iter_file_signal_data(domain[len(DOMAIN_PREFIX):], signal_name,
+                                                relative_start, relative_end, block_size, prefetch=False)
+            for _, values in blocks:
+                acc.update(values)
+            return acc
+
+        domains = self._time_index(signal_name).overlapping(start, end)
+        total = StreamingStatistics(track_percentiles=bool(percentiles))
+        for acc in self._fan_out(analyze_domain, domains, cancel_event):
+            total.merge(acc)
+        return Statistics.from_accumulator(total, percentiles)
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,117 @@
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import h5pyd
+
+DEFAULT_HANDLE_CACHE_SIZE = 32      # 最多同时保持打开的 domain 数
+DEFAULT_HANDLE_TTL = 60             # 秒，超过后重新打开以获取最新的元数据
+
+
+class _Handle:
+    def __init__(self, f):
+        self.file = f
+        self.opened = time.monotonic()
+        self.users = 0
+        self.evicted = False
+
+
+class DomainHandleCache:
+    """
+    已打开 domain（h5pyd.File）的 LRU 缓存，线程安全。
+    同一 domain 的多次操作复用同一个 File 对象，从而复用其 HTTP keep-alive 会话
+    以及已获取的 domain/group/dataset 元数据，不必每次重新认证和读取根组。
+    超过 ttl 秒或被 invalidate 的句柄在最后一个使用者释放后关闭。
+    """
+
+    def __init__(self, endpoint, username, password,
+                 max_size=DEFAULT_HANDLE_CACHE_SIZE, ttl=DEFAULT_HANDLE_TTL):
+        self.endpoint = endpoint
+        self.username = username
+        self.password = password
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._handles = OrderedDict()
+
+    def __len__(self):
+        return len(self._handles)
+
+    def _expired(self, handle):
+        return time.monotonic() - handle.opened > self.ttl
+
+    def _evict_locked(self, domain):
+        """从缓存移除，返回需要立即关闭的 File（仍有使用者时为 None）"""
+        handle = self._handles.pop(domain, None)
+        if handle is None:
+            return None
+        handle.evicted = True
+        return handle.file if handle.users == 0 else None
+
+    @staticmethod
+    def _close_files(files):
+        for f in files:
+            try:
+                f.close()
+            except Exception as e:
+                print(f"Error closing {f}: {e}")
+
+    def _acquire(self, domain):
+        to_close = []
+        with self._lock:
+            handle = self._handles.get(domain)
+            if handle is not None and self._expired(handle):
+                to_close.append(self._evict_locked(domain))
+                handle = None
+            if handle is not None:
+                self._handles.move_to_end(domain)
+                handle.users += 1
+        if handle is None:
+            # 在锁外打开，避免慢请求阻塞其他 domain
+            f = h5pyd.File(domain, 'r', endpoint=self.endpoint,
+                           username=self.username, password=self.password)
+            with self._lock:
+                handle = self._handles.get(domain)
+                if handle is not None and not self._expired(handle):
+                    # 其他线程已抢先打开
+                    to_close.append(f)
+                else:
+                    if handle is not None:
+                        to_close.append(self._evict_locked(domain))
+                    handle = _Handle(f)
+                    self._handles[domain] = handle
+                    while len(self._handles) > self.max_size:
+                        oldest = next(iter(self._handles))
+                        to_close.append(self._evict_locked(oldest))
+                handle.users += 1
+        self._close_files([f for f in to_close if f is not None])
+        return handle
+
+    def _release(self, handle):
+        with self._lock:
+            handle.users -= 1
+            close = handle.evicted and handle.users == 0
+        if close:
+            self._close_files([handle.file])
+
+    @contextmanager
+    def open(self, domain):
+        """以只读方式获取 domain 的 File；退出 with 时不关闭，留给后续调用复用"""
+        handle = self._acquire(domain)
+        try:
+            yield handle.file
+        finally:
+            self._release(handle)
+
+    def invalidate(self, domain):
+        """domain 内容发生变化（lastModified 改变或被删除）时丢弃对应句柄"""
+        with self._lock:
+            f = self._evict_locked(domain)
+        if f is not None:
+            self._close_files([f])
+
+    def clear(self):
+        with self._lock:
+            files = [self._evict_locked(domain) for domain in list(self._handles)]
+        self._close_files([f for f in files if f is not None])
@@ -0,0 +1,147 @@
+import numpy as np
+
+DEFAULT_HISTOGRAM_BINS = 2048
+
+
+class _Histogram:
+    """
+    可合并的等宽直方图，用于估算分位数。
+    桶宽固定为 2 的整数次幂且以 0 为原点对齐，因此不同数据块的直方图
+    只需把较细的一方逐级合并（桶序号整除 2）即可相加。
+    """
+
+    def __init__(self, max_bins=DEFAULT_HISTOGRAM_BINS):
+        self.max_bins = max_bins
+        self.exponent = None
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+
+    def _initial_exponent(self, values):
+        lo, hi = float(values.min()), float(values.max())
+        magnitude = max(abs(lo), abs(hi))
+        # 保证 |x| / 桶宽 不超出 int64 的精确范围
+        floor_exp = int(np.floor(np.log2(magnitude))) - 52 if magnitude > 0 else -52
+        span = hi - lo
+        if span > 0:
+            return max(int(np.floor(np.log2(span / self.max_bins))), floor_exp)
+        return max(floor_exp, -1074)
+
+    def _coarsen(self, exponent):
+        if exponent > self.exponent:
+            self.keys = self.keys >> (exponent - self.exponent)
+            self.keys, inverse = np.unique(self.keys, return_inverse=True)
+            self.counts = np.bincount(inverse, weights=self.counts).astype(np.int64)
+            self.exponent = exponent
+
+    def _add_bins(self, keys, counts, exponent):
+        if self.exponent is None:
+            self.exponent = exponent
+        target = max(self.exponent, exponent)
+        self._coarsen(target)
+        if exponent < target:
+            keys = keys >> (target - exponent)
+        keys = np.concatenate([self.keys, keys])
+        counts = np.concatenate([self.counts, counts])
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        self.counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        while len(self.keys) > self.max_bins:
+            self._coarsen(self.exponent + 1)
+
+    def update(self, values):
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return
+        exponent = self._initial_exponent(values)
+        if self.exponent is not None:
+            # 数值量级增大的块需要先把已有的桶合并到足够粗的宽度，否则桶序号会溢出 int64
+            exponent = max(self.exponent, exponent)
+            self._coarsen(exponent)
+        keys = np.floor(np.ldexp(values, -exponent)).astype(np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        self._add_bins(keys, counts.astype(np.int64), exponent)
+
+    def merge(self, other):
+        if other.exponent is None:
+            return
+        self._add_bins(other.keys.copy(), other.counts.copy(), other.exponent)
+
+    def percentile(self, q, lo, hi):
+        total = int(self.counts.sum())
+        if total == 0:
+            return None
+        width = np.ldexp(1.0, self.exponent)
+        rank = q / 100.0 * total
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, rank, side="left"))
+        i = min(i, len(self.keys) - 1)
+        before = cumulative[i - 1] if i > 0 else 0
+        fraction = (rank - before) / self.counts[i] if self.counts[i] else 0.0
+        value = (self.keys[i] + fraction) * width
+        return float(min(max(value, lo), hi))
+
+
+class StreamingStatistics:
+    """
+    单遍、可合并的统计量累加器（count/mean/M2/min/max）。
+    块内用 numpy 计算，块间按 Chan 等人的并行公式合并，
+    因此既可以逐块消费流式读取的数据，也可以合并多个文件并行得到的部分结果。
+    track_percentiles=True 时额外维护直方图以估算分位数。
+    """
+
+    def __init__(self, track_percentiles=False, histogram_bins=DEFAULT_HISTOGRAM_BINS):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self._histogram = _Histogram(histogram_bins) if track_percentiles else None
+
+    def _combine(self, count, mean, m2, minimum, maximum):
+        if count == 0:
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = minimum if self.min is None else min(self.min, minimum)
+        self.max = maximum if self.max is None else max(self.max, maximum)
+
+    @classmethod
+    def from_moments(cls, count, mean, m2, minimum, maximum):
+        """由已计算好的矩构造（例如服务器端 reduce 的结果），不含分位数信息"""
+        acc = cls()
+        acc._combine(count, mean, m2, minimum, maximum)
+        return acc
+
+    def update(self, values):
+        values = np.asarray(values).ravel()
+        if values.size == 0:
+            return
+        x = values.astype(np.float64, copy=False)
+        mean = float(x.mean())
+        m2 = float(np.square(x - mean).sum())
+        self._combine(values.size, mean, m2, values.min(), values.max())
+        if self._histogram is not None:
+            self._histogram.update(x)
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        if self._histogram is not None and other._histogram is not None:
+            self._histogram.merge(other._histogram)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+    def percentile(self, q):
+        if self._histogram is None:
+            raise ValueError("percentiles were not tracked, use track_percentiles=True")
+        if self.count == 0:
+            return None
+        return self._histogram.percentile(q, float(self.min), float(self.max))
@@ -0,0 +1,44 @@
+import contextlib
+import unittest
+
+import numpy as np
+
+from hsds_client.core import HSDSClient, TIME_SIGNAL_NAME
+
+
+class _FakeHandles:
+    def __init__(self, f):
+        self._f = f
+
+    @contextlib.contextmanager
+    def open(self, domain):
+        yield self._f
+
+
+class SignalEnvelopeTest(unittest.TestCase):
+
+    def setUp(self):
+        # 时间轴不单调，走本地分段的回退路径
+        self.time_data = np.array([0.0, 1.0, 0.5, 2.0, 1.5, 3.0])
+        self.signal = np.array([10.0, 11.0, 12.0, 13.0, 14.0, 15.0])
+        f = {TIME_SIGNAL_NAME: self.time_data, "sig": self.signal}
+        self.client = object.__new__(HSDSClient)
+        self.client._handles = _FakeHandles(f)
+        self.client._locate_time_window = (
+            lambda f, name, t_start, t_end: (f[TIME_SIGNAL_NAME], f[name], None, None))
+
+    def test_non_monotonic_envelope(self):
+        times, mins, maxs = self.client.get_file_signal_envelope("a.strc", "sig", 0.5, 2.0, 2)
+        self.assertEqual(times.tolist(), [0.5, 1.5])
+        self.assertEqual(mins.tolist(), [11.0, 13.0])
+        self.assertEqual(maxs.tolist(), [12.0, 14.0])
+
+    def test_non_monotonic_empty_window(self):
+        times, mins, maxs = self.client.get_file_signal_envelope("a.strc", "sig", 5.0, 6.0, 10)
+        self.assertEqual(times.size, 0)
+        self.assertEqual(mins.size, 0)
+        self.assertEqual(maxs.size, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from hsds_client.core import HSDSClient, DOMAIN_PREFIX
+
+
+class _FakeResponse:
+    def __init__(self, body):
+        self._body = body
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._body
+
+
+class _FakeSession:
+    """按名称排序分页返回 domain，每页最多 page_limit 个（模拟服务器截短 Limit）"""
+
+    def __init__(self, names, page_limit):
+        self.names = sorted(names)
+        self.page_limit = page_limit
+        self.requests = 0
+
+    def get(self, url, params=None, timeout=None):
+        self.requests += 1
+        names = self.names
+        if params.get("Marker"):
+            names = [n for n in names if n > params["Marker"]]
+        limit = min(params["Limit"], self.page_limit)
+        items = [{"name": n, "class": "domain"} for n in names[:limit]]
+        return _FakeResponse({"domains": items})
+
+
+class ListDomainsTest(unittest.TestCase):
+
+    def _client(self, session):
+        client = object.__new__(HSDSClient)
+        client.endpoint = "http://localhost"
+        client.session = session
+        return client
+
+    def test_short_pages(self):
+        names = [f"{DOMAIN_PREFIX}f{i:03d}.strc" for i in range(10)]
+        session = _FakeSession(names, page_limit=3)
+        records = self._client(session).list_domains()
+        self.assertEqual([r.name for r in records], [f"f{i:03d}.strc" for i in range(10)])
+        # 3+3+3+1 条，再加一次空页
+        self.assertEqual(session.requests, 5)
+
+    def test_empty_folder(self):
+        session = _FakeSession([], page_limit=3)
+        self.assertEqual(self._client(session).list_domains(), [])
+        self.assertEqual(session.requests, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+import numpy as np
+
+from hsds_client.stats import StreamingStatistics
+
+
+class StreamingStatisticsTest(unittest.TestCase):
+
+    def test_percentile_growing_magnitude(self):
+        # 后续数据块的量级远大于第一块时，直方图需要先合并桶再加入新数据
+        stats = StreamingStatistics(track_percentiles=True)
+        with np.errstate(all="raise"):
+            stats.update(np.ones(10))
+            stats.update(np.array([1e6, 2e6, 3e6]))
+            stats.update(np.array([1e15, 2e15]))
+        self.assertEqual(stats.count, 15)
+        self.assertEqual(stats.max, 2e15)
+        self.assertGreater(stats.percentile(95), 1e15)
+        self.assertLess(stats.percentile(50), 1e15)
+
+    def test_percentile_matches_numpy(self):
+        rng = np.random.default_rng(0)
+        stats = StreamingStatistics(track_percentiles=True)
+        blocks = [rng.normal(0, 10 ** i, 1000) for i in range(6)]
+        for block in blocks:
+            stats.update(block)
+        values = np.concatenate(blocks)
+        for q in (10, 50, 90):
+            expected = np.percentile(values, q)
+            self.assertAlmostEqual(stats.percentile(q), expected, delta=np.ptp(values) / 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
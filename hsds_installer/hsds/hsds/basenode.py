@@ -518,6 +518,8 @@ async def info(request):
         mc_stats["utililization_per"] = mc.cacheUtilizationPercent
         mc_stats["mem_used"] = mc.memUsed
         mc_stats["mem_target"] = mc.memTarget
+        mc_stats["hit_count"] = mc.hitCount
+        mc_stats["miss_count"] = mc.missCount
     answer["meta_cache_stats"] = mc_stats
     cc_stats = {}
     if "chunk_cache" in app:
@@ -527,6 +529,8 @@ async def info(request):
         cc_stats["utililization_per"] = cc.cacheUtilizationPercent
         cc_stats["mem_used"] = cc.memUsed
         cc_stats["mem_target"] = cc.memTarget
+        cc_stats["hit_count"] = cc.hitCount
+        cc_stats["miss_count"] = cc.missCount
     answer["chunk_cache_stats"] = cc_stats
     dc_stats = {}
     if "domain_cache" in app:
@@ -536,6 +540,8 @@ async def info(request):
         dc_stats["utililization_per"] = dc.cacheUtilizationPercent
         dc_stats["mem_used"] = dc.memUsed
         dc_stats["mem_target"] = dc.memTarget
+        dc_stats["hit_count"] = dc.hitCount
+        dc_stats["miss_count"] = dc.missCount
     answer["domain_cache_stats"] = dc_stats
 
     resp = await jsonResponse(request, answer)
@@ -34,6 +34,7 @@ from .util.chunkUtil import getChunkCoverage, getDataCoverage
 from .util.chunkUtil import getChunkIdForPartition, getQueryDtype
 from .util.arrayUtil import jsonToArray, getNumpyValue
 from .util.arrayUtil import getNumElements, arrayToBytes, bytesToArray
+from .util.reduceUtil import getFillPartial, getFillEnvelopePartial
 
 from . import config
 from . import hsds_logger as log
@@ -72,6 +73,41 @@ def getFillValue(dset_json):
     return arr
 
 
+def getChunkRefParams(chunk_info):
+    """ Return the DN query params for chunks that reference data in an
+    external file (s3path, s3offset, s3size, hyper_dims) """
+    params = {}
+    if "s3path" in chunk_info:
+        params["s3path"] = chunk_info["s3path"]
+
+    if "s3offset" in chunk_info:
+        s3offset = chunk_info["s3offset"]
+        if isinstance(s3offset, list):
+            # convert to a colon seperated string
+            s3offset = ":".join(map(str, s3offset))
+        else:
+            s3offset = int(s3offset)
+        params["s3offset"] = s3offset
+
+    if "s3size" in chunk_info:
+        s3size = chunk_info["s3size"]
+        if isinstance(s3size, list):
+            # convert to a colon seperated string
+            s3size = ":".join(map(str, s3size))
+        else:
+            s3size = int(s3size)
+        params["s3size"] = s3size
+
+    if "hyper_dims" in chunk_info:
+        hyper_dims = chunk_info["hyper_dims"]
+        if isinstance(hyper_dims, list):
+            # convert to colon seperated string
+            hyper_dims = ":".join(map(str, hyper_dims))
+        params["hyper_dims"] = hyper_dims
+
+    return params
+
+
 async def write_chunk_hyperslab(
     app, chunk_id, dset_json, slices, arr, bucket=None, client=None
 ):
@@ -263,33 +299,7 @@ async def read_chunk_hyperslab(
     # pass dset json and selection as query params
     params = {}
     # params["select"] = select
-    if "s3path" in chunk_info:
-        params["s3path"] = chunk_info["s3path"]
-
-    if "s3offset" in chunk_info:
-        s3offset = chunk_info["s3offset"]
-        if isinstance(s3offset, list):
-            # convert to a colon seperated string
-            s3offset = ":".join(map(str, s3offset))
-        else:
-            s3offset = int(s3offset)
-        params["s3offset"] = s3offset
-
-    if "s3size" in chunk_info:
-        s3size = chunk_info["s3size"]
-        if isinstance(s3size, list):
-            # convert to a colon seperated string
-            s3size = ":".join(map(str, s3size))
-        else:
-            s3size = int(s3size)
-        params["s3size"] = s3size
-
-    if "hyper_dims" in chunk_info:
-        hyper_dims = chunk_info["hyper_dims"]
-        if isinstance(hyper_dims, list):
-            # convert to colon seperated string
-            hyper_dims = ":".join(map(str, hyper_dims))
-        params["hyper_dims"] = hyper_dims
+    params.update(getChunkRefParams(chunk_info))
 
     if len(select_dtype) < len(dset_dt):
         # field selection, pass in the field names
@@ -421,6 +431,82 @@ async def read_chunk_hyperslab(
     log.debug(f"read_chunk_hyperslab {chunk_id} - done")
 
 
+async def reduce_chunk_hyperslab(
+    app,
+    chunk_id,
+    dset_json,
+    select_dtype=None,
+    chunk_map=None,
+    envelope=None,
+    bucket=None,
+    client=None,
+):
+    """get the reduction partial for the chunk selection from the DN
+    The partial is stored in the chunk_map entry as "reduce_rsp".
+    If envelope is set, get the min/max for each bucket of envelope rows instead.
+    """
+
+    if chunk_map is None:
+        log.error("expected chunk_map to be set")
+        return
+
+    log.info(f"reduce_chunk_hyperslab, chunk_id: {chunk_id}, bucket: {bucket}")
+    if chunk_id not in chunk_map:
+        log.warn(f"expected to find {chunk_id} in chunk_map")
+        return
+    chunk_info = chunk_map[chunk_id]
+    if "chunk_sel" not in chunk_info:
+        log.error(f"expected chunk_sel in chunkinfo: {chunk_info}")
+        raise HTTPInternalServerError()
+    chunk_sel = chunk_info["chunk_sel"]
+
+    partition_chunk_id = getChunkIdForPartition(chunk_id, dset_json)
+    if partition_chunk_id != chunk_id:
+        log.debug(f"using partition_chunk_id: {partition_chunk_id}")
+
+    type_json = dset_json["type"]
+    dset_dt = createDataType(type_json)
+    if select_dtype is None:
+        select_dtype = dset_dt
+
+    params = getChunkRefParams(chunk_info)
+    params["select"] = getSliceQueryParam(chunk_sel)
+    if envelope:
+        # position of the chunk's first selected row in the selection
+        offset = chunk_info["data_sel"][0].start
+        params["envelope"] = f"{envelope}:{offset}"
+    else:
+        params["reduce"] = 1
+    params["bucket"] = bucket
+    if len(select_dtype) < len(dset_dt):
+        params["fields"] = ":".join(select_dtype.names)
+
+    req = getDataNodeUrl(app, partition_chunk_id)
+    req += "/chunks/" + partition_chunk_id
+
+    try:
+        log.debug(f"reduce_chunk_hyperslab - GET chunk req: {req}")
+        partial = await http_get(app, req, params=params, client=client)
+    except HTTPNotFound:
+        if "s3path" in params:
+            s3path = params["s3path"]
+            # external HDF5 file, should exist
+            log.warn(f"chunk {chunk_id} with s3path: {s3path} not found")
+        # chunk has not been written, use the fill value
+        sel_shape = getSelectionShape(chunk_sel)
+        fill_value = getFillValue(dset_json)
+        if envelope:
+            partial = getFillEnvelopePartial(fill_value, sel_shape[0], envelope, offset=offset)
+        else:
+            partial = getFillPartial(fill_value, getNumElements(sel_shape))
+
+    if not isinstance(partial, dict):
+        log.warn(f"reduce_chunk_hyperslab - expected dict but got: {type(partial)}")
+        raise HTTPInternalServerError()
+    chunk_info["reduce_rsp"] = partial
+    log.debug(f"reduce_chunk_hyperslab {chunk_id} - done")
+
+
 async def read_point_sel(
     app,
     chunk_id,
@@ -625,6 +711,7 @@ class ChunkCrawler:
         query_update=None,
         limit=0,
         points=None,
+        envelope=None,
         action=None,
     ):
 
@@ -646,6 +733,7 @@ class ChunkCrawler:
         self._points = points
         self._query = query
         self._query_update = query_update
+        self._envelope = envelope
         self._hits = 0
         self._limit = limit
         self._status_map = {}  # map of chunk_ids to status code
@@ -782,6 +870,20 @@ class ChunkCrawler:
                     msg = f"read_chunk_hyperslab - got 200 status for chunk_id: {chunk_id}"
                     log.debug(msg)
                     status_code = 200
+                elif self._action == "reduce_chunk_hyperslab":
+                    await reduce_chunk_hyperslab(
+                        self._app,
+                        chunk_id,
+                        self._dset_json,
+                        select_dtype=self._select_dtype,
+                        chunk_map=self._chunk_map,
+                        envelope=self._envelope,
+                        bucket=self._bucket,
+                        client=client,
+                    )
+                    msg = f"reduce_chunk_hyperslab - got 200 status for chunk_id: {chunk_id}"
+                    log.debug(msg)
+                    status_code = 200
                 elif self._action == "write_chunk_hyperslab":
                     await write_chunk_hyperslab(
                         self._app,
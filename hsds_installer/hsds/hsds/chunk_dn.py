@@ -32,7 +32,9 @@ from .util.chunkUtil import chunkWriteSelection, chunkReadSelection
 from .util.chunkUtil import chunkWritePoints, chunkReadPoints
 from .util.domainUtil import isValidBucketName
 from .util.boolparser import BooleanParser
-from .datanode_lib import get_metadata_obj, get_chunk, save_chunk
+from .util.reduceUtil import getReducePartial, getEnvelopePartial, isReducibleType
+from .datanode_lib import get_metadata_obj, get_chunk, save_chunk, invalidateShmChunk
+from .datanode_lib import schedulePrefetch
 
 from . import hsds_logger as log
 from . import config
@@ -120,7 +122,7 @@ async def PUT_Chunk(request):
     # otherwise, have the client try a bit later
     chunk_cache = app["chunk_cache"]
     min_chunk_size = int(config.get("min_chunk_size"))
-    if chunk_id not in chunk_cache and chunk_cache.memFree < min_chunk_size:
+    if not chunk_cache.isCached(chunk_id) and chunk_cache.memFree < min_chunk_size:
         log.warn(f"PUT_Chunk {chunk_id} - not enough room in chunk cache - return 503 ")
         raise HTTPServiceUnavailable()
 
@@ -328,6 +330,8 @@ async def GET_Chunk(request):
     dims = None
     query = None
     limit = 0
+    reduce = False
+    envelope = None
 
     app = request.app
     params = request.rel_url.query
@@ -415,6 +419,31 @@ async def GET_Chunk(request):
             log.error(f"invalid Limit param: {param_limit}")
             raise HTTPBadRequest()
 
+    if "reduce" in params and params["reduce"]:
+        if query:
+            msg = "reduce can not be used with query"
+            log.warn(msg)
+            raise HTTPBadRequest(reason=msg)
+        reduce = True
+        log.debug("GET_Chunk - returning reduce partial")
+
+    if "envelope" in params:
+        # envelope=<width>:<offset> - min/max for each bucket of width rows,
+        # offset is the position of the first selected row in the selection
+        if query or reduce:
+            msg = "envelope can not be used with query or reduce"
+            log.warn(msg)
+            raise HTTPBadRequest(reason=msg)
+        try:
+            envelope = tuple(int(x) for x in params["envelope"].split(":"))
+        except ValueError:
+            envelope = None
+        if envelope is None or len(envelope) != 2 or envelope[0] < 1 or envelope[1] < 0:
+            msg = f"invalid envelope param: {params['envelope']}"
+            log.warn(msg)
+            raise HTTPBadRequest(reason=msg)
+        log.debug(f"GET_Chunk - returning envelope partial for: {envelope}")
+
     if s3path:
         # calculate how many chunk bytes we'll read
         num_bytes = 0
@@ -476,6 +505,10 @@ async def GET_Chunk(request):
 
     kwargs["chunk_init"] = chunk_init
 
+    if not chunk_init:
+        # read ahead if the dataset is being read sequentially
+        schedulePrefetch(app, chunk_id, dset_json, bucket=bucket)
+
     chunk_arr = await get_chunk(app, chunk_id, dset_json, **kwargs)
     if chunk_arr is None:
         msg = f"chunk {chunk_id} not found"
@@ -551,6 +584,18 @@ async def GET_Chunk(request):
         # read selected data from chunk
         output_arr = chunkReadSelection(chunk_arr, slices=selection, select_dt=select_dt)
 
+    if reduce or envelope:
+        if not isReducibleType(output_arr.dtype):
+            msg = f"reduce not supported for type: {output_arr.dtype}"
+            log.warn(msg)
+            raise HTTPBadRequest(reason=msg)
+        if envelope:
+            partial = getEnvelopePartial(output_arr, envelope[0], offset=envelope[1])
+        else:
+            partial = getReducePartial(output_arr)
+        log.debug(f"GET_Chunk - reduce partial: {partial}")
+        return json_response(partial)
+
     # write response
     if output_arr is not None:
         log.debug(f"GET_Chunk - returning arr: {output_arr.shape}")
@@ -867,8 +912,9 @@ async def DELETE_Chunk(request):
     s3key = getS3Key(chunk_id)
     log.debug(f"DELETE_Chunk s3_key: {s3key}")
 
-    if chunk_id in chunk_cache:
+    if chunk_cache.isCached(chunk_id):
         del chunk_cache[chunk_id]
+    invalidateShmChunk(app, chunk_id, bucket=bucket)
 
     filter_map = app["filter_map"]
     dset_id = getDatasetId(chunk_id)
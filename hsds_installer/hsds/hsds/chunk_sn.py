@@ -40,7 +40,9 @@ from .util.arrayUtil import getNumElements, arrayToBytes, bytesToArray
 from .util.arrayUtil import squeezeArray, getBroadcastShape
 from .util.authUtil import getUserPasswordFromRequest, validateUserPassword
 from .servicenode_lib import getDsetJson, validateAction
-from .dset_lib import getSelectionData, getParser, extendShape
+from .util.reduceUtil import getReduceOps, getReduceResult, getEnvelopeWidth
+from .util.reduceUtil import isReducibleType
+from .dset_lib import getSelectionData, getSelectionReduction, getParser, extendShape
 from .chunk_crawl import ChunkCrawler
 from . import config
 from . import hsds_logger as log
@@ -853,7 +855,7 @@ async def PUT_Value(request):
                 log.warn(msg)
                 raise HTTPBadRequest(reason=msg)
 
-            arr = np.fromstring(input_data, dtype=dset_dtype)
+            arr = np.frombuffer(input_data, dtype=dset_dtype)
             log.debug(f"read fixed type array: {arr}")
 
         if bc_shape:
@@ -955,6 +957,90 @@ async def PUT_Value(request):
     return resp
 
 
+async def _getReduceResponse(request, dset_id, dset_json, slices, select_dtype, bucket):
+    """ Return JSON response with the requested reductions (e.g. reduce=mean,max)
+    of the selection.  Each DN reduces its chunks and only the partial results
+    are sent back to the SN """
+    params = request.rel_url.query
+    try:
+        ops = getReduceOps(params["reduce"])
+    except ValueError as ve:
+        msg = f"Invalid reduce param: {ve}"
+        log.warn(msg)
+        raise HTTPBadRequest(reason=msg)
+    if dset_json["shape"]["class"] == "H5S_SCALAR":
+        msg = "reduce not supported for scalar datasets"
+        log.warn(msg)
+        raise HTTPBadRequest(reason=msg)
+    if not isReducibleType(select_dtype):
+        msg = f"reduce not supported for type: {select_dtype}"
+        log.warn(msg)
+        raise HTTPBadRequest(reason=msg)
+    log.info(f"GET Value reduce: {ops} for selection: {slices}")
+
+    partial = await getSelectionReduction(
+        request.app,
+        dset_id,
+        dset_json,
+        slices=slices,
+        select_dtype=select_dtype,
+        bucket=bucket
+    )
+    resp_json = {"reduce": getReduceResult(partial, ops)}
+    resp_json["hrefs"] = get_hrefs(request, dset_json)
+    return await jsonResponse(request, resp_json)
+
+
+async def _getEnvelopeResponse(request, dset_id, dset_json, slices, select_dtype, bucket):
+    """ Return JSON response with the min and max of each of (at most) envelope=<n>
+    buckets of rows along the first dimension of the selection, e.g. to plot
+    a long trace without fetching every element """
+    params = request.rel_url.query
+    try:
+        num_buckets = int(params["envelope"])
+    except ValueError:
+        num_buckets = 0
+    if num_buckets < 1:
+        msg = f"Invalid envelope param: {params['envelope']}"
+        log.warn(msg)
+        raise HTTPBadRequest(reason=msg)
+    if dset_json["shape"]["class"] == "H5S_SCALAR":
+        msg = "envelope not supported for scalar datasets"
+        log.warn(msg)
+        raise HTTPBadRequest(reason=msg)
+    if not isReducibleType(select_dtype):
+        msg = f"envelope not supported for type: {select_dtype}"
+        log.warn(msg)
+        raise HTTPBadRequest(reason=msg)
+    sel_shape = getSelectionShape(slices)
+    width = getEnvelopeWidth(sel_shape[0], num_buckets)
+    log.info(f"GET Value envelope: {num_buckets} buckets of {width} rows for: {slices}")
+
+    envelope = await getSelectionReduction(
+        request.app,
+        dset_id,
+        dset_json,
+        slices=slices,
+        select_dtype=select_dtype,
+        envelope=width,
+        bucket=bucket
+    )
+    # index of the first dataset row of each bucket
+    start = slices[0].start
+    step = slices[0].step
+    index = [start + b * width * step for b in envelope["bucket"]]
+    resp_json = {
+        "envelope": {
+            "width": width,
+            "index": index,
+            "min": envelope["min"],
+            "max": envelope["max"],
+        }
+    }
+    resp_json["hrefs"] = get_hrefs(request, dset_json)
+    return await jsonResponse(request, resp_json)
+
+
 async def GET_Value(request):
     """
     Handler for GET /<dset_uuid>/value request
@@ -1029,6 +1115,26 @@ async def GET_Value(request):
 
     query = _getQuery(params, dset_dtype, rank=rank)
 
+    if "reduce" in params:
+        if query:
+            msg = "reduce can not be used with query"
+            log.warn(msg)
+            raise HTTPBadRequest(reason=msg)
+        resp = await _getReduceResponse(request, dset_id, dset_json, slices, select_dtype, bucket)
+        log.response(request, resp=resp)
+        return resp
+
+    if "envelope" in params:
+        if query:
+            msg = "envelope can not be used with query"
+            log.warn(msg)
+            raise HTTPBadRequest(reason=msg)
+        resp = await _getEnvelopeResponse(
+            request, dset_id, dset_json, slices, select_dtype, bucket
+        )
+        log.response(request, resp=resp)
+        return resp
+
     response_type = getAcceptType(request)
 
     if response_type == "binary" and use_http_streaming(request, rank):
@@ -1351,7 +1457,7 @@ async def POST_Value(request):
             log.warn(msg)
             raise HTTPBadRequest(reason=msg)
         num_points = request.content_length // point_dt.itemsize
-        points = np.fromstring(binary_data, dtype=point_dt)
+        points = np.frombuffer(binary_data, dtype=point_dt)
         # reshape the data based on the rank (num_points x rank)
         if rank > 1:
             if len(points) % rank != 0:
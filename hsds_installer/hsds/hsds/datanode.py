@@ -19,6 +19,8 @@ from aiohttp.web import run_app
 
 from . import config
 from .util.lruCache import LruCache
+from .util.shmCache import ShmChunkCache
+from .util.prefetchUtil import SequentialAccessTracker
 from .util.idUtil import isValidUuid, isSchema2Id, getCollectionForId
 from .util.idUtil import isRootObjId
 from .util.httpUtil import isUnixDomainUrl, bindToSocket, getPortFromUrl
@@ -274,6 +276,8 @@ def create_app():
     log.debug(f"Using chunk memory cache size of: {chunk_mem_cache_size}")
     chunk_mem_cache_expire = int(config.get("chunk_mem_cache_expire"))
     log.debug(f"Setting chunk cache expire time to: {chunk_mem_cache_expire}")
+    chunk_mem_cache_policy = config.get("chunk_mem_cache_policy", default="slru")
+    log.debug(f"Using chunk cache policy: {chunk_mem_cache_policy}")
     blosc_nthreads = int(config.get("blosc_nthreads"))
     if blosc_nthreads > 0:
         log.debug(f"Setting blosc nthreads to: {blosc_nthreads}")
@@ -296,8 +300,30 @@ def create_app():
         "mem_target": chunk_mem_cache_size,
         "name": "ChunkCache",
         "expire_time": chunk_mem_cache_expire,
+        "policy": chunk_mem_cache_policy,
     }
     app["chunk_cache"] = LruCache(**kwargs)
+    shm_chunk_cache_size = int(config.get("shm_chunk_cache_size", default=0))
+    if shm_chunk_cache_size > 0:
+        # optional second level cache shared by all DN processes on this host
+        kwargs = {
+            "name": config.get("shm_chunk_cache_name", default="hsds_chunk_cache"),
+            "mem_target": shm_chunk_cache_size,
+            "slot_size": int(config.get("max_chunk_size")),
+        }
+        try:
+            app["shm_chunk_cache"] = ShmChunkCache(**kwargs)
+        except (OSError, ValueError) as e:
+            log.warn(f"Unable to use shared memory chunk cache: {e}")
+    # read ahead of sequential chunk reads
+    chunk_prefetch_count = int(config.get("chunk_prefetch_count", default=8))
+    log.debug(f"Using chunk prefetch count: {chunk_prefetch_count}")
+    if chunk_prefetch_count > 0:
+        app["chunk_access_tracker"] = SequentialAccessTracker(window=chunk_prefetch_count)
+    chunk_prefetch_budget = config.get("chunk_prefetch_budget", default=32 * 1024 * 1024)
+    app["chunk_prefetch_budget"] = int(chunk_prefetch_budget)
+    # map of in-flight prefetch tasks to the number of bytes they read
+    app["chunk_prefetch_tasks"] = {}
     app["deleted_ids"] = set()
     app["deleted_attrs"] = {}  # map of objectid to set of deleted attribute names
     app["deleted_links"] = {}  # map of objecctid to set of deleted link names
@@ -366,6 +392,11 @@ async def on_shutdown(app):
     # finally release any http_clients
     await release_http_client(app)
 
+    if app.get("shm_chunk_cache") is not None:
+        # detach, the segment is kept for other (or restarted) DNs
+        app["shm_chunk_cache"].close()
+        app["shm_chunk_cache"] = None
+
     log.info("on_shutdown - done")
 
 
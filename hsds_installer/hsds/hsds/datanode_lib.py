@@ -22,22 +22,26 @@ from aiohttp.web_exceptions import HTTPServiceUnavailable, HTTPBadRequest
 from .util.idUtil import validateInPartition, getS3Key, isValidUuid
 from .util.idUtil import isValidChunkId, getDataNodeUrl, isSchema2Id
 from .util.idUtil import getRootObjId, isRootObjId
+from .util.idUtil import getObjPartition, getNodeNumber, getNodeCount
 from .util.storUtil import getStorJSONObj, putStorJSONObj, putStorBytes
 from .util.storUtil import getStorBytes, isStorObj, deleteStorObj, getHyperChunks
 from .util.storUtil import getBucketFromStorURI, getKeyFromStorURI, getURIFromKey
 from .util.domainUtil import isValidDomain, getBucketForDomain
 from .util.attrUtil import getRequestCollectionName
-from .util.httpUtil import http_post
+from .util.httpUtil import http_get, http_post
 from .util.dsetUtil import getChunkLayout, getFilterOps, getShapeDims
 from .util.dsetUtil import getChunkInitializer, getSliceQueryParam, getFilters
+from .util.dsetUtil import getDatasetLayout, getDatasetLayoutClass, getSelectionShape
 from .util.chunkUtil import getDatasetId, getChunkSelection, getChunkIndex
-from .util.arrayUtil import arrayToBytes, bytesToArray, jsonToArray
+from .util.chunkUtil import getChunkIds, getChunkIdForPartition
+from .util.chunkUtil import getChunkCoverage, getDataCoverage
+from .util.arrayUtil import arrayToBytes, bytesToArray, jsonToArray, isVlen
 from .util.hdf5dtype import createDataType
-from .util.rangegetUtil import ChunkLocation, chunkMunge, getHyperChunkIndex, getHyperChunkFactors
+from .util.rangegetUtil import ChunkLocation, getHyperChunkIndex, getHyperChunkFactors
 from .util.timeUtil import getNow
 from . import config
 from . import hsds_logger as log
-from .dset_lib import getFillValue
+from .dset_lib import getFillValue, getChunkLocations, CHUNK_REF_LAYOUTS
 
 # supported initializer commands
 INITIALIZER_CMDS = ["chunklocator", "arange"]
@@ -187,7 +191,7 @@ async def write_s3_obj(app, obj_id, bucket=None):
 
     try:
         if isValidChunkId(obj_id):
-            if obj_id not in chunk_cache:
+            if not chunk_cache.isCached(obj_id):
                 log.error(f"expected to find obj_id: {obj_id} in chunk cache")
                 raise KeyError(f"{obj_id} not found in chunk cache")
             if not chunk_cache.isDirty(obj_id):
@@ -210,7 +214,7 @@ async def write_s3_obj(app, obj_id, bucket=None):
             success = True
 
             # if chunk has been evicted from cache something has gone wrong
-            if obj_id not in chunk_cache:
+            if not chunk_cache.isCached(obj_id):
                 msg = f"write_s3_obj: expected to find {obj_id} "
                 msg += "in chunk_cache"
                 log.error(msg)
@@ -236,7 +240,7 @@ async def write_s3_obj(app, obj_id, bucket=None):
         else:
             # meta data update
             # check for object in meta cache
-            if obj_id not in meta_cache:
+            if not meta_cache.isCached(obj_id):
                 msg = f"write_s3_obj: expected to find obj_id: {obj_id} "
                 msg += "in meta cache"
                 log.error(msg)
@@ -255,7 +259,7 @@ async def write_s3_obj(app, obj_id, bucket=None):
                 msg = f"write_s3_obj: obj {obj_id} has been deleted "
                 msg += "while write was in progress"
                 log.info(msg)
-            elif obj_id not in meta_cache:
+            elif not meta_cache.isCached(obj_id):
                 msg = f"write_s3_obj: expected to find {obj_id} in meta_cache"
                 log.error(msg)
             else:
@@ -370,7 +374,7 @@ async def get_metadata_obj(app, obj_id, bucket=None):
             while getNow(app) - read_start_time < store_read_timeout:
                 log.debug(f"waiting for pending s3 read {s3_key}, sleeping")
                 await asyncio.sleep(store_read_sleep)
-                if obj_id in meta_cache:
+                if meta_cache.isCached(obj_id):
                     log.info(f"object {obj_id} has arrived!")
                     obj_json = meta_cache[obj_id]
                     break
@@ -520,7 +524,7 @@ async def delete_metadata_obj(app, obj_id, notify=True, root_id=None, bucket=Non
         log.debug(f"adding {obj_id} to deleted ids")
         deleted_ids.add(obj_id)
 
-    if obj_id in meta_cache:
+    if meta_cache.isCached(obj_id):
         log.debug(f"removing {obj_id} from meta_cache")
         del meta_cache[obj_id]
 
@@ -907,50 +911,39 @@ async def get_chunk_bytes(
 
     if len(chunk_list) == 0:
         # nothing to fetch, return zero-initialized array
-        return chunk_bytes
+        return chunk_arr
 
-    # munge adjacent chunks to reduce the number of storage
-    # requests needed
-    max_gap = int(config.get("max_rangeget_gap", default=1024))
-    chunk_list = chunkMunge(chunk_list, max_gap=max_gap)
-    log.info(f"get_chunk_bytes - get requests reduced from {num_chunks} to {len(chunk_list)}")
+    # read all the h5 chunks with one vectored read, the storage client
+    # takes care of merging nearby ranges where that saves requests
+    kwargs = {
+        "filter_ops": filter_ops,
+        "chunk_locations": chunk_list,
+        "bucket": bucket,
+        "chunk_arr": chunk_arr,
+        "hyper_dims": hyper_dims,
+    }
+    log.debug(f"get_chunk_bytes - {len(chunk_list)} h5 chunks")
+    await getHyperChunks(app, s3key, **kwargs)
 
-    # gather all the individual h5 chunk reads into a list of tasks
-    tasks = []
+    log.debug("get_chunk_bytes done for hyperchunks")
 
-    for chunk_item in chunk_list:
-        if not isinstance(chunk_item, list):
-            # convert to a one-element list
-            chunk_locations = [chunk_item, ]
-        else:
-            chunk_locations = chunk_item
+    return chunk_arr
 
-        log.debug(f"getStorBytes processing chunk_locations {chunk_locations}")
-        # get the byte range we'll read from storage
 
-        kwargs = {
-            "filter_ops": filter_ops,
-            "chunk_locations": chunk_locations,
-            "bucket": bucket,
-            "chunk_arr": chunk_arr,
-            "hyper_dims": hyper_dims,
-        }
-        msg = f"get_chunk_bytes - {len(chunk_locations)} h5 chunks"
-        log.debug(msg)
-        tasks.append(getHyperChunks(app, s3key, **kwargs))
-
-    log.debug(f"running asyncio.gather on {len(tasks)} tasks")
-    results = await asyncio.gather(*tasks)
-    log.debug(f"asyncio.gather got {len(results)} results")
-    if len(results) != len(chunk_list):
-        msg = "getStorBytes - unexpected number of gather results, "
-        msg += f"expected: {len(chunk_list)}, got: {len(results)}"
-        log.error(msg)
-        raise HTTPInternalServerError()
+def getShmChunkKey(chunk_id, bucket=None, s3path=None, s3offset=0, s3size=0):
+    """Return key for the chunk in the shared memory chunk cache.
+    For reference layouts the storage location is part of the key, so
+    chunks of a re-linked file don't return stale data."""
+    if s3path:
+        return f"{s3path}:{s3offset}:{s3size}:{chunk_id}"
+    return f"{bucket}/{chunk_id}"
 
-    log.debug("get_chunk_bytes done for hyperchunks")
 
-    return chunk_arr
+def invalidateShmChunk(app, chunk_id, bucket=None):
+    """Remove chunk from the shared memory chunk cache (if used)"""
+    shm_chunk_cache = app.get("shm_chunk_cache")
+    if shm_chunk_cache is not None:
+        shm_chunk_cache.delete(getShmChunkKey(chunk_id, bucket=bucket))
 
 
 async def get_chunk(
@@ -963,11 +956,12 @@ async def get_chunk(
     s3size=0,
     hyper_dims=None,
     chunk_init=False,
+    prefetch=False,
 ):
     """
     Utility method for GET_Chunk, PUT_Chunk, and POST_CHunk
     Get a numpy array for the chunk (possibly initializing a new chunk
-    if requested)
+    if requested).  Set prefetch for chunks that are read ahead of use.
     """
     # if the chunk cache has too many dirty items, wait till items
     # get flushed to S3
@@ -1042,6 +1036,12 @@ async def get_chunk(
     else:
         s3key = getS3Key(chunk_id)
         log.debug(f"getChunk chunkid: {chunk_id} bucket: {bucket}")
+    shm_chunk_cache = app.get("shm_chunk_cache")
+    if shm_chunk_cache is not None and not isVlen(dt):
+        shm_key = getShmChunkKey(chunk_id, bucket=bucket, s3path=s3path,
+                                 s3offset=s3offset, s3size=s3size)
+    else:
+        shm_key = None
     if chunk_id in chunk_cache:
         log.debug(f"getChunk chunkid: {chunk_id} found in cache")
         chunk_arr = chunk_cache[chunk_id]
@@ -1049,7 +1049,17 @@ async def get_chunk(
         # TBD - potential race condition?
         pending_s3_read = app["pending_s3_read"]
 
-        if chunk_id in pending_s3_read:
+        if shm_key is not None:
+            chunk_bytes = shm_chunk_cache.get(shm_key)
+            if chunk_bytes is not None:
+                if len(chunk_bytes) == np.prod(chunk_dims) * dt.itemsize:
+                    log.debug(f"getChunk chunkid: {chunk_id} found in shared memory cache")
+                    chunk_arr = np.frombuffer(chunk_bytes, dtype=dt).reshape(chunk_dims)
+                else:
+                    log.warn(f"unexpected size for {chunk_id} in shared memory cache")
+                    shm_chunk_cache.delete(shm_key)
+
+        if chunk_arr is None and chunk_id in pending_s3_read:
             # already a read in progress, wait for it to complete
             read_start_time = pending_s3_read[chunk_id]
             msg = f"s3 read request for {chunk_id} was requested at: "
@@ -1064,7 +1074,7 @@ async def get_chunk(
             while getNow(app) - read_start_time < store_read_timeout:
                 log.debug("waiting for pending s3 read, sleeping")
                 await asyncio.sleep(store_read_sleep_interval)
-                if chunk_id in chunk_cache:
+                if chunk_cache.isCached(chunk_id):
                     log.info(f"Chunk {chunk_id} has arrived!")
                     chunk_arr = chunk_cache[chunk_id]
                     break
@@ -1092,6 +1102,8 @@ async def get_chunk(
                 }
 
                 chunk_arr = await get_chunk_bytes(app, s3key, **kwargs)
+                if shm_key is not None:
+                    shm_chunk_cache.put(shm_key, chunk_arr)
 
                 if chunk_id in pending_s3_read:
                     # read complete - remove from pending map
@@ -1115,7 +1127,10 @@ async def get_chunk(
 
         if chunk_arr is not None:
             # check that there's room in the cache before adding it
-            if chunk_id in chunk_cache or chunk_cache.memFree >= chunk_arr.size:
+            if prefetch:
+                if chunk_cache.memFree >= chunk_arr.size:
+                    chunk_cache.prefetch(chunk_id, chunk_arr)
+            elif chunk_cache.isCached(chunk_id) or chunk_cache.memFree >= chunk_arr.size:
                 chunk_cache[chunk_id] = chunk_arr  # store in cache
             else:
                 # no room in the cache, just skip caching
@@ -1151,6 +1166,176 @@ async def get_chunk(
     return chunk_arr
 
 
+def getPrefetchChunkIds(app, chunk_id, dset_json):
+    """Record read of the given chunk, and if the dataset is being read
+    sequentially along the first dimension, return the ids of the chunks
+    ahead of it that are in this node's partition"""
+    tracker = app.get("chunk_access_tracker")
+    if tracker is None:
+        return []
+    dims = getShapeDims(dset_json["shape"])
+    chunk_dims = getChunkLayout(dset_json)
+    index = getChunkIndex(chunk_id)
+    if not chunk_dims or len(index) != len(dims):
+        return []
+    dset_id = getDatasetId(chunk_id)
+    extent = -(-dims[0] // chunk_dims[0])  # number of chunks in first dimension
+    node_count = getNodeCount(app)
+    # this node only sees about one in node_count of the chunks of the stream
+    key = (dset_id, tuple(index[1:]))
+    indices = tracker.access(key, index[0], extent=extent, span=node_count)
+    if not indices:
+        return []
+    node_number = getNodeNumber(app)
+    suffix = "".join(f"_{i}" for i in index[1:])
+    chunk_ids = []
+    for i in indices:
+        next_id = getChunkIdForPartition(f"c-{dset_id[2:]}_{i}{suffix}", dset_json)
+        if getObjPartition(next_id, node_count) == node_number:
+            chunk_ids.append(next_id)
+    return chunk_ids
+
+
+async def read_chunktable_selection(app, table_json, slices, bucket=None):
+    """Read selection of a chunk table from the DNs that own its chunks.
+    Chunks that haven't been written are returned as zeros"""
+    table_id = table_json["id"]
+    table_layout = getChunkLayout(table_json)
+    dt = createDataType(table_json["type"])
+    arr = np.zeros(getSelectionShape(slices), dtype=dt)
+    for table_chunk_id in getChunkIds(table_id, slices, table_layout):
+        chunk_sel = getChunkCoverage(table_chunk_id, slices, table_layout)
+        data_sel = getDataCoverage(table_chunk_id, slices, table_layout)
+        table_chunk_id = getChunkIdForPartition(table_chunk_id, table_json)
+        req = getDataNodeUrl(app, table_chunk_id) + "/chunks/" + table_chunk_id
+        params = {"select": getSliceQueryParam(chunk_sel)}
+        if bucket:
+            params["bucket"] = bucket
+        try:
+            data = await http_get(app, req, params=params)
+        except HTTPNotFound:
+            continue
+        arr[data_sel] = bytesToArray(data, dt, getSelectionShape(chunk_sel))
+    return arr
+
+
+async def getChunkTableLocations(app, dset_json, chunkinfo_map, chunk_ids, bucket=None):
+    """Update chunkinfo_map with the storage locations of the given
+    H5D_CHUNKED_REF_INDIRECT chunks.  The chunk ids are expected to differ
+    only in the first dimension"""
+    layout = getDatasetLayout(dset_json)
+    s3path = layout.get("file_uri")
+    chunktable_id = layout.get("chunk_table")
+    if not s3path or not chunktable_id:
+        log.debug("getChunkTableLocations - no file_uri in layout, skipping")
+        return
+    chunk_dims = getChunkLayout(dset_json)
+    hyper_dims = layout.get("hyper_dims", chunk_dims)
+    factors = getHyperChunkFactors(chunk_dims, hyper_dims)
+    table_json = await get_metadata_obj(app, chunktable_id, bucket=bucket)
+    if getDatasetLayoutClass(table_json) in CHUNK_REF_LAYOUTS:
+        log.warn(f"getChunkTableLocations - unexpected layout for chunk table {chunktable_id}")
+        return
+    table_dims = getShapeDims(table_json["shape"])
+    if len(table_dims) != len(chunk_dims):
+        log.warn("getChunkTableLocations - chunk table rank doesn't match dataset")
+        return
+
+    # read the block of the chunk table covering all the chunks
+    indices = [getChunkIndex(chunk_id) for chunk_id in chunk_ids]
+    first = min(index[0] for index in indices)
+    last = max(index[0] for index in indices)
+    slices = [slice(first * factors[0], min((last + 1) * factors[0], table_dims[0]), 1)]
+    for dim in range(1, len(chunk_dims)):
+        start = indices[0][dim] * factors[dim]
+        slices.append(slice(start, min(start + factors[dim], table_dims[dim]), 1))
+    table_arr = await read_chunktable_selection(app, table_json, slices, bucket=bucket)
+
+    num_entries = int(np.prod(factors))
+    for chunk_id, index in zip(chunk_ids, indices):
+        start = (index[0] - first) * factors[0]
+        entries = table_arr[start:start + factors[0]].reshape(-1)
+        if len(entries) != num_entries:
+            continue  # chunk extends beyond the chunk table
+        chunk_item = {"s3path": s3path}
+        if num_entries == 1:
+            chunk_item["s3offset"] = int(entries[0][0])
+            chunk_item["s3size"] = int(entries[0][1])
+        else:
+            chunk_item["s3offset"] = [int(e[0]) for e in entries]
+            chunk_item["s3size"] = [int(e[1]) for e in entries]
+            chunk_item["hyper_dims"] = hyper_dims
+        chunkinfo_map[chunk_id] = chunk_item
+
+
+async def prefetch_chunks(app, chunk_ids, dset_json, bucket=None):
+    """Read the given chunks into the chunk cache"""
+    try:
+        layout_class = getDatasetLayoutClass(dset_json)
+        if layout_class in CHUNK_REF_LAYOUTS:
+            chunkinfo_map = {}
+            if layout_class == "H5D_CHUNKED_REF_INDIRECT":
+                kwargs = {"bucket": bucket}
+                await getChunkTableLocations(app, dset_json, chunkinfo_map, chunk_ids, **kwargs)
+            else:
+                dset_id = dset_json["id"]
+                kwargs = {"bucket": bucket}
+                await getChunkLocations(app, dset_id, dset_json, chunkinfo_map, chunk_ids,
+                                        **kwargs)
+        else:
+            chunkinfo_map = {chunk_id: {"bucket": bucket} for chunk_id in chunk_ids}
+
+        chunk_cache = app["chunk_cache"]
+        pending_s3_read = app["pending_s3_read"]
+        read_ids = []
+        tasks = []
+        for chunk_id in chunk_ids:
+            chunk_item = chunkinfo_map.get(chunk_id)
+            if not chunk_item:
+                continue
+            if "s3path" in chunk_item and not np.sum(chunk_item.get("s3size", 0)):
+                continue  # not allocated
+            if chunk_cache.isCached(chunk_id) or chunk_id in pending_s3_read:
+                continue
+            kwargs = dict(chunk_item)
+            kwargs["prefetch"] = True
+            read_ids.append(chunk_id)
+            tasks.append(get_chunk(app, chunk_id, dset_json, **kwargs))
+        log.debug(f"prefetch_chunks - reading {len(tasks)} chunks")
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        for chunk_id, result in zip(read_ids, results):
+            if isinstance(result, Exception):
+                log.info(f"prefetch of chunk {chunk_id} failed: {result!r}")
+    except Exception as e:
+        log.warn(f"prefetch_chunks - unexpected exception: {e!r}")
+
+
+def schedulePrefetch(app, chunk_id, dset_json, bucket=None):
+    """Start a background read of the chunks that follow the given chunk,
+    if the dataset is being read sequentially"""
+    chunk_ids = getPrefetchChunkIds(app, chunk_id, dset_json)
+    if not chunk_ids:
+        return
+    dt = createDataType(dset_json["type"])
+    if isVlen(dt):
+        return
+    chunk_cache = app["chunk_cache"]
+    chunk_ids = [x for x in chunk_ids if not chunk_cache.isCached(x)]
+    chunk_size = int(np.prod(getChunkLayout(dset_json))) * dt.itemsize
+    # map of in-flight prefetch tasks to the number of bytes they read
+    prefetch_tasks = app["chunk_prefetch_tasks"]
+    budget = app["chunk_prefetch_budget"] - sum(prefetch_tasks.values())
+    budget = min(budget, chunk_cache.memFree)
+    chunk_ids = chunk_ids[:max(budget // chunk_size, 0)]
+    if not chunk_ids:
+        log.debug(f"schedulePrefetch - no budget to read ahead of {chunk_id}")
+        return
+    log.info(f"schedulePrefetch - reading {len(chunk_ids)} chunks ahead of {chunk_id}")
+    task = asyncio.ensure_future(prefetch_chunks(app, chunk_ids, dset_json, bucket=bucket))
+    prefetch_tasks[task] = len(chunk_ids) * chunk_size
+    task.add_done_callback(lambda t: prefetch_tasks.pop(t, None))
+
+
 def save_chunk(app, chunk_id, dset_json, chunk_arr, bucket=None):
     """Persist the given chunk"""
     log.info(f"save_chunk {chunk_id} bucket={bucket}")
@@ -1170,7 +1355,7 @@ def save_chunk(app, chunk_id, dset_json, chunk_arr, bucket=None):
     getFilterOps(app, dset_id, filters, dtype=dtype, chunk_shape=chunk_shape)
 
     chunk_cache = app["chunk_cache"]
-    if chunk_id not in chunk_cache:
+    if not chunk_cache.isCached(chunk_id):
         # check that we have enough room to store the chunk
         # TBD: there could be issues with the free space calculation
         # not working precisely with variable types
@@ -1184,6 +1369,8 @@ def save_chunk(app, chunk_id, dset_json, chunk_arr, bucket=None):
 
     chunk_cache[chunk_id] = chunk_arr
     chunk_cache.setDirty(chunk_id)
+    # the shared memory cache only holds chunks as they are in storage
+    invalidateShmChunk(app, chunk_id, bucket=bucket)
     log.debug(f"chunk cache dirty count: {chunk_cache.dirtyCount}")
 
     # async write to S3
@@ -96,13 +96,33 @@ async def get_collections(app, root_id, bucket=None, max_objects_limit=None):
     return result
 
 
-async def getDomainObjects(app, root_id, include_attrs=False, bucket=None):
+async def getDomainObjects(app, root_id, include_attrs=False, max_objects_limit=None,
+                           bucket=None):
     """Iterate through all objects in heirarchy and add to obj_dict
-    keyed by obj id
+    keyed by obj id.
+    Results are cached keyed on the root scan time, so repeated requests for
+    a domain that hasn't been rescanned or modified don't need to crawl the
+    domain again.
     """
 
     log.info(f"getDomainObjects for root: {root_id}, include_attrs: {include_attrs}")
-    max_objects_limit = int(config.get("domain_req_max_objects_limit", default=500))
+    if not max_objects_limit:
+        max_objects_limit = int(config.get("domain_req_max_objects_limit", default=500))
+
+    scan_time = await getScanTime(app, root_id, bucket=bucket)
+    generation = app["domain_objs_generation"].get(root_id, 0)
+    domain_objs_cache = app["domain_objs_cache"]
+    cache_key = f"{root_id}:{int(include_attrs)}"
+    if scan_time and cache_key in domain_objs_cache:
+        cache_item = domain_objs_cache[cache_key]
+        if cache_item["scan_time"] == scan_time:
+            obj_dict = cache_item["obj_dict"]
+            if len(obj_dict) < max_objects_limit:
+                msg = f"getDomainObjects returning: {len(obj_dict)} objects from cache"
+                log.info(msg)
+                return obj_dict
+        else:
+            log.debug(f"getDomainObjects - cache item for {cache_key} is stale")
 
     kwargs = {
         "action": "get_obj",
@@ -123,6 +143,10 @@ async def getDomainObjects(app, root_id, include_attrs=False, bucket=None):
     else:
         msg = f"getDomainObjects returning: {len(crawler._obj_dict)} objects"
         log.info(msg)
+        if scan_time and app["domain_objs_generation"].get(root_id, 0) == generation:
+            # the domain wasn't modified while it was being crawled
+            cache_item = {"scan_time": scan_time, "obj_dict": crawler._obj_dict}
+            domain_objs_cache[cache_key] = cache_item
         return crawler._obj_dict
 
 
@@ -549,6 +573,17 @@ async def GET_Domain(request):
         log.debug("getting all domain objects")
         root_id = domain_json["root"]
         kwargs = {"include_attrs": include_attrs, "bucket": bucket}
+        if "max_objects_limit" in params:
+            # allow larger domains than domain_req_max_objects_limit,
+            # up to the domain_objs_max_objects_limit config
+            try:
+                max_objects_limit = int(params["max_objects_limit"])
+            except ValueError:
+                msg = "expected int for max_objects_limit"
+                log.warn(msg)
+                raise HTTPBadRequest(reason=msg)
+            limit = int(config.get("domain_objs_max_objects_limit", default=10000))
+            kwargs["max_objects_limit"] = max(1, min(max_objects_limit, limit))
         domain_objs = await getDomainObjects(app, root_id, **kwargs)
         if domain_objs:
             rsp_json["domain_objs"] = domain_objs
@@ -1118,7 +1153,7 @@ async def DELETE_Domain(request):
     if meta_only:
         # remove from domain cache if present
         domain_cache = app["domain_cache"]
-        if domain in domain_cache:
+        if domain_cache.isCached(domain):
             log.info(f"deleting {domain} from domain_cache")
             del domain_cache[domain]
         resp = await jsonResponse(request, {})
@@ -1182,7 +1217,7 @@ async def DELETE_Domain(request):
 
     # remove from domain cache if present
     domain_cache = app["domain_cache"]
-    if domain in domain_cache:
+    if domain_cache.isCached(domain):
         del domain_cache[domain]
 
     resp = await jsonResponse(request, rsp_json)
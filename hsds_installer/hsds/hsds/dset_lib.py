@@ -28,6 +28,7 @@ from .util.hdf5dtype import createDataType, getItemSize
 from .util.httpUtil import http_delete, http_put
 from .util.idUtil import getDataNodeUrl, isSchema2Id, getS3Key, getObjId
 from .util.rangegetUtil import getHyperChunkFactors
+from .util.reduceUtil import mergeReducePartials, mergeEnvelopePartials
 from .util.storUtil import getStorKeys
 
 from .servicenode_lib import getDsetJson, doFlush
@@ -653,6 +654,61 @@ async def doReadSelection(
     return arr
 
 
+async def getSelectionReduction(
+    app,
+    dset_id,
+    dset_json,
+    slices=None,
+    select_dtype=None,
+    envelope=None,
+    bucket=None
+):
+    """Reduce the selected slices on the DNs and return the merged
+    reduction partial (count, mean, m2, min, max).  If envelope is set,
+    return the merged min/max for each bucket of envelope rows instead"""
+    log.debug("getSelectionReduction")
+
+    if slices is None:
+        slices = get_slices(None, dset_json)
+
+    layout = getChunkLayout(dset_json)
+    chunk_ids = getChunkIds(dset_id, slices, layout)
+    log.debug(f"getSelectionReduction - {len(chunk_ids)} chunks")
+
+    chunkinfo = {}
+    await getChunkLocations(app, dset_id, dset_json, chunkinfo, chunk_ids, bucket=bucket)
+    get_chunk_selections(chunkinfo, chunk_ids, slices, dset_json)
+
+    crawler = ChunkCrawler(
+        app,
+        chunk_ids,
+        dset_json=dset_json,
+        chunk_map=chunkinfo,
+        bucket=bucket,
+        slices=slices,
+        select_dtype=select_dtype,
+        envelope=envelope,
+        action="reduce_chunk_hyperslab",
+    )
+    await crawler.crawl()
+
+    crawler_status = crawler.get_status()
+    log.info(f"getSelectionReduction complete - status:  {crawler_status}")
+    if crawler_status == 400:
+        log.info(f"getSelectionReduction raising BadRequest error:  {crawler_status}")
+        raise HTTPBadRequest()
+    if crawler_status not in (200, 201):
+        msg = "getSelectionReduction raising HTTPInternalServerError for status: "
+        msg += f"{crawler_status}"
+        log.info(msg)
+        raise HTTPInternalServerError()
+
+    partials = [chunkinfo[chunk_id]["reduce_rsp"] for chunk_id in chunk_ids]
+    if envelope:
+        return mergeEnvelopePartials(partials)
+    return mergeReducePartials(partials)
+
+
 async def removeChunks(app, chunk_ids, bucket=None):
     """ Remove chunks with the given ids """
 
@@ -9,6 +9,9 @@ import threading
 import logging
 from shutil import which
 
+from . import config
+from .util.shmCache import ShmChunkCache
+
 
 def _enqueue_output(out, queue, loglevel):
     try:
@@ -121,6 +124,7 @@ class HsdsApp:
         self._ready = False
         self._config_dir = config_dir
         self._cmd_dir = get_cmd_dir()
+        self._shm_chunk_cache = None
 
         if logger is None:
             self.log = logging
@@ -232,6 +236,19 @@ class HsdsApp:
                 dn_urls_arg += ","
             dn_urls_arg += dn_url
 
+        shm_chunk_cache_size = int(config.get("shm_chunk_cache_size", default=0))
+        if shm_chunk_cache_size > 0:
+            # create the shared chunk cache here so that it outlives DN restarts
+            kwargs = {
+                "name": config.get("shm_chunk_cache_name", default="hsds_chunk_cache"),
+                "mem_target": shm_chunk_cache_size,
+                "slot_size": int(config.get("max_chunk_size")),
+            }
+            try:
+                self._shm_chunk_cache = ShmChunkCache(**kwargs)
+            except (OSError, ValueError) as e:
+                self.log.warning(f"unable to create shared memory chunk cache: {e}")
+
         pout = subprocess.PIPE  # will pipe to parent
         # create processes for count dn nodes and sn nodes
         count = self._dn_count + 1  # plus 1 for sn
@@ -392,6 +409,9 @@ class HsdsApp:
                 logging.info(f"terminating process {pname}")
                 p.terminate()
         self._processes = {}  # reset
+        if self._shm_chunk_cache is not None:
+            self._shm_chunk_cache.unlink()
+            self._shm_chunk_cache = None
         for t in self._threads:
             del t
         self._threads = []
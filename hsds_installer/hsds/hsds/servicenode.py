@@ -247,6 +247,12 @@ def create_app():
     app["meta_cache"] = LruCache(**kwargs)
     kwargs["name"] = "DomainCache"
     app["domain_cache"] = LruCache(**kwargs)
+    domain_objs_cache_size = int(config.get("domain_objs_cache_size", default=4 * 1024 * 1024))
+    kwargs = {"mem_target": domain_objs_cache_size, "name": "DomainObjsCache"}
+    app["domain_objs_cache"] = LruCache(**kwargs)
+    # root id -> count of modifications seen, so a crawl that overlaps a
+    # modification isn't cached
+    app["domain_objs_generation"] = {}
 
     if config.get("allow_noauth"):
         allow_noauth = config.get("allow_noauth")
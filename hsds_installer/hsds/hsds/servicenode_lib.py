@@ -268,6 +268,22 @@ async def validateAction(app, domain, obj_id, username, action):
         domain_json = await getDomainJson(app, domain, reload=True)
         aclCheck(app, domain_json, action, username)
 
+    if action in ("create", "update", "delete"):
+        invalidateDomainObjects(app, domain_json["root"])
+
+
+def invalidateDomainObjects(app, root_id):
+    """Drop the cached getobjs results for the given root, called when
+    an object in the domain is modified"""
+    generations = app["domain_objs_generation"]
+    generations[root_id] = generations.get(root_id, 0) + 1
+    domain_objs_cache = app["domain_objs_cache"]
+    for include_attrs in (0, 1):
+        cache_key = f"{root_id}:{include_attrs}"
+        if domain_objs_cache.isCached(cache_key):
+            log.debug(f"invalidateDomainObjects - removing {cache_key}")
+            del domain_objs_cache[cache_key]
+
 
 async def getObjectJson(app,
                         obj_id,
@@ -1040,7 +1056,7 @@ async def deleteObject(app, obj_id, bucket=None):
     await http_delete(app, req, params=params)
 
     meta_cache = app["meta_cache"]
-    if obj_id in meta_cache:
+    if meta_cache.isCached(obj_id):
         del meta_cache[obj_id]  # remove from cache
 
 
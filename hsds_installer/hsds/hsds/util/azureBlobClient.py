@@ -1,3 +1,4 @@
+import asyncio
 from inspect import iscoroutinefunction
 from asyncio import CancelledError
 import datetime
@@ -9,6 +10,7 @@ from .. import hsds_logger as log
 from aiohttp.web_exceptions import HTTPNotFound, HTTPForbidden
 from aiohttp.web_exceptions import HTTPInternalServerError, HTTPBadRequest
 from .. import config
+from .rangegetUtil import mergeRanges, splitSpans
 
 CALLBACK_MAX_COUNT = 1000  # compatible with S3 batch size
 
@@ -154,6 +156,23 @@ class AzureBlobClient:
 
         return data
 
+    async def get_object_ranges(self, key, ranges, bucket=None):
+        """Return a list with the data for each (offset, length) range
+        of the object at given key.  Ranges within max_rangeget_gap bytes
+        of each other are fetched with one ranged GET, and the GETs
+        are run concurrently.
+        """
+        max_gap = int(config.get("max_rangeget_gap", default=1024))
+        spans = mergeRanges(ranges, max_gap=max_gap)
+        msg = f"azureBlobClient.get_object_ranges({bucket}/{key}) - "
+        msg += f"{len(ranges)} ranges in {len(spans)} requests"
+        log.info(msg)
+        tasks = []
+        for offset, length, _ in spans:
+            tasks.append(self.get_object(key, bucket=bucket, offset=offset, length=length))
+        span_data = await asyncio.gather(*tasks)
+        return splitSpans(ranges, spans, span_data)
+
     async def put_object(self, key, data, bucket=None):
         """Write data to given key.
         Returns client specific dict on success
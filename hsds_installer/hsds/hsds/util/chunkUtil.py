@@ -346,7 +346,7 @@ def getChunkId(dset_id, point, layout):
 
     for dim in range(rank):
         coord = None
-        if rank == 1:
+        if rank == 1 and np.ndim(point) == 0:
             coord = point  # integer for 1d dataset
         else:
             coord = point[dim]
@@ -1,5 +1,8 @@
 import asyncio
 import hashlib
+import mmap
+import os
+from collections import OrderedDict
 from os import mkdir, rmdir, listdir, stat, remove, walk
 import os.path as pp
 from asyncio import CancelledError
@@ -12,10 +15,34 @@ from .. import hsds_logger as log
 from .. import config
 
 
+def _readRanges(filepath, ranges):
+    """Read each (offset, length) range of the given file"""
+    with open(filepath, "rb") as f:
+        if hasattr(os, "pread"):
+            fd = f.fileno()
+            return [os.pread(fd, length, offset) for offset, length in ranges]
+        # no positional reads on Windows
+        data = []
+        for offset, length in ranges:
+            f.seek(offset)
+            data.append(f.read(length))
+        return data
+
+
+def _copyRanges(view, ranges):
+    """Copy each (offset, length) range out of a memory map view.
+    The view keeps the map open until the copy is done."""
+    try:
+        return [view[offset:offset + length].tobytes() for offset, length in ranges]
+    finally:
+        view.release()
+
+
 class FileClient:
     """
     Utility class for reading and storing data to local files
-    using aiofiles package
+    using aiofiles package.  Range reads (used for reference layouts)
+    are served from a bounded cache of read-only memory maps.
     """
 
     def __init__(self, app):
@@ -31,6 +58,11 @@ class FileClient:
             log.error("FileClient init: root dir most have absolute path")
             raise HTTPInternalServerError()
         self._root_dir = pp.normpath(root_dir)
+        self._mmap_cache_size = int(config.get("posix_mmap_cache_size", default=64))
+        self._mmap_idle_timeout = float(config.get("posix_mmap_idle_timeout", default=60))
+        # filepath -> (st_mtime_ns, st_size, mmap, last_used)
+        self._mmaps = OrderedDict()
+        self._mmap_idle_handle = None
 
     def _validateBucket(self, bucket):
         if not bucket:
@@ -87,6 +119,64 @@ class FileClient:
             raise HTTPNotFound()
         return key_stats
 
+    def _getMmap(self, filepath):
+        """Return a read-only memory map of the given file.
+        Maps are reused while the file's size and mtime are unchanged,
+        returns None for empty files."""
+        file_stats = stat(filepath)
+        mtime_ns = file_stats.st_mtime_ns
+        size = file_stats.st_size
+        if filepath in self._mmaps:
+            mm_mtime_ns, mm_size, mm, _ = self._mmaps[filepath]
+            if mm_mtime_ns == mtime_ns and mm_size == size:
+                self._mmaps[filepath] = (mtime_ns, size, mm, time.time())
+                self._mmaps.move_to_end(filepath)
+                return mm
+            log.debug(f"fileClient - {filepath} has changed, remapping")
+            self._closeMmap(filepath)
+        if size == 0:
+            return None
+        with open(filepath, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mmaps[filepath] = (mtime_ns, size, mm, time.time())
+        while len(self._mmaps) > self._mmap_cache_size:
+            self._closeMmap(next(iter(self._mmaps)))
+        self._scheduleIdleCheck()
+        return mm
+
+    def _scheduleIdleCheck(self):
+        """Arrange for _closeIdleMmaps to run once the idle timeout expires"""
+        if self._mmap_idle_handle is not None or self._mmap_idle_timeout <= 0:
+            return
+        loop = asyncio.get_event_loop()
+        self._mmap_idle_handle = loop.call_later(self._mmap_idle_timeout, self._closeIdleMmaps)
+
+    def _closeIdleMmaps(self):
+        """Close maps that have not been used within the idle timeout, so
+        files are not held open (and locked on Windows) indefinitely"""
+        self._mmap_idle_handle = None
+        now = time.time()
+        # the cache is kept in least recently used order
+        for filepath, (_, _, _, last_used) in list(self._mmaps.items()):
+            if now - last_used < self._mmap_idle_timeout:
+                break
+            log.debug(f"fileClient - closing idle map of {filepath}")
+            self._closeMmap(filepath)
+        if self._mmaps:
+            self._scheduleIdleCheck()
+
+    def _closeMmap(self, filepath):
+        """Remove the memory map for filepath from the cache (if any)"""
+        if filepath not in self._mmaps:
+            return
+        _, _, mm, _ = self._mmaps.pop(filepath)
+        try:
+            mm.close()
+        except BufferError:
+            # a copy out of the map is still in progress, the file will
+            # be unmapped when it finishes
+            log.debug(f"fileClient - deferring unmap of {filepath}")
+
     def _file_stats_increment(self, counter, inc=1):
         """Incremenet the indicated connter"""
         if "file_stats" not in self._app:
@@ -142,13 +232,22 @@ class FileClient:
         loop = asyncio.get_event_loop()
 
         try:
-            async with aiofiles.open(filepath, loop=loop, mode="rb") as f:
-                if offset:
-                    await f.seek(offset)
-                if length > 0:
-                    data = await f.read(length)
-                else:
-                    data = await f.read()
+            mm = None
+            if length > 0 and self._mmap_cache_size > 0:
+                mm = self._getMmap(filepath)
+            if mm is not None:
+                # copy out of the page cache without blocking the event loop
+                view = memoryview(mm)
+                ranges = [(offset, length)]
+                data = (await loop.run_in_executor(None, _copyRanges, view, ranges))[0]
+            else:
+                async with aiofiles.open(filepath, loop=loop, mode="rb") as f:
+                    if offset:
+                        await f.seek(offset)
+                    if length > 0:
+                        data = await f.read(length)
+                    else:
+                        data = await f.read()
             finish_time = time.time()
             msg = f"fileClient.get_object({key} bucket={bucket}) "
             msg += f"start={start_time:.4f} finish={finish_time:.4f} "
@@ -175,6 +274,56 @@ class FileClient:
             raise HTTPInternalServerError()
         return data
 
+    async def get_object_ranges(self, key, ranges, bucket=None):
+        """Return a list with the data for each (offset, length) range
+        of the object at given key.  Ranges are served from the memory map
+        of the file, or else read in one executor call, so gaps between
+        the ranges are never read.
+        """
+        self._validateBucket(bucket)
+        self._validateKey(key)
+
+        filepath = self._getFilePath(bucket, key)
+        log.info(f"get_object_ranges - filepath: {filepath}, {len(ranges)} ranges")
+
+        start_time = time.time()
+        loop = asyncio.get_event_loop()
+
+        try:
+            mm = None
+            if self._mmap_cache_size > 0:
+                mm = self._getMmap(filepath)
+            if mm is not None:
+                view = memoryview(mm)
+                data = await loop.run_in_executor(None, _copyRanges, view, ranges)
+            else:
+                data = await loop.run_in_executor(None, _readRanges, filepath, ranges)
+            finish_time = time.time()
+            msg = f"fileClient.get_object_ranges({key} bucket={bucket}) "
+            msg += f"start={start_time:.4f} finish={finish_time:.4f} "
+            msg += f"elapsed={finish_time - start_time:.4f} "
+            msg += f"ranges={len(ranges)} bytes={sum(len(x) for x in data)}"
+            log.info(msg)
+        except FileNotFoundError:
+            msg = f"fileClient: {key} not found "
+            log.warn(msg)
+            raise HTTPNotFound()
+        except IOError as ioe:
+            msg = f"fileClient: IOError reading {bucket}/{key}: {ioe}"
+            log.warn(msg)
+            raise HTTPInternalServerError()
+        except CancelledError as cle:
+            self._file_stats_increment("error_count")
+            msg = f"CancelledError for get file obj ranges {key}: {cle}"
+            log.error(msg)
+            raise HTTPInternalServerError()
+        except Exception as e:
+            self._file_stats_increment("error_count")
+            msg = f"Unexpected Exception {type(e)} get get_object_ranges {key}: {e}"
+            log.error(msg)
+            raise HTTPInternalServerError()
+        return data
+
     async def put_object(self, key, data, bucket=None):
         """Write data to given key.
         Returns client specific dict on success
@@ -192,6 +341,7 @@ class FileClient:
         start_time = time.time()
         filepath = pp.normpath(self._getFilePath(bucket, key))
         log.debug(f"fileClient.put_object({bucket}/{key} start: {start_time}")
+        self._closeMmap(filepath)
         loop = asyncio.get_event_loop()
         try:
             key_dirs = key.split("/")
@@ -253,6 +403,7 @@ class FileClient:
         start_time = time.time()
         msg = f"fileClient.delete_object({bucket}/{key} start: {start_time}"
         log.debug(msg)
+        self._closeMmap(filepath)
         try:
             log.debug(f"os.remove({filepath})")
             remove(filepath)
@@ -424,4 +575,9 @@ class FileClient:
         (Used for cleanup on application exit)
         """
         await asyncio.sleep(0)  # for async compat
+        if self._mmap_idle_handle is not None:
+            self._mmap_idle_handle.cancel()
+            self._mmap_idle_handle = None
+        for filepath in list(self._mmaps):
+            self._closeMmap(filepath)
         log.info("release fileClient")
@@ -10,10 +10,18 @@
 # request a copy from help@hdfgroup.org.                                     #
 ##############################################################################
 import numpy
+import sys
+import threading
 import time
+from collections import OrderedDict
 
 from .. import hsds_logger as log
 
+# segments of the LRU list
+PROBATION = 0
+PROTECTED = 1
+DIRTY = 2
+
 
 def getArraySize(arr):
     """Return size in bytes of numpy array"""
@@ -23,53 +31,188 @@ def getArraySize(arr):
     return nbytes
 
 
+def getObjSize(obj):
+    """Return estimated memory size in bytes of a JSON-like object
+    (dicts, lists, strings, numbers and numpy arrays)"""
+    nbytes = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            nbytes += getObjSize(k) + getObjSize(v)
+    elif isinstance(obj, (list, tuple, set)):
+        for item in obj:
+            nbytes += getObjSize(item)
+    elif isinstance(obj, numpy.ndarray) and obj.base is not None:
+        # getsizeof only includes the buffer for arrays that own their data
+        nbytes += obj.nbytes
+    return nbytes
+
+
 class Node(object):
     def __init__(self, id, data, mem_size=1024, isdirty=False, prev=None, next=None):
         self._id = id
         self._data = data
         self._mem_size = mem_size
         self._isdirty = isdirty
+        self._segment = PROBATION
+        self._prefetched = False
         self._prev = prev
         self._next = next
         self._last_access = time.time()
 
 
+class NodeList(object):
+    """Doubly linked list of nodes, most recently used at the head"""
+
+    def __init__(self):
+        self.head = None
+        self.tail = None
+        self.mem_size = 0
+
+    def pushFront(self, node):
+        node._prev = None
+        node._next = self.head
+        if self.head is None:
+            self.tail = node
+        else:
+            self.head._prev = node
+        self.head = node
+        self.mem_size += node._mem_size
+
+    def remove(self, node):
+        prev = node._prev
+        next_node = node._next
+        if prev is None:
+            if self.head is not node:
+                raise KeyError("unexpected error")
+            self.head = next_node
+        else:
+            prev._next = next_node
+        if next_node is None:
+            if self.tail is not node:
+                raise KeyError("unexpected error")
+            self.tail = prev
+        else:
+            next_node._prev = prev
+        node._next = node._prev = None
+        self.mem_size -= node._mem_size
+
+    def __iter__(self):
+        node = self.head
+        while node is not None:
+            yield node
+            node = node._next
+
+
 class LruCache(object):
     """LRU cache for Numpy arrays that are read/written from S3
     If name is "ChunkCache", chunk items are assumed by be ndarrays
+
+    Clean nodes are kept in LRU order and are evicted from the tail, dirty
+    nodes are kept in a separate list since they can't be evicted until
+    they are written to storage.
+
+    With policy "slru" the clean nodes are split into a probation and a
+    protected segment.  New items start out in probation and are promoted
+    to the protected segment on their second access, so a large scan of
+    items that are read only once doesn't flush the working set.
+    The protected segment can use up to protected_ratio of mem_target.
+
+    All operations are serialized with a lock, so a cache can be shared
+    with executor threads.
     """
 
-    def __init__(self, mem_target=32 * 1024 * 1024, name="LruCache", expire_time=None):
+    def __init__(self, mem_target=32 * 1024 * 1024, name="LruCache", expire_time=None,
+                 policy="lru", protected_ratio=0.8):
+        if policy not in ("lru", "slru"):
+            raise ValueError(f"unexpected cache policy: {policy}")
         self._hash = {}
-        self._lru_head = None
-        self._lru_tail = None
+        self._probation = NodeList()
+        self._protected = NodeList()
+        self._dirty = OrderedDict()  # dirty nodes, least recently used first
         self._mem_size = 0
         self._dirty_size = 0
         self._mem_target = mem_target
         self._expire_time = expire_time
         self._name = name
-        self._dirty_set = set()
+        self._policy = policy
+        self._protected_target = int(mem_target * protected_ratio)
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.RLock()
+
+    @property
+    def _lru_head(self):
+        """most recently used clean node"""
+        if self._protected.head is not None:
+            return self._protected.head
+        return self._probation.head
+
+    @property
+    def _lru_tail(self):
+        """next clean node to be evicted"""
+        if self._probation.tail is not None:
+            return self._probation.tail
+        return self._protected.tail
+
+    def _nodes(self):
+        """iterate over all nodes, most recently used first"""
+        for node in reversed(self._dirty.values()):
+            yield node
+        for node in self._protected:
+            yield node
+        for node in self._probation:
+            yield node
+
+    def _unlink(self, node):
+        """remove node from the list it's in"""
+        if node._segment == DIRTY:
+            del self._dirty[node._id]
+        elif node._segment == PROTECTED:
+            self._protected.remove(node)
+        else:
+            self._probation.remove(node)
+
+    def _link(self, node, segment):
+        """add node to the front of the given segment"""
+        node._segment = segment
+        if segment == DIRTY:
+            self._dirty[node._id] = node
+        elif segment == PROTECTED:
+            self._protected.pushFront(node)
+            # demote the least recently used protected nodes if the
+            # segment is over its limit
+            while self._protected.mem_size > self._protected_target:
+                tail = self._protected.tail
+                if tail is node:
+                    break
+                self._protected.remove(tail)
+                self._probation.pushFront(tail)
+                tail._segment = PROBATION
+        else:
+            self._probation.pushFront(node)
+
+    def _touch(self, node):
+        """move node to the front of its segment after an access"""
+        if node._segment == DIRTY:
+            self._dirty.move_to_end(node._id)
+            return
+        self._unlink(node)
+        if node._prefetched:
+            # first use of an item that was read ahead
+            node._prefetched = False
+            self._link(node, PROBATION)
+        elif self._policy == "slru":
+            # promote on second access
+            self._link(node, PROTECTED)
+        else:
+            self._link(node, PROBATION)
 
     def _delNode(self, key):
         # remove from LRU
         if key not in self._hash:
             raise KeyError(key)
         node = self._hash[key]
-        prev = node._prev
-        next_node = node._next
-        if prev is None:
-            if self._lru_head != node:
-                raise KeyError("unexpected error")
-            self._lru_head = next_node
-        else:
-            prev._next = next_node
-        if next_node is None:
-            if self._lru_tail != node:
-                raise KeyError("unexpected error")
-            self._lru_tail = prev
-        else:
-            next_node._prev = prev
-        node._next = node._prev = None
+        self._unlink(node)
         log.debug(f"LRU {self._name} node {node._id} removed {self._name}")
         return node
 
@@ -78,24 +221,7 @@ class LruCache(object):
         if key not in self._hash:
             raise KeyError(key)
         node = self._hash[key]
-        if self._lru_head == node:
-            # already the front
-            return node
-        if node._prev is None:
-            raise KeyError("unexpected error")
-        prev = node._prev
-        next_node = node._next
-        node._prev = None
-        node._next = self._lru_head
-        prev._next = next_node
-        self._lru_head._prev = node
-        if next_node is not None:
-            next_node._prev = prev
-        else:
-            if self._lru_tail != node:
-                raise KeyError("unexpected error")
-            self._lru_tail = prev
-        self._lru_head = node
+        self._touch(node)
         return node
 
     def _hasKey(self, key, ignore_expire=False):
@@ -119,17 +245,16 @@ class LruCache(object):
             return True
 
     def __delitem__(self, key):
-        node = self._delNode(key)  # remove from LRU
-        del self._hash[key]  # remove from hash
-        # remove from LRU list
-
-        self._mem_size -= node._mem_size
-        if key in self._dirty_set:
-            log.warning(f"LRU {self._name} removing dirty node: {key}")
-            self._dirty_set.remove(key)
-            self._dirty_size -= node._mem_size
-            if self._dirty_size < 0:
-                self._dirty_size = 0
+        with self._lock:
+            node = self._delNode(key)  # remove from LRU
+            del self._hash[key]  # remove from hash
+
+            self._mem_size -= node._mem_size
+            if node._isdirty:
+                log.warning(f"LRU {self._name} removing dirty node: {key}")
+                self._dirty_size -= node._mem_size
+                if self._dirty_size < 0:
+                    self._dirty_size = 0
 
     def __len__(self):
         """Number of nodes in the cache"""
@@ -137,23 +262,30 @@ class LruCache(object):
 
     def __iter__(self):
         """Iterate over node ids"""
-        node = self._lru_head
-        while node is not None:
-            yield node._id
-            node = node._next
+        with self._lock:
+            ids = [node._id for node in self._nodes()]
+        return iter(ids)
 
     def __contains__(self, key):
-        """Test if key is in the cache"""
-        return self._hasKey(key)
+        """Test if key is in the cache, counting a miss if it isn't.
+        Use isCached for checks that aren't lookups"""
+        with self._lock:
+            if self._hasKey(key):
+                return True
+            self._misses += 1
+            return False
 
     def __getitem__(self, key):
         """Return numpy array from cache"""
         # doing a getitem has the side effect of moving this node
         # up in the LRU list
-        if not self._hasKey(key):
-            raise KeyError(key)
-        node = self._moveToFront(key)
-        return node._data
+        with self._lock:
+            if not self._hasKey(key):
+                self._misses += 1
+                raise KeyError(key)
+            self._hits += 1
+            node = self._moveToFront(key)
+            return node._data
 
     def __setitem__(self, key, data):
         log.debug(f"setitem, key: {key}")
@@ -161,85 +293,76 @@ class LruCache(object):
             # can just compute size for numpy array
             mem_size = getArraySize(data)
         elif isinstance(data, dict):
-            # TBD - come up with a way to get the actual data size
-            # for dict objects
-            mem_size = 1024
+            mem_size = getObjSize(data)
         elif isinstance(data, bytes):
             mem_size = len(data)
         else:
             raise TypeError("Unexpected type for LRUCache")
 
-        if key in self._hash:
-            # key is already in the LRU - update mem size, data and
-            # move to front
-            node = self._hash[key]
-            old_size = self._hash[key]._mem_size
-            mem_delta = node._mem_size - old_size
-            self._mem_size += mem_delta
-            node._data = data
-            node._mem_size = mem_size
-            self._moveToFront(key)
-            if node._isdirty:
-                self._dirty_size += mem_delta
-            node._last_access = time.time()
-            msg = f"LRU {self._name} updated node: {key}, "
-            msg += f"was {old_size} bytes now {node._mem_size} bytes, "
-            msg += f"dirty_size: {self._dirty_size}"
-            log.debug(msg)
-        else:
-            node = Node(key, data, mem_size=mem_size)
-            if self._lru_head is None:
-                self._lru_head = self._lru_tail = node
+        with self._lock:
+            if key in self._hash:
+                # key is already in the LRU - update mem size, data and
+                # move to front
+                node = self._hash[key]
+                old_size = node._mem_size
+                mem_delta = mem_size - old_size
+                self._unlink(node)
+                node._data = data
+                node._mem_size = mem_size
+                node._prefetched = False
+                self._mem_size += mem_delta
+                if node._isdirty:
+                    self._dirty_size += mem_delta
+                    self._link(node, DIRTY)
+                elif self._policy == "slru":
+                    self._link(node, PROTECTED)
+                else:
+                    self._link(node, PROBATION)
+                node._last_access = time.time()
+                msg = f"LRU {self._name} updated node: {key}, "
+                msg += f"was {old_size} bytes now {node._mem_size} bytes, "
+                msg += f"dirty_size: {self._dirty_size}"
+                log.debug(msg)
             else:
-                # newer items go to the front
-                next_node = self._lru_head
-                if next_node._prev is not None:
-                    raise KeyError("unexpected error")
-                node._next = next_node
-                next_node._prev = node
-                self._lru_head = node
-            self._hash[key] = node
-            self._mem_size += node._mem_size
-            msg = f"LRU {self._name} adding {node._mem_size} to cache, "
-            msg += f"mem_size is now: {self._mem_size}"
-            log.debug(msg)
-            if node._isdirty:
-                self._dirty_size += node._mem_size
-                msg = f"LRU {self._name} dirty_size is now: {self._dirty_size}"
+                node = Node(key, data, mem_size=mem_size)
+                self._link(node, PROBATION)
+                self._hash[key] = node
+                self._mem_size += node._mem_size
+                msg = f"LRU {self._name} added new node: {key} "
+                msg += f"[{node._mem_size} bytes], mem_size is now: {self._mem_size}"
                 log.debug(msg)
 
-            msg = f"LRU {self._name} added new node: {key} "
-            msg += f"[{node._mem_size} bytes]"
-            log.debug(msg)
-
-        if self._mem_size > self._mem_target:
-            # set dirty temporarily so we can't remove this node in reduceCache
-            msg = f"LRU {self._name} mem_size greater than target "
-            msg += f"{self._mem_target} reducing cache"
-            log.debug(msg)
-            isdirty = node._isdirty
-            node._isdirty = True
-            self._reduceCache()
-            node._isdirty = isdirty
-
-    def _reduceCache(self):
-        # remove nodes from cache (if not dirty) until we are under
+            if self._mem_size > self._mem_target:
+                msg = f"LRU {self._name} mem_size greater than target "
+                msg += f"{self._mem_target} reducing cache"
+                log.debug(msg)
+                # don't remove the node that was just added
+                self._reduceCache(keep=node)
+
+    def prefetch(self, key, data):
+        """add item that was read ahead of use, the first access of the
+        item doesn't count towards promotion to the protected segment"""
+        with self._lock:
+            if key in self._hash:
+                return
+            self[key] = data
+            if key in self._hash:
+                self._hash[key]._prefetched = True
+
+    def _reduceCache(self, keep=None):
+        # remove clean nodes from cache until we are under
         # memory mem_target
         log.debug(f"LRU {self._name} reduceCache")
 
-        node = self._lru_tail  # start from the back
-        while node is not None:
-            next_node = node._prev
-            if not node._isdirty:
-                log.debug(f"LRU {self._name} removing node: {node._id}")
-                self.__delitem__(node._id)
-                if self._mem_size <= self._mem_target:
-                    msg = f"LRU {self._name} mem_size reduced below target"
-                    log.debug(msg)
-                    break
-            else:
-                pass  # can't remove dirty nodes
-            node = next_node
+        while self._mem_size > self._mem_target:
+            node = self._probation.tail
+            if node is None or node is keep:
+                node = self._protected.tail
+            if node is None or node is keep:
+                break  # only dirty nodes (or keep) left
+            log.debug(f"LRU {self._name} removing node: {node._id}")
+            self.__delitem__(node._id)
+
         if self._mem_size > self._mem_target:
             msg = f"LRU {self._name} mem size of {self._mem_size} "
             msg += f"not reduced below target {self._mem_target}"
@@ -250,62 +373,36 @@ class LruCache(object):
         # remove all nodes from cache
         log.debug(f"LRU {self._name} clearCache")
 
-        node = self._lru_tail  # start from the back
-        while node is not None:
-            next_node = node._prev
-            if node._isdirty:
+        with self._lock:
+            if self._dirty:
                 msg = f"LRU {self._name} found dirty node during clear: "
-                msg += f"{node._id}"
+                msg += f"{next(iter(self._dirty))}"
                 log.error(msg)
                 raise ValueError("Unable to clear cache")
-            log.debug(f"LRU {self._name} removing node: {node._id}")
-            self.__delitem__(node._id)
-            node = next_node
-        self._dirty_size = 0
+            self._hash = {}
+            self._probation = NodeList()
+            self._protected = NodeList()
+            self._mem_size = 0
+            self._dirty_size = 0
         # done clearCache
 
-    def consistencyCheck(self):
-        """verify that the data structure is self-consistent"""
+    def _checkList(self, node_list, segment):
+        """verify links of the given list, return list of ids"""
         id_list = []
-        dirty_count = 0
         mem_usage = 0
-        dirty_usage = 0
-        # walk the LRU list
-        node = self._lru_head
-        node_type = None
-        while node is not None:
+        for node in node_list:
             id_list.append(node._id)
-            if node._id not in self._hash:
-                raise ValueError(f"node: {node._id} not found in hash")
+            if node._segment != segment:
+                raise ValueError(f"node: {node._id} in unexpected segment")
             if node._isdirty:
-                dirty_count += 1
-                if node._id not in self._dirty_set:
-                    msg = f"expected to find id: {node._id} in dirty set"
-                    raise ValueError(msg)
-                dirty_usage += node._mem_size
+                raise ValueError(f"dirty node: {node._id} found in clean list")
             mem_usage += node._mem_size
-            if node_type is None:
-                node_type = type(node._data)
-            else:
-                if not isinstance(node._data, node_type):
-                    raise TypeError("Unexpected datatype")
-            node = node._next
-        # finish forward iteration
-        if len(id_list) != len(self._hash):
-            msg = "unexpected number of elements in forward LRU list"
-            raise ValueError()
-        if dirty_count != len(self._dirty_set):
-            raise ValueError("unexpected number of dirty nodes")
-        if mem_usage != self._mem_size:
-            raise ValueError("unexpected memory size")
-        if dirty_usage != self._dirty_size:
-            raise ValueError("unexpected dirty size")
+        if mem_usage != node_list.mem_size:
+            raise ValueError("unexpected segment memory size")
         # go back through list
-        node = self._lru_tail
+        node = node_list.tail
         pos = len(id_list)
-        reverse_count = 0
         while node is not None:
-            reverse_count += 1
             if pos == 0:
                 raise ValueError(f"unexpected node: {node._id}")
             if node._id != id_list[pos - 1]:
@@ -313,9 +410,41 @@ class LruCache(object):
                 raise ValueError(msg)
             pos -= 1
             node = node._prev
-        if reverse_count != len(id_list):
+        if pos != 0:
             msg = "elements in reverse list do not equal forward list"
             raise ValueError(msg)
+        return id_list
+
+    def consistencyCheck(self):
+        """verify that the data structure is self-consistent"""
+        with self._lock:
+            id_list = self._checkList(self._protected, PROTECTED)
+            id_list.extend(self._checkList(self._probation, PROBATION))
+            if self._policy == "lru" and self._protected.head is not None:
+                raise ValueError("unexpected protected nodes")
+            dirty_usage = 0
+            for key, node in self._dirty.items():
+                id_list.append(key)
+                if not node._isdirty or node._segment != DIRTY:
+                    raise ValueError(f"expected node: {key} to be dirty")
+                dirty_usage += node._mem_size
+            mem_usage = 0
+            node_type = None
+            for key in id_list:
+                if key not in self._hash:
+                    raise ValueError(f"node: {key} not found in hash")
+                node = self._hash[key]
+                mem_usage += node._mem_size
+                if node_type is None:
+                    node_type = type(node._data)
+                elif not isinstance(node._data, node_type):
+                    raise TypeError("Unexpected datatype")
+            if len(id_list) != len(self._hash):
+                raise ValueError("unexpected number of elements in LRU lists")
+            if mem_usage != self._mem_size:
+                raise ValueError("unexpected memory size")
+            if dirty_usage != self._dirty_size:
+                raise ValueError("unexpected dirty size")
         # done - consistencyCheck
 
     def setDirty(self, key):
@@ -323,13 +452,18 @@ class LruCache(object):
         up in the LRU list"""
         log.debug(f"LRU {self._name} set dirty node id: {key}")
 
-        node = self._moveToFront(key)
-        if not node._isdirty:
+        with self._lock:
+            if key not in self._hash:
+                raise KeyError(key)
+            node = self._hash[key]
+            if node._isdirty:
+                self._dirty.move_to_end(key)
+                return
+            self._unlink(node)
+            node._isdirty = True
+            self._link(node, DIRTY)
             self._dirty_size += node._mem_size
             log.debug(f"LRU {self._name} - update dirty_size to: {self._dirty_size}")
-        node._isdirty = True
-
-        self._dirty_set.add(key)
 
     def clearDirty(self, key):
         """clear the dirty flag"""
@@ -338,41 +472,41 @@ class LruCache(object):
         # also, may trigger a memory cleanup
 
         log.debug(f"LRU {self._name} clear dirty node: {key}")
-        node = self._moveToFront(key)
-        if node._isdirty:
+        with self._lock:
+            if key not in self._hash:
+                raise KeyError(key)
+            node = self._hash[key]
+            if not node._isdirty:
+                self._touch(node)
+                return
+            self._unlink(node)
+            node._isdirty = False
             self._dirty_size -= node._mem_size
-        log.debug(f"LRU {self._name} dirty_size: {self._dirty_size}")
-        node._isdirty = False
-
-        if key in self._dirty_set:
-            self._dirty_set.remove(key)
+            log.debug(f"LRU {self._name} dirty_size: {self._dirty_size}")
+            # written items start out in probation, same as new items
+            self._link(node, PROBATION)
             if self._mem_size > self._mem_target:
                 # maybe we can free up some memory now
                 self._reduceCache()
 
+    def isCached(self, key):
+        """test if key is in the cache without counting a lookup"""
+        with self._lock:
+            return self._hasKey(key)
+
     def isDirty(self, key):
         """return dirty flag"""
         # don't adjust LRU position
-        return key in self._dirty_set
+        return key in self._dirty
 
     def dump_lru(self):
         """Return LRU list as a string
         (for debugging)
         """
-        node = self._lru_head
-        s = "->"
-        while node:
-            s += node._id
-            node = node._next
-            if node:
-                s += ","
-        node = self._lru_tail
-        s += "\n<-"
-        while node:
-            s += node._id
-            node = node._prev
-            if node:
-                s += ","
+        with self._lock:
+            ids = [node._id for node in self._nodes()]
+        s = "->" + ",".join(ids)
+        s += "\n<-" + ",".join(reversed(ids))
         s += "\n"
         return s
 
@@ -382,7 +516,7 @@ class LruCache(object):
 
     @property
     def dirtyCount(self):
-        return len(self._dirty_set)
+        return len(self._dirty)
 
     @property
     def memUsed(self):
@@ -402,3 +536,15 @@ class LruCache(object):
     @property
     def memDirty(self):
         return self._dirty_size
+
+    @property
+    def policy(self):
+        return self._policy
+
+    @property
+    def hitCount(self):
+        return self._hits
+
+    @property
+    def missCount(self):
+        return self._misses
@@ -0,0 +1,65 @@
+##############################################################################
+# Copyright by The HDF Group.                                                #
+# All rights reserved.                                                       #
+#                                                                            #
+# This file is part of HSDS (HDF5 Scalable Data Service), Libraries and      #
+# Utilities.  The full HSDS copyright notice, including                      #
+# terms governing use, modification, and redistribution, is contained in     #
+# the file COPYING, which can be found at the root of the source code        #
+# distribution tree.  If you do not have access to this file, you may        #
+# request a copy from help@hdfgroup.org.                                     #
+##############################################################################
+from collections import OrderedDict
+
+
+class SequentialAccessTracker(object):
+    """Detect streams of chunk reads that move forward along the first
+    dimension of a dataset.
+
+    Each stream is identified by a key (e.g. the dataset id and the chunk
+    index in the other dimensions).  Requests for the chunks of one page
+    can arrive out of order and a DN only sees the chunks in its own
+    partition, so an index counts as sequential if it is ahead of the
+    last index by no more than window * span chunks, and indices that are
+    at most window * span chunks behind are ignored.  Once a stream has
+    moved forward, access() returns the indices in the window * span
+    chunks ahead of it that haven't been returned before.
+
+    With span set to the number of partitions the stream is spread over,
+    a partition sees about window of its own chunks in each lookahead.
+    """
+
+    def __init__(self, window=8, max_streams=1000):
+        self._window = window
+        self._max_streams = max_streams
+        self._streams = OrderedDict()  # key -> [last_index, ahead_index]
+
+    def __len__(self):
+        return len(self._streams)
+
+    def access(self, key, index, extent=None, span=1):
+        """record read of chunk index for the given stream, return
+        list of indices to prefetch (less than extent if given)"""
+        window = self._window * max(span, 1)
+        if window <= 0:
+            return []
+        stream = self._streams.get(key)
+        if stream is None:
+            self._streams[key] = [index, index]
+            if len(self._streams) > self._max_streams:
+                self._streams.popitem(last=False)
+            return []
+        self._streams.move_to_end(key)
+        last_index, ahead = stream
+        if 0 <= last_index - index <= window:
+            return []  # re-read or out of order request for the same page
+        if index - last_index > window or index < last_index:
+            # jumped to a new position
+            self._streams[key] = [index, index]
+            return []
+        end = index + window
+        if extent is not None:
+            end = min(end, extent - 1)
+        start = max(index, ahead) + 1
+        self._streams[key] = [index, max(ahead, end)]
+        return list(range(start, end + 1))
@@ -157,3 +157,43 @@ def chunkMunge(h5chunks, max_gap=1024):
         munged = mungier
 
     return munged
+
+
+def mergeRanges(ranges, max_gap=1024):
+    """ given a list of (offset, length) byte ranges, return a list of
+        (offset, length, indices) spans covering all the ranges, where
+        ranges within max_gap bytes of each other share a span and
+        indices lists the positions of the ranges in each span """
+
+    spans = []
+    span_start = span_end = None
+    indices = None
+    for i in sorted(range(len(ranges)), key=lambda i: ranges[i][0]):
+        offset, length = ranges[i]
+        if indices is not None and offset - span_end <= max_gap:
+            span_end = max(span_end, offset + length)
+            indices.append(i)
+            continue
+        if indices is not None:
+            spans.append((span_start, span_end - span_start, indices))
+        span_start = offset
+        span_end = offset + length
+        indices = [i, ]
+    if indices is not None:
+        spans.append((span_start, span_end - span_start, indices))
+    return spans
+
+
+def splitSpans(ranges, spans, span_data):
+    """ given the spans returned by mergeRanges and the bytes read for
+        each span, return a list with the bytes of each of the original
+        ranges (views into span_data, shorter if a span was short) """
+
+    range_data = [None, ] * len(ranges)
+    for (span_start, _, indices), data in zip(spans, span_data):
+        view = memoryview(data)
+        for i in indices:
+            offset, length = ranges[i]
+            n = offset - span_start
+            range_data[i] = view[n:n + length]
+    return range_data
@@ -0,0 +1,215 @@
+##############################################################################
+# Copyright by The HDF Group.                                                #
+# All rights reserved.                                                       #
+#                                                                            #
+# This file is part of HSDS (HDF5 Scalable Data Service), Libraries and      #
+# Utilities.  The full HSDS copyright notice, including                      #
+# terms governing use, modification, and redistribution, is contained in     #
+# the file COPYING, which can be found at the root of the source code        #
+# distribution tree.  If you do not have access to this file, you may        #
+# request a copy from help@hdfgroup.org.                                     #
+##############################################################################
+#
+# reduceUtil.py - helpers for server-side reductions of dataset selections.
+#   DN nodes compute a partial (count, mean, m2, min, max) for the
+#   part of the selection that falls in a chunk, the SN merges the
+#   partials with the pairwise update of Chan et al.
+#   Envelopes (min/max per bucket of rows along the first dimension) are
+#   computed the same way: each DN reduces the buckets that overlap its
+#   chunk and the SN combines buckets that span chunk boundaries.
+#
+
+import math
+import numpy as np
+
+REDUCE_OPS = ("count", "sum", "mean", "min", "max", "var", "std")
+
+
+def getReduceOps(reduce_param):
+    """ Return list of reduction operations for the given comma separated
+    string.  Raise ValueError for unknown operations. """
+    if not reduce_param:
+        raise ValueError("no reduce operations given")
+    ops = []
+    for op in reduce_param.split(","):
+        op = op.strip().lower()
+        if not op:
+            continue
+        if op not in REDUCE_OPS:
+            raise ValueError(f"unsupported reduce operation: {op}")
+        if op not in ops:
+            ops.append(op)
+    if not ops:
+        raise ValueError("no reduce operations given")
+    return ops
+
+
+def isReducibleType(dt):
+    """ Return True if reductions can be performed on the numpy dtype """
+    if dt.names:
+        return False
+    return dt.kind in ("b", "i", "u", "f")
+
+
+def _pyValue(value):
+    """ convert numpy scalar to a JSON-serializable python value """
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def getReducePartial(arr):
+    """ Return the reduction partial for the given numpy array """
+    count = int(arr.size)
+    if count == 0:
+        return {"count": 0, "mean": 0.0, "m2": 0.0, "min": None, "max": None}
+    x = arr.astype(np.float64, copy=False).ravel()
+    mean = float(x.mean())
+    m2 = float(np.square(x - mean).sum())
+    partial = {
+        "count": count,
+        "mean": mean,
+        "m2": m2,
+        "min": _pyValue(arr.min()),
+        "max": _pyValue(arr.max()),
+    }
+    return partial
+
+
+def getFillPartial(fill_value, count):
+    """ Return the reduction partial for count elements of fill_value
+    (i.e. a chunk that has not been written to) """
+    if count == 0:
+        return getReducePartial(np.zeros((0,)))
+    if fill_value is None:
+        value = 0
+    else:
+        value = _pyValue(fill_value.reshape(-1)[0])
+    partial = {
+        "count": int(count),
+        "mean": float(value),
+        "m2": 0.0,
+        "min": value,
+        "max": value,
+    }
+    return partial
+
+
+def mergeReducePartials(partials):
+    """ Combine a list of reduction partials into one """
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    min_value = None
+    max_value = None
+    for partial in partials:
+        n = partial["count"]
+        if not n:
+            continue
+        total = count + n
+        delta = partial["mean"] - mean
+        mean += delta * n / total
+        m2 += partial["m2"] + delta * delta * count * n / total
+        count = total
+        if min_value is None or partial["min"] < min_value:
+            min_value = partial["min"]
+        if max_value is None or partial["max"] > max_value:
+            max_value = partial["max"]
+    return {"count": count, "mean": mean, "m2": m2, "min": min_value, "max": max_value}
+
+
+def getReduceResult(partial, ops):
+    """ Return dict of op name to value for the given (merged) partial.
+    Values other than count are None for an empty selection """
+    count = partial["count"]
+    result = {}
+    for op in ops:
+        if op == "count":
+            result[op] = count
+        elif count == 0:
+            result[op] = None
+        elif op == "sum":
+            result[op] = partial["mean"] * count
+        elif op == "mean":
+            result[op] = partial["mean"]
+        elif op == "min":
+            result[op] = partial["min"]
+        elif op == "max":
+            result[op] = partial["max"]
+        elif op == "var":
+            result[op] = partial["m2"] / count
+        elif op == "std":
+            result[op] = math.sqrt(partial["m2"] / count)
+        else:
+            raise ValueError(f"unsupported reduce operation: {op}")
+    return result
+
+
+def getEnvelopeWidth(extent, num_buckets):
+    """ Return the number of rows per bucket to divide extent rows into
+    at most num_buckets buckets """
+    if num_buckets < 1:
+        raise ValueError("number of buckets must be positive")
+    if extent <= 0:
+        return 1
+    return max(1, -(-extent // num_buckets))
+
+
+def getEnvelopePartial(arr, width, offset=0):
+    """ Return min/max for each bucket of width rows of arr.
+    offset is the position of the first row of arr in the selection, so
+    row i belongs to bucket (offset + i) // width """
+    rows = arr.shape[0] if arr.ndim > 0 else 0
+    if rows == 0 or arr.size == 0:
+        return {"bucket": [], "min": [], "max": []}
+    x = arr.reshape((rows, -1))
+    first = offset // width
+    last = (offset + rows - 1) // width
+    buckets = np.arange(first, last + 1)
+    starts = np.maximum(buckets * width - offset, 0)
+    partial = {
+        "bucket": buckets.tolist(),
+        "min": np.minimum.reduceat(x, starts, axis=0).min(axis=1).tolist(),
+        "max": np.maximum.reduceat(x, starts, axis=0).max(axis=1).tolist(),
+    }
+    return partial
+
+
+def getFillEnvelopePartial(fill_value, rows, width, offset=0):
+    """ Return the envelope partial for rows filled with fill_value """
+    if rows == 0:
+        return {"bucket": [], "min": [], "max": []}
+    if fill_value is None:
+        value = 0
+    else:
+        value = _pyValue(fill_value.reshape(-1)[0])
+    buckets = list(range(offset // width, (offset + rows - 1) // width + 1))
+    partial = {
+        "bucket": buckets,
+        "min": [value] * len(buckets),
+        "max": [value] * len(buckets),
+    }
+    return partial
+
+
+def mergeEnvelopePartials(partials):
+    """ Combine a list of envelope partials into one with sorted buckets """
+    envelope = {}
+    for partial in partials:
+        items = zip(partial["bucket"], partial["min"], partial["max"])
+        for bucket, min_value, max_value in items:
+            if bucket in envelope:
+                item = envelope[bucket]
+                if min_value < item[0]:
+                    item[0] = min_value
+                if max_value > item[1]:
+                    item[1] = max_value
+            else:
+                envelope[bucket] = [min_value, max_value]
+    buckets = sorted(envelope)
+    merged = {
+        "bucket": buckets,
+        "min": [envelope[bucket][0] for bucket in buckets],
+        "max": [envelope[bucket][1] for bucket in buckets],
+    }
+    return merged
@@ -0,0 +1,262 @@
+##############################################################################
+# Copyright by The HDF Group.                                                #
+# All rights reserved.                                                       #
+#                                                                            #
+# This file is part of HSDS (HDF5 Scalable Data Service), Libraries and      #
+# Utilities.  The full HSDS copyright notice, including                      #
+# terms governing use, modification, and redistribution, is contained in     #
+# the file COPYING, which can be found at the root of the source code        #
+# distribution tree.  If you do not have access to this file, you may        #
+# request a copy from help@hdfgroup.org.                                     #
+##############################################################################
+import hashlib
+import os
+import tempfile
+from multiprocessing import shared_memory
+import numpy
+
+from .. import hsds_logger as log
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+MAGIC = b"HSDSSHMC"
+VERSION = 1
+HEADER_SIZE = 64
+PAGE_SIZE = 4096
+HEADER_DT = numpy.dtype([("magic", "S8"), ("version", "<u4"), ("num_slots", "<u4"),
+                         ("slot_size", "<u8"), ("hand", "<u8")])
+SLOT_DT = numpy.dtype([("key", "S16"), ("size", "<i8"), ("ref", "u1")])
+
+
+def _openSharedMemory(name, create=False, size=0):
+    """Open a shared memory segment that outlives this process.
+    Segments are not tracked by the multiprocessing resource tracker,
+    which would otherwise unlink them when the process exits."""
+    try:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    except TypeError:
+        # python < 3.13
+        shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        if os.name != "nt":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class _FileLock(object):
+    """Inter-process lock based on a lock file.
+    The OS releases the lock if the holding process dies."""
+
+    def __init__(self, path):
+        self._f = open(path, "a+b")
+
+    def __enter__(self):
+        if os.name == "nt":
+            self._f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after 10 seconds, keep trying
+        else:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *args):
+        if os.name == "nt":
+            self._f.seek(0)
+            msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+
+    def close(self):
+        self._f.close()
+
+
+class ShmChunkCache(object):
+    """Chunk cache in shared memory that all DN processes on a host can use.
+    The segment is divided into fixed size slots (one chunk per slot), with
+    a slot table holding the hash of each chunk key.  Entries are evicted with
+    the CLOCK algorithm.  Since the segment is not owned by any DN process,
+    the cached chunks survive DN restarts.
+    Access is serialized with a lock file, so the cache should only hold
+    chunks that are not dirty.
+    """
+
+    def __init__(self, name="hsds_chunk_cache", mem_target=0, slot_size=4 * 1024 * 1024):
+        self._name = name
+        self._lock = _FileLock(os.path.join(tempfile.gettempdir(), f"{name}.lock"))
+        self._hits = 0
+        self._misses = 0
+        num_slots = mem_target // slot_size
+        if num_slots < 1:
+            raise ValueError(f"shared memory cache size must be at least {slot_size} bytes")
+        slots_end = HEADER_SIZE + num_slots * SLOT_DT.itemsize
+        data_offset = -(-slots_end // PAGE_SIZE) * PAGE_SIZE
+        with self._lock:
+            try:
+                self._shm = _openSharedMemory(name)
+                created = False
+            except FileNotFoundError:
+                size = data_offset + num_slots * slot_size
+                self._shm = _openSharedMemory(name, create=True, size=size)
+                created = True
+            buf = self._shm.buf
+            self._header = numpy.ndarray((), dtype=HEADER_DT, buffer=buf)
+            if created:
+                self._header["magic"] = MAGIC
+                self._header["version"] = VERSION
+                self._header["num_slots"] = num_slots
+                self._header["slot_size"] = slot_size
+                self._header["hand"] = 0
+            elif self._header["magic"] != MAGIC or self._header["version"] != VERSION:
+                self._release()
+                raise ValueError(f"shared memory segment {name} is not a chunk cache")
+            else:
+                # use the layout of the existing segment
+                num_slots = int(self._header["num_slots"])
+                slot_size = int(self._header["slot_size"])
+                slots_end = HEADER_SIZE + num_slots * SLOT_DT.itemsize
+                data_offset = -(-slots_end // PAGE_SIZE) * PAGE_SIZE
+            self._slots = numpy.ndarray((num_slots,), dtype=SLOT_DT, buffer=buf,
+                                        offset=HEADER_SIZE)
+            if created:
+                self._slots["size"] = -1
+            self._data = buf[data_offset:data_offset + num_slots * slot_size]
+        self._num_slots = num_slots
+        self._slot_size = slot_size
+        msg = f"ShmChunkCache {name} {'created' if created else 'attached'}, "
+        msg += f"{num_slots} slots of {slot_size} bytes"
+        log.info(msg)
+
+    def _digest(self, key):
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+    def _find(self, digest):
+        """return slot index for digest or None (call with lock held)"""
+        indices = numpy.flatnonzero(self._slots["key"] == digest)
+        for index in indices:
+            if self._slots["size"][index] >= 0:
+                return int(index)
+        return None
+
+    def _evict(self):
+        """return index of the slot to reuse, using CLOCK (call with lock held)"""
+        hand = int(self._header["hand"])
+        for _ in range(2 * self._num_slots):
+            index = hand
+            hand = (hand + 1) % self._num_slots
+            if self._slots["size"][index] >= 0 and self._slots["ref"][index]:
+                # recently used, give it a second chance
+                self._slots["ref"][index] = 0
+                continue
+            break
+        self._header["hand"] = hand
+        return index
+
+    def _slotView(self, index, size):
+        start = index * self._slot_size
+        return self._data[start:start + size]
+
+    @property
+    def slotSize(self):
+        return self._slot_size
+
+    @property
+    def numSlots(self):
+        return self._num_slots
+
+    @property
+    def hitCount(self):
+        return self._hits
+
+    @property
+    def missCount(self):
+        return self._misses
+
+    def __contains__(self, key):
+        digest = self._digest(key)
+        with self._lock:
+            return self._find(digest) is not None
+
+    def __len__(self):
+        with self._lock:
+            return int(numpy.count_nonzero(self._slots["size"] >= 0))
+
+    def get(self, key):
+        """return a copy of the bytes stored for key as a bytearray,
+        or None if the key is not in the cache"""
+        digest = self._digest(key)
+        with self._lock:
+            index = self._find(digest)
+            if index is None:
+                self._misses += 1
+                return None
+            size = int(self._slots["size"][index])
+            self._slots["ref"][index] = 1
+            data = bytearray(self._slotView(index, size))
+        self._hits += 1
+        return data
+
+    def put(self, key, data):
+        """store the given bytes (or contiguous array) for key,
+        returns False if data is too large for a slot"""
+        data = memoryview(data).cast("B")
+        size = len(data)
+        if size > self._slot_size:
+            log.debug(f"ShmChunkCache - {key} size {size} exceeds slot size, not cached")
+            return False
+        digest = self._digest(key)
+        with self._lock:
+            index = self._find(digest)
+            if index is None:
+                index = self._evict()
+            self._slots["size"][index] = -1  # invalid while the data is copied
+            self._slotView(index, size)[:] = data
+            self._slots["key"][index] = digest
+            self._slots["ref"][index] = 1
+            self._slots["size"][index] = size
+        return True
+
+    def delete(self, key):
+        """remove key from the cache (if present)"""
+        digest = self._digest(key)
+        with self._lock:
+            index = self._find(digest)
+            if index is not None:
+                self._slots["size"][index] = -1
+                self._slots["key"][index] = b""
+
+    def clear(self):
+        with self._lock:
+            self._slots["size"] = -1
+            self._slots["key"] = b""
+
+    def _release(self):
+        # numpy views into the buffer must go before the segment can be closed
+        self._header = None
+        self._slots = None
+        if getattr(self, "_data", None) is not None:
+            self._data.release()
+            self._data = None
+        self._shm.close()
+
+    def close(self):
+        """detach from the shared memory segment"""
+        self._release()
+        self._lock.close()
+
+    def unlink(self):
+        """detach and remove the shared memory segment"""
+        self._release()
+        if os.name != "nt" and not hasattr(self._shm, "_track"):
+            # python < 3.13: unlink() expects the segment to be
+            # registered with the resource tracker
+            from multiprocessing import resource_tracker
+            resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
+        self._lock.close()
@@ -522,6 +522,21 @@ async def getStorBytes(app,
         return data
 
 
+async def getStorByteRanges(app, key, ranges, bucket=None):
+    """Get the given (offset, length) byte ranges of the object identified
+    by key.  Returns a list with the bytes of each range (fewer bytes for
+    ranges extending past the end of the object)"""
+
+    client = _getStorageClient(app, bucket=bucket)
+    if not bucket:
+        bucket = app["bucket_name"]
+    if key[0] == "/":
+        key = key[1:]  # no leading slash
+    log.info(f"getStorByteRanges({bucket}/{key}, {len(ranges)} ranges)")
+
+    return await client.get_object_ranges(key, ranges, bucket=bucket)
+
+
 async def getHyperChunks(app,
                          key,
                          chunk_arr=None,
@@ -531,38 +546,23 @@ async def getHyperChunks(app,
                          bucket=None
                          ):
 
-    min_offset = None
-    max_offset = None
     rank = len(chunk_arr.shape)
     h5_size = np.prod(hyper_dims) * chunk_arr.dtype.itemsize
-    for item in chunk_locations:
-        if min_offset is None or item.offset < min_offset:
-            min_offset = item.offset
-        if max_offset is None or item.offset + item.length > max_offset:
-            max_offset = item.offset + item.length
-
-    log.debug(f"getHyperChunks - min_offset: {min_offset} max_offset: {max_offset}")
-    item_length = max_offset - min_offset
-    log.debug(f"getHyperChunks - item_length: {item_length}")
-    kwargs = {"offset": min_offset, "length": item_length, "bucket": bucket}
-    data = await getStorBytes(app, key, **kwargs)
-    if not data:
-        log.warn(f"get_chunk_bytes {key} returned no data")
-        return
-    log.debug(f"getHyperChunks: read {len(data)} bytes")
-    if len(data) < item_length:
-        log.warn(f"getHyperChunks, requested: {item_length}, but got: {len(data)} bytes")
+    ranges = [(item.offset, item.length) for item in chunk_locations]
+    range_data = await getStorByteRanges(app, key, ranges, bucket=bucket)
 
     # slot in the data
-    for item in chunk_locations:
-        chunk_offset = item.offset - min_offset
-        if chunk_offset + item.length > len(data):
+    for item, h5_bytes in zip(chunk_locations, range_data):
+        if len(h5_bytes) == 0:
+            log.warn(f"getHyperChunks {key} returned no data for {item}")
+            continue
+        if len(h5_bytes) < item.length:
             # edge chunk
-            chunk_size = len(data) - chunk_offset
-            h5_bytes = bytearray(h5_size)
-            h5_bytes[:chunk_size] = data[chunk_offset:chunk_offset + chunk_size]
-        else:
-            h5_bytes = data[chunk_offset:chunk_offset + item.length]
+            msg = f"getHyperChunks, requested: {item.length}, but got: {len(h5_bytes)} bytes"
+            log.warn(msg)
+            buffer = bytearray(h5_size)
+            buffer[:len(h5_bytes)] = h5_bytes
+            h5_bytes = buffer
         if filter_ops:
             h5_bytes = _uncompress(h5_bytes, **filter_ops)
         hyper_chunk = np.frombuffer(h5_bytes, dtype=chunk_arr.dtype)
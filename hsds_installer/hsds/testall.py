@@ -16,8 +16,9 @@ import sys
 PYTHON_CMD = "python"  # change to "python3" if "python" invokes python version 2.x
 
 unit_tests = ('array_util_test', 'chunk_util_test', 'compression_test', 'domain_util_test',
-              'dset_util_test', 'hdf5_dtype_test', 'id_util_test', 'lru_cache_test',
-              'shuffle_test', 'rangeget_util_test')
+              'dset_util_test', 'file_client_test', 'hdf5_dtype_test', 'id_util_test',
+              'lru_cache_test', 'prefetch_util_test', 'shm_cache_test', 'shuffle_test',
+              'rangeget_util_test', 'reduce_util_test')
 
 integ_tests = ('uptest', 'setup_test', 'domain_test', 'group_test',
                'link_test', 'attr_test', 'datatype_test', 'dataset_test',
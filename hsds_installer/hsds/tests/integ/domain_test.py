@@ -172,6 +172,56 @@ class DomainTest(unittest.TestCase):
         rsp = self.session.get(req, params=params, headers=headers)
         self.assertTrue(rsp.status_code in (403, 404))
 
+    def testGetObjsAfterUpdate(self):
+        # getobjs reflects modifications made before the domain is rescanned
+        domain = self.base_domain + "/getobjs_update.h5"
+        print("testGetObjsAfterUpdate", domain)
+        helper.setupDomain(domain)
+        headers = helper.getRequestHeaders(domain=domain)
+        endpoint = helper.getEndpoint()
+
+        req = endpoint + "/"
+        rsp = self.session.get(req, headers=headers)
+        self.assertEqual(rsp.status_code, 200)
+        root_uuid = json.loads(rsp.text)["root"]
+
+        # create a resizable dataset linked to the root
+        data = {"type": "H5T_STD_I32LE", "shape": [10], "maxdims": [0]}
+        data["link"] = {"id": root_uuid, "name": "dset"}
+        rsp = self.session.post(endpoint + "/datasets", data=json.dumps(data), headers=headers)
+        self.assertEqual(rsp.status_code, 201)
+        dset_id = json.loads(rsp.text)["id"]
+
+        # flush and rescan, so getobjs results can be cached
+        params = {"flush": 1, "rescan": 1}
+        rsp = self.session.put(req, params=params, headers=headers)
+        self.assertEqual(rsp.status_code, 204)
+
+        def getObjs(include_attrs=False):
+            params = {"getobjs": 1, "include_attrs": int(include_attrs)}
+            rsp = self.session.get(req, params=params, headers=headers)
+            self.assertEqual(rsp.status_code, 200)
+            return json.loads(rsp.text)["domain_objs"]
+
+        for include_attrs in (False, True):
+            domain_objs = getObjs(include_attrs)
+            self.assertEqual(domain_objs[dset_id]["shape"]["dims"], [10])
+
+        # extend the dataset and add an attribute
+        shape_req = endpoint + "/datasets/" + dset_id + "/shape"
+        rsp = self.session.put(shape_req, data=json.dumps({"shape": [20]}), headers=headers)
+        self.assertEqual(rsp.status_code, 201)
+        attr_req = endpoint + "/datasets/" + dset_id + "/attributes/attr1"
+        attr_payload = {"type": "H5T_STD_I32LE", "value": 42}
+        rsp = self.session.put(attr_req, data=json.dumps(attr_payload), headers=headers)
+        self.assertEqual(rsp.status_code, 201)
+
+        domain_objs = getObjs()
+        self.assertEqual(domain_objs[dset_id]["shape"]["dims"], [20])
+        domain_objs = getObjs(include_attrs=True)
+        self.assertEqual(domain_objs[dset_id]["shape"]["dims"], [20])
+        self.assertTrue("attr1" in domain_objs[dset_id]["attributes"])
+
     def testPostDomainSingle(self):
         domain = helper.getTestDomain("tall.h5")
         print("testPostDomainSingle", domain)
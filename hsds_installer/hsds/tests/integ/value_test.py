@@ -998,6 +998,30 @@ class ValueTest(unittest.TestCase):
         rsp = self.session.put(req, data=json.dumps(payload), headers=headers)
         self.assertEqual(rsp.status_code, 400)
 
+    def testScalarReduceEnvelope(self):
+        # reduce and envelope requests are not supported for scalar datasets
+        print("testScalarReduceEnvelope", self.base_domain)
+
+        headers = helper.getRequestHeaders(domain=self.base_domain)
+
+        # create a scalar dataset
+        data = {"type": "H5T_IEEE_F64LE", "shape": "H5S_SCALAR"}
+        req = self.endpoint + "/datasets"
+        rsp = self.session.post(req, data=json.dumps(data), headers=headers)
+        self.assertEqual(rsp.status_code, 201)
+        rspJson = json.loads(rsp.text)
+        dset_id = rspJson["id"]
+        self.assertTrue(helper.validateId(dset_id))
+
+        req = self.endpoint + "/datasets/" + dset_id + "/value"
+        payload = {"value": 42.0}
+        rsp = self.session.put(req, data=json.dumps(payload), headers=headers)
+        self.assertEqual(rsp.status_code, 200)
+
+        for params in ({"reduce": "min,max"}, {"envelope": 4}):
+            rsp = self.session.get(req, params=params, headers=headers)
+            self.assertEqual(rsp.status_code, 400)
+
     def testPutCompound(self):
         headers = helper.getRequestHeaders(domain=self.base_domain)
         req = self.endpoint + "/"
@@ -1325,6 +1325,11 @@ class ChunkUtilTest(unittest.TestCase):
         self.assertEqual(chunk_id[2:-2], dset_id[2:])
         self.assertEqual(len(chunk_id), 2 + 36 + 2)
 
+        # rows of a (num_points, 1) point array, as used for chunk table lookups
+        points = np.array([[23], [5]], dtype="u8")
+        self.assertEqual(getChunkId(dset_id, points[0], layout), chunk_id)
+        self.assertTrue(getChunkId(dset_id, points[1], layout).endswith("_0"))
+
         layout = (10, 20)
         chunk_id = getChunkId(dset_id, (23, 61), layout)
         self.assertTrue(chunk_id.startswith("c-"))
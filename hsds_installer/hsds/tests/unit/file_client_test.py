@@ -0,0 +1,143 @@
+##############################################################################
+# Copyright by The HDF Group.                                                #
+# All rights reserved.                                                       #
+#                                                                            #
+# This file is part of HSDS (HDF5 Scalable Data Service), Libraries and      #
+# Utilities.  The full HSDS copyright notice, including                      #
+# terms governing use, modification, and redistribution, is contained in     #
+# the file COPYING, which can be found at the root of the source code        #
+# distribution tree.  If you do not have access to this file, you may        #
+# request a copy from help@hdfgroup.org.                                     #
+##############################################################################
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import sys
+import numpy as np
+
+sys.path.append("../..")
+import hsds.config as config
+from hsds.util.fileClient import FileClient
+
+
+class FileClientTest(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(FileClientTest, self).__init__(*args, **kwargs)
+        # main
+
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp()
+        self.bucket = "testbucket"
+        os.mkdir(os.path.join(self.root_dir, self.bucket))
+        config.get("root_dir")  # make sure config is loaded
+        config.cfg["root_dir"] = self.root_dir
+        config.cfg["posix_mmap_cache_size"] = 2
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+        shutil.rmtree(self.root_dir)
+
+    def _writeFile(self, key, data):
+        with open(os.path.join(self.root_dir, self.bucket, key), "wb") as f:
+            f.write(data)
+
+    def testRangeRead(self):
+        client = FileClient({})
+        arr = np.arange(1000, dtype="i4")
+        self._writeFile("arr", arr.tobytes())
+        get_object = client.get_object
+
+        data = self.loop.run_until_complete(
+            get_object("arr", bucket=self.bucket, offset=40, length=400))
+        # range reads return a copy, not a view that pins the map
+        self.assertTrue(isinstance(data, bytes))
+        self.assertEqual(len(data), 400)
+        self.assertTrue(np.array_equal(np.frombuffer(data, dtype="i4"), arr[10:110]))
+
+        # read past end of file returns the available bytes
+        data = self.loop.run_until_complete(
+            get_object("arr", bucket=self.bucket, offset=3960, length=400))
+        self.assertEqual(len(data), 40)
+
+        # full reads still return bytes
+        data = self.loop.run_until_complete(get_object("arr", bucket=self.bucket))
+        self.assertTrue(isinstance(data, bytes))
+        self.assertEqual(data, arr.tobytes())
+
+        # a rewritten file is remapped
+        time.sleep(0.01)
+        self._writeFile("arr", (arr + 1).tobytes() + b"xyz")
+        data = self.loop.run_until_complete(
+            get_object("arr", bucket=self.bucket, offset=0, length=8))
+        self.assertEqual(np.frombuffer(data, dtype="i4").tolist(), [1, 2])
+
+        self.loop.run_until_complete(client.releaseClient())
+
+    def testRangesRead(self):
+        client = FileClient({})
+        arr = np.arange(1000, dtype="i4")
+        self._writeFile("arr", arr.tobytes())
+        ranges = [(400, 40), (0, 8), (3960, 400), (4000, 10)]
+        expected = [arr[100:110], arr[0:2], arr[990:1000], arr[0:0]]
+
+        for mmap_cache_size in (2, 0):
+            client._mmap_cache_size = mmap_cache_size
+            data = self.loop.run_until_complete(
+                client.get_object_ranges("arr", ranges, bucket=self.bucket))
+            self.assertEqual(len(data), len(ranges))
+            for item, values in zip(data, expected):
+                self.assertTrue(np.array_equal(np.frombuffer(item, dtype="i4"), values))
+
+        self.loop.run_until_complete(client.releaseClient())
+
+    def testMmapCacheLimit(self):
+        client = FileClient({})
+        for i in range(4):
+            self._writeFile(f"obj_{i}", bytes([i]) * 100)
+        for i in range(4):
+            data = self.loop.run_until_complete(
+                client.get_object(f"obj_{i}", bucket=self.bucket, offset=10, length=10))
+            self.assertEqual(data, bytes([i]) * 10)
+        self.assertEqual(len(client._mmaps), 2)
+
+        # empty files fall back to a regular read
+        self._writeFile("empty", b"")
+        data = self.loop.run_until_complete(
+            client.get_object("empty", bucket=self.bucket, offset=0, length=10))
+        self.assertEqual(data, b"")
+
+        # deleting an object drops its map
+        self.loop.run_until_complete(client.delete_object("obj_3", bucket=self.bucket))
+        self.assertEqual(len(client._mmaps), 1)
+        self.loop.run_until_complete(client.releaseClient())
+        self.assertEqual(len(client._mmaps), 0)
+
+    def testMmapIdleTimeout(self):
+        client = FileClient({})
+        client._mmap_idle_timeout = 0.1
+        for i in range(2):
+            self._writeFile(f"obj_{i}", bytes([i]) * 100)
+
+        async def readAndWait():
+            await client.get_object("obj_0", bucket=self.bucket, offset=0, length=10)
+            await asyncio.sleep(0.05)
+            await client.get_object("obj_1", bucket=self.bucket, offset=0, length=10)
+            await asyncio.sleep(0.08)
+            # obj_0 has been idle past the timeout, obj_1 has not
+            self.assertEqual(list(client._mmaps), [client._getFilePath(self.bucket, "obj_1")])
+            await asyncio.sleep(0.15)
+            self.assertEqual(len(client._mmaps), 0)
+            self.assertTrue(client._mmap_idle_handle is None)
+
+        self.loop.run_until_complete(readAndWait())
+        self.loop.run_until_complete(client.releaseClient())
+
+
+if __name__ == "__main__":
+    # setup test files
+
+    unittest.main()
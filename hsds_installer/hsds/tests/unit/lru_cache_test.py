@@ -15,7 +15,7 @@ import sys
 import numpy as np
 
 sys.path.append("../..")
-from hsds.util.lruCache import LruCache
+from hsds.util.lruCache import LruCache, getObjSize
 from hsds.util.idUtil import createObjId
 
 
@@ -265,9 +265,10 @@ class LruCacheTest(unittest.TestCase):
         mem_tgt = cc.memTarget
         self.assertEqual(mem_tgt, 1024 * 10)
         mem_used = cc.memUsed
-        self.assertEqual(mem_used, 1024)  # not based on actual size
+        self.assertEqual(mem_used, getObjSize(data))
+        self.assertTrue(mem_used > len("foo") + len("bar"))
         mem_per = cc.cacheUtilizationPercent
-        self.assertEqual(mem_per, 10)  # have used 10% of target memory
+        self.assertEqual(mem_per, int(mem_used * 100 / (1024 * 10)))
         # try out the dirty flags
         self.assertFalse(cc.isDirty(rand_id))
         self.assertEqual(cc.dirtyCount, 0)
@@ -296,6 +297,155 @@ class LruCacheTest(unittest.TestCase):
         mem_per = cc.cacheUtilizationPercent
         self.assertEqual(mem_per, 0)  # no memory used
 
+    def testObjSize(self):
+        """check size estimate of JSON-like objects"""
+        small = {"id": "g-123", "attributes": {}}
+        large = {"id": "g-123", "attributes": {"a" + str(i): "x" * 100 for i in range(100)}}
+        self.assertTrue(getObjSize(small) < getObjSize(large))
+        self.assertTrue(getObjSize(large) > 100 * 100)
+        arr = np.zeros((100,), dtype="f8")
+        self.assertTrue(getObjSize({"arr": arr}) > arr.nbytes)
+        self.assertTrue(getObjSize({"arr": arr[10:]}) > arr[10:].nbytes)
+
+    def testUpdateSize(self):
+        """check memory accounting when an item is replaced"""
+        cc = LruCache(mem_target=1024 * 1024)
+        id = createObjId("chunks")
+        cc[id] = np.zeros((16,), dtype="i4")
+        self.assertEqual(cc.memUsed, 64)
+        cc.setDirty(id)
+        self.assertEqual(cc.memDirty, 64)
+        cc[id] = np.zeros((64,), dtype="i4")
+        cc.consistencyCheck()
+        self.assertEqual(cc.memUsed, 256)
+        self.assertEqual(cc.memDirty, 256)
+        cc.clearDirty(id)
+        cc[id] = np.zeros((4,), dtype="i4")
+        cc.consistencyCheck()
+        self.assertEqual(cc.memUsed, 16)
+        self.assertEqual(cc.memDirty, 0)
+
+    def testDirtyEviction(self):
+        """dirty items are never evicted, clean items are evicted LRU first"""
+        cc = LruCache(mem_target=1024 * 4)
+        dirty_ids = []
+        for i in range(8):
+            id = createObjId("chunks")
+            cc[id] = np.zeros((256,), dtype="i4")  # 1024 bytes
+            cc.setDirty(id)
+            dirty_ids.append(id)
+        cc.consistencyCheck()
+        self.assertEqual(len(cc), 8)
+        self.assertEqual(cc._lru_tail, None)
+        self.assertEqual(cc.dump_lru().split("\n")[0], "->" + ",".join(reversed(dirty_ids)))
+
+        # the last clean item added stays until more memory is available
+        clean_ids = []
+        for i in range(3):
+            id = createObjId("chunks")
+            cc[id] = np.zeros((256,), dtype="i4")
+            clean_ids.append(id)
+            cc.consistencyCheck()
+        self.assertEqual(len(cc), 9)
+        self.assertTrue(clean_ids[-1] in cc)
+
+        for id in dirty_ids[:5]:
+            cc.clearDirty(id)
+            cc.consistencyCheck()
+        self.assertEqual(cc.dirtyCount, 3)
+        self.assertTrue(cc.memUsed <= cc.memTarget)
+        for id in dirty_ids[5:]:
+            self.assertTrue(id in cc)
+        self.assertFalse(clean_ids[-1] in cc)
+
+    def testSegmentedLRU(self):
+        """a scan of items read once doesn't flush frequently used items"""
+        for policy in ("lru", "slru"):
+            cc = LruCache(mem_target=1024 * 10, policy=policy)
+            hot_ids = []
+            for i in range(4):
+                id = createObjId("chunks")
+                cc[id] = np.zeros((256,), dtype="i4")
+                hot_ids.append(id)
+            for id in hot_ids:
+                cc[id]  # second access
+            for i in range(20):
+                # items that are only added once
+                id = createObjId("chunks")
+                cc[id] = np.zeros((256,), dtype="i4")
+                cc.consistencyCheck()
+            self.assertEqual(len(cc), 10)
+            hits = cc.hitCount
+            for id in hot_ids:
+                if policy == "slru":
+                    self.assertTrue(id in cc)
+                    cc[id]
+                else:
+                    self.assertFalse(id in cc)
+            if policy == "slru":
+                self.assertEqual(cc.hitCount, hits + 4)
+            else:
+                self.assertEqual(cc.missCount, 4)
+            cc.consistencyCheck()
+
+    def testSegmentedLRULimit(self):
+        """protected items are demoted once the segment is full"""
+        cc = LruCache(mem_target=1024 * 10, policy="slru", protected_ratio=0.5)
+        ids = []
+        for i in range(10):
+            id = createObjId("chunks")
+            cc[id] = np.zeros((256,), dtype="i4")
+            cc[id]  # promote
+            ids.append(id)
+            cc.consistencyCheck()
+        self.assertEqual(cc._protected.mem_size, 1024 * 5)
+        self.assertEqual([node._id for node in cc._protected], list(reversed(ids[5:])))
+        self.assertEqual(cc._lru_tail._id, ids[0])
+        self.assertEqual(list(cc), list(reversed(ids)))
+
+    def testLookupStats(self):
+        """a cold read followed by a warm read counts one miss and one hit"""
+        cc = LruCache(mem_target=1024 * 10, policy="slru")
+        id = createObjId("chunks")
+        # cold read, as in getChunk: lookup, wait for pending reads, store
+        self.assertFalse(id in cc)
+        for i in range(3):
+            self.assertFalse(cc.isCached(id))
+        arr = np.zeros((256,), dtype="i4")
+        if cc.isCached(id) or cc.memFree >= arr.size:
+            cc[id] = arr
+        self.assertEqual(cc.missCount, 1)
+        self.assertEqual(cc.hitCount, 0)
+        # warm read
+        self.assertTrue(id in cc)
+        cc[id]
+        self.assertEqual(cc.missCount, 1)
+        self.assertEqual(cc.hitCount, 1)
+        # delete, as in DELETE_Chunk
+        if cc.isCached(id):
+            del cc[id]
+        self.assertFalse(cc.isCached(id))
+        self.assertEqual(cc.missCount, 1)
+
+    def testPrefetch(self):
+        """the first use of a prefetched item doesn't promote it"""
+        cc = LruCache(mem_target=1024 * 10, policy="slru")
+        id = createObjId("chunks")
+        cc.prefetch(id, np.zeros((256,), dtype="i4"))
+        self.assertTrue(cc.isCached(id))
+        self.assertEqual(cc.missCount, 0)
+        self.assertFalse(cc.isCached("xyz"))
+        self.assertEqual(cc.missCount, 0)
+        cc[id]
+        self.assertEqual(cc.hitCount, 1)
+        self.assertEqual(cc._protected.head, None)
+        cc[id]
+        self.assertEqual(cc._protected.head._id, id)
+        # prefetch of an item already in the cache is a no-op
+        cc.prefetch(id, np.ones((256,), dtype="i4"))
+        self.assertEqual(cc[id][0], 0)
+        cc.consistencyCheck()
+
 
 if __name__ == "__main__":
     # setup test files
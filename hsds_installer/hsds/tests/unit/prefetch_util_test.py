@@ -0,0 +1,96 @@
+##############################################################################
+# Copyright by The HDF Group.                                                #
+# All rights reserved.                                                       #
+#                                                                            #
+# This file is part of HSDS (HDF5 Scalable Data Service), Libraries and      #
+# Utilities.  The full HSDS copyright notice, including                      #
+# terms governing use, modification, and redistribution, is contained in     #
+# the file COPYING, which can be found at the root of the source code        #
+# distribution tree.  If you do not have access to this file, you may        #
+# request a copy from help@hdfgroup.org.                                     #
+##############################################################################
+import unittest
+import sys
+
+sys.path.append("../..")
+from hsds.util.prefetchUtil import SequentialAccessTracker
+
+
+class PrefetchUtilTest(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(PrefetchUtilTest, self).__init__(*args, **kwargs)
+        # main
+
+    def testSequential(self):
+        tracker = SequentialAccessTracker(window=4)
+        key = ("d-1", ())
+        self.assertEqual(tracker.access(key, 0), [])
+        self.assertEqual(len(tracker), 1)
+        # moving forward returns the next window
+        self.assertEqual(tracker.access(key, 1), [2, 3, 4, 5])
+        # only indices that haven't been returned before
+        self.assertEqual(tracker.access(key, 2), [6])
+        # gaps (chunks in other partitions) are ok
+        self.assertEqual(tracker.access(key, 5), [7, 8, 9])
+        # out of order requests are ignored
+        self.assertEqual(tracker.access(key, 3), [])
+        self.assertEqual(tracker.access(key, 6), [10])
+        # limited by the dataset extent
+        self.assertEqual(tracker.access(key, 9, extent=12), [11])
+        self.assertEqual(tracker.access(key, 11, extent=12), [])
+
+    def testJump(self):
+        tracker = SequentialAccessTracker(window=2)
+        key = ("d-1", (0,))
+        tracker.access(key, 0)
+        self.assertEqual(tracker.access(key, 10), [])
+        self.assertEqual(tracker.access(key, 11), [12, 13])
+        # jump backwards starts over
+        self.assertEqual(tracker.access(key, 1), [])
+        self.assertEqual(tracker.access(key, 2), [3, 4])
+        # other streams are tracked separately
+        other = ("d-1", (1,))
+        self.assertEqual(tracker.access(other, 3), [])
+        self.assertEqual(tracker.access(other, 4), [5, 6])
+
+    def testPartitioned(self):
+        # chunks spread over 4 nodes, this node owns every index where
+        # part[i] == 0, with gaps wider than the window
+        part = [0, 1, 2, 3, 3, 1, 0, 2, 1, 3, 2, 0, 1, 3, 2, 1, 2, 0, 1, 3, 2, 3, 0, 1]
+        owned = [i for i, p in enumerate(part) if p == 0]
+        self.assertEqual(owned, [0, 6, 11, 17, 22])
+        extent = len(part)
+
+        # without the span every read looks like a jump
+        tracker = SequentialAccessTracker(window=4)
+        key = ("d-1", ())
+        for i in owned:
+            self.assertEqual(tracker.access(key, i, extent=extent), [])
+
+        tracker = SequentialAccessTracker(window=4)
+        self.assertEqual(tracker.access(key, 0, extent=extent, span=4), [])
+        fetched = tracker.access(key, 6, extent=extent, span=4)
+        self.assertEqual(fetched, list(range(7, 23)))
+        # the owned chunks ahead are covered by the prefetch
+        self.assertEqual([i for i in fetched if part[i] == 0], [11, 17, 22])
+        self.assertEqual(tracker.access(key, 11, extent=extent, span=4), [23])
+        # out of order reads within the span are ignored
+        self.assertEqual(tracker.access(key, 3, extent=extent, span=4), [])
+
+    def testLimits(self):
+        tracker = SequentialAccessTracker(window=0)
+        self.assertEqual(tracker.access("a", 0), [])
+        self.assertEqual(tracker.access("a", 1), [])
+        tracker = SequentialAccessTracker(window=4, max_streams=2)
+        for key in ("a", "b", "c"):
+            tracker.access(key, 0)
+        self.assertEqual(len(tracker), 2)
+        # "a" was dropped
+        self.assertEqual(tracker.access("a", 1), [])
+        self.assertEqual(tracker.access("c", 1), [2, 3, 4, 5])
+
+
+if __name__ == "__main__":
+    # setup test files
+
+    unittest.main()
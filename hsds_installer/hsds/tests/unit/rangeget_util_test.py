@@ -17,6 +17,8 @@ sys.path.append("../..")
 from hsds.util.rangegetUtil import (
     ChunkLocation,
     chunkMunge,
+    mergeRanges,
+    splitSpans,
 )
 
 
@@ -81,6 +83,31 @@ class RangegetutilTest(unittest.TestCase):
         except ValueError:
             pass  # expected
 
+    def testMergeRanges(self):
+        self.assertEqual(mergeRanges([]), [])
+
+        ranges = [(300, 40), (100, 25), (340, 30), (200, 35)]
+        spans = mergeRanges(ranges)
+        self.assertEqual(spans, [(100, 270, [1, 3, 0, 2])])
+
+        spans = mergeRanges(ranges, max_gap=0)
+        self.assertEqual(spans, [(100, 25, [1]), (200, 35, [3]), (300, 70, [0, 2])])
+
+        spans = mergeRanges(ranges, max_gap=70)
+        self.assertEqual(spans, [(100, 25, [1]), (200, 170, [3, 0, 2])])
+
+        data = bytes(range(256)) * 2
+        span_data = [data[offset:offset + length] for offset, length, _ in spans]
+        range_data = splitSpans(ranges, spans, span_data)
+        self.assertEqual(len(range_data), len(ranges))
+        for (offset, length), item in zip(ranges, range_data):
+            self.assertEqual(bytes(item), data[offset:offset + length])
+
+        # a short read for the last span gives short ranges
+        span_data[-1] = span_data[-1][:50]
+        range_data = splitSpans(ranges, spans, span_data)
+        self.assertEqual([len(item) for item in range_data], [0, 25, 0, 35])
+
 
 if __name__ == "__main__":
     unittest.main()
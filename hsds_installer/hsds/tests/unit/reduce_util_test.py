@@ -0,0 +1,127 @@
+##############################################################################
+# Copyright by The HDF Group.                                                #
+# All rights reserved.                                                       #
+#                                                                            #
+# This file is part of HSDS (HDF5 Scalable Data Service), Libraries and      #
+# Utilities.  The full HSDS copyright notice, including                      #
+# terms governing use, modification, and redistribution, is contained in     #
+# the file COPYING, which can be found at the root of the source code        #
+# distribution tree.  If you do not have access to this file, you may        #
+# request a copy from help@hdfgroup.org.                                     #
+##############################################################################
+import unittest
+import sys
+import numpy as np
+
+sys.path.append("../..")
+from hsds.util.reduceUtil import (
+    getReduceOps,
+    isReducibleType,
+    getReducePartial,
+    getFillPartial,
+    mergeReducePartials,
+    getReduceResult,
+    getEnvelopeWidth,
+    getEnvelopePartial,
+    getFillEnvelopePartial,
+    mergeEnvelopePartials,
+)
+
+
+class ReduceUtilTest(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(ReduceUtilTest, self).__init__(*args, **kwargs)
+        # main
+
+    def testGetReduceOps(self):
+        self.assertEqual(getReduceOps("mean"), ["mean", ])
+        self.assertEqual(getReduceOps("mean,MAX, min,mean"), ["mean", "max", "min"])
+        for bad in ("", ",", "median", "mean,foo"):
+            with self.assertRaises(ValueError):
+                getReduceOps(bad)
+
+    def testIsReducibleType(self):
+        self.assertTrue(isReducibleType(np.dtype("i4")))
+        self.assertTrue(isReducibleType(np.dtype("f8")))
+        self.assertTrue(isReducibleType(np.dtype("?")))
+        self.assertFalse(isReducibleType(np.dtype("S10")))
+        self.assertFalse(isReducibleType(np.dtype([("a", "i4"), ("b", "f4")])))
+
+    def testMerge(self):
+        rng = np.random.default_rng(42)
+        arr = rng.normal(10.0, 3.0, size=(1000, 4))
+        partials = [getReducePartial(arr[i:i + 150]) for i in range(0, 1000, 150)]
+        partials.append(getReducePartial(arr[0:0]))
+        merged = mergeReducePartials(partials)
+        result = getReduceResult(merged, ["count", "sum", "mean", "min", "max", "var", "std"])
+        self.assertEqual(result["count"], arr.size)
+        self.assertAlmostEqual(result["sum"], arr.sum())
+        self.assertAlmostEqual(result["mean"], arr.mean())
+        self.assertEqual(result["min"], arr.min())
+        self.assertEqual(result["max"], arr.max())
+        self.assertAlmostEqual(result["var"], arr.var())
+        self.assertAlmostEqual(result["std"], arr.std())
+
+    def testIntegerAndFill(self):
+        arr = np.arange(100, dtype="i4")
+        fill_value = np.array([7, ], dtype="i4")
+        partials = [getReducePartial(arr), getFillPartial(fill_value, 50), getFillPartial(None, 0)]
+        result = getReduceResult(mergeReducePartials(partials), ["count", "min", "max", "mean"])
+        expected = np.concatenate([arr, np.full(50, 7, dtype="i4")])
+        self.assertEqual(result["count"], 150)
+        self.assertEqual(result["min"], 0)
+        self.assertEqual(result["max"], 99)
+        self.assertIsInstance(result["max"], int)
+        self.assertAlmostEqual(result["mean"], expected.mean())
+
+        partial = getFillPartial(None, 10)
+        self.assertEqual(partial["min"], 0)
+        self.assertEqual(partial["max"], 0)
+
+    def testEmpty(self):
+        merged = mergeReducePartials([])
+        result = getReduceResult(merged, ["count", "mean", "std"])
+        self.assertEqual(result, {"count": 0, "mean": None, "std": None})
+
+    def testEnvelopeWidth(self):
+        self.assertEqual(getEnvelopeWidth(1000, 10), 100)
+        self.assertEqual(getEnvelopeWidth(1001, 10), 101)
+        self.assertEqual(getEnvelopeWidth(5, 10), 1)
+        self.assertEqual(getEnvelopeWidth(0, 10), 1)
+        with self.assertRaises(ValueError):
+            getEnvelopeWidth(100, 0)
+
+    def testEnvelope(self):
+        rng = np.random.default_rng(7)
+        arr = rng.integers(-1000, 1000, size=(1000, 3), dtype="i4")
+        width = getEnvelopeWidth(arr.shape[0], 7)
+        # chunk boundaries don't line up with the bucket boundaries
+        partials = [getEnvelopePartial(arr[i:i + 130], width, offset=i)
+                    for i in range(0, 1000, 130)]
+        envelope = mergeEnvelopePartials(partials)
+        self.assertEqual(envelope["bucket"], list(range(7)))
+        for b in envelope["bucket"]:
+            rows = arr[b * width:(b + 1) * width]
+            self.assertEqual(envelope["min"][b], rows.min())
+            self.assertEqual(envelope["max"][b], rows.max())
+
+        partial = getEnvelopePartial(arr[0:0], width)
+        self.assertEqual(partial, {"bucket": [], "min": [], "max": []})
+
+    def testFillEnvelope(self):
+        arr = np.arange(10, dtype="f8")
+        fill_value = np.array([-1.0, ])
+        partials = [
+            getEnvelopePartial(arr, 4),
+            getFillEnvelopePartial(fill_value, 6, 4, offset=10),
+        ]
+        envelope = mergeEnvelopePartials(partials)
+        self.assertEqual(envelope["bucket"], [0, 1, 2, 3])
+        self.assertEqual(envelope["min"], [0.0, 4.0, -1.0, -1.0])
+        self.assertEqual(envelope["max"], [3.0, 7.0, 9.0, -1.0])
+
+
+if __name__ == "__main__":
+    # setup test files
+
+    unittest.main()
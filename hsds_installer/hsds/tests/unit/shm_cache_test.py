@@ -0,0 +1,107 @@
+##############################################################################
+# Copyright by The HDF Group.                                                #
+# All rights reserved.                                                       #
+#                                                                            #
+# This file is part of HSDS (HDF5 Scalable Data Service), Libraries and      #
+# Utilities.  The full HSDS copyright notice, including                      #
+# terms governing use, modification, and redistribution, is contained in     #
+# the file COPYING, which can be found at the root of the source code        #
+# distribution tree.  If you do not have access to this file, you may        #
+# request a copy from help@hdfgroup.org.                                     #
+##############################################################################
+import os
+import unittest
+import sys
+import numpy as np
+
+sys.path.append("../..")
+from hsds.util.shmCache import ShmChunkCache
+
+
+class ShmCacheTest(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(ShmCacheTest, self).__init__(*args, **kwargs)
+        # main
+
+    def setUp(self):
+        self.name = f"hsds_shm_cache_test_{os.getpid()}"
+
+    def testSimple(self):
+        cc = ShmChunkCache(name=self.name, mem_target=1024 * 4, slot_size=1024)
+        try:
+            self.assertEqual(cc.numSlots, 4)
+            self.assertEqual(cc.slotSize, 1024)
+            self.assertEqual(len(cc), 0)
+            self.assertFalse("abc" in cc)
+            self.assertEqual(cc.get("abc"), None)
+            self.assertEqual(cc.missCount, 1)
+
+            arr = np.arange(100, dtype="f8").reshape((10, 10))
+            self.assertTrue(cc.put("abc", arr))
+            self.assertTrue("abc" in cc)
+            self.assertEqual(len(cc), 1)
+            data = cc.get("abc")
+            self.assertEqual(cc.hitCount, 1)
+            copy = np.frombuffer(data, dtype="f8").reshape((10, 10))
+            self.assertTrue(np.array_equal(arr, copy))
+            # returned data is a copy that can be modified
+            copy[0, 0] = 42
+            self.assertEqual(np.frombuffer(cc.get("abc"), dtype="f8")[0], 0)
+
+            # too large for a slot
+            self.assertFalse(cc.put("big", b"x" * 2000))
+            self.assertFalse("big" in cc)
+
+            # replace existing item
+            cc.put("abc", b"xyz")
+            self.assertEqual(len(cc), 1)
+            self.assertEqual(bytes(cc.get("abc")), b"xyz")
+
+            cc.delete("abc")
+            self.assertFalse("abc" in cc)
+            self.assertEqual(len(cc), 0)
+            cc.delete("abc")  # no-op
+        finally:
+            cc.unlink()
+
+    def testClockEviction(self):
+        cc = ShmChunkCache(name=self.name, mem_target=1024 * 4, slot_size=1024)
+        try:
+            for i in range(4):
+                cc.put(f"item_{i}", bytes([i]) * 10)
+            self.assertEqual(len(cc), 4)
+            # all items are referenced, so the first is evicted after one sweep
+            cc.put("item_4", b"4")
+            self.assertEqual(len(cc), 4)
+            self.assertFalse("item_0" in cc)
+            # item_1 gets referenced again, item_2 becomes the victim
+            cc.get("item_1")
+            cc.put("item_5", b"5")
+            self.assertTrue("item_1" in cc)
+            self.assertFalse("item_2" in cc)
+            for key in ("item_1", "item_3", "item_4", "item_5"):
+                self.assertTrue(key in cc)
+        finally:
+            cc.unlink()
+
+    def testShared(self):
+        cc = ShmChunkCache(name=self.name, mem_target=1024 * 4, slot_size=1024)
+        try:
+            cc.put("abc", b"abc")
+            # a second instance attaches to the existing segment and
+            # uses its layout
+            other = ShmChunkCache(name=self.name, mem_target=1024 * 1024, slot_size=512)
+            self.assertEqual(other.numSlots, 4)
+            self.assertEqual(other.slotSize, 1024)
+            self.assertEqual(bytes(other.get("abc")), b"abc")
+            other.put("xyz", b"xyz")
+            other.close()
+            self.assertEqual(bytes(cc.get("xyz")), b"xyz")
+        finally:
+            cc.unlink()
+
+
+if __name__ == "__main__":
+    # setup test files
+
+    unittest.main()
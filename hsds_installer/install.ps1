@@ -47,7 +47,28 @@ $watchdogDirs | ForEach-Object { Write-Host " - $_" }
 
 [void][System.Console]::ReadLine()
 
-$watchdogObj = @{ watchdog_dirs = $watchdogDirs }
+# 为每个 Trace 目录在 HSDS 数据目录下创建目录联接，作为链接模式使用的 bucket，HSDS 可直接读取原文件
+New-Item -ItemType Directory -Force -Path $HSDSData | Out-Null
+$linkBuckets = @{}
+$bucketIndex = 0
+foreach ($dir in $watchdogDirs) {
+    $bucketName = "traces$bucketIndex"
+    $bucketPath = Join-Path $HSDSData $bucketName
+    if (Test-Path $bucketPath) {
+        # 只替换之前安装留下的目录联接；rmdir 删除联接本身而不会递归删除目标目录的内容
+        if ((Get-Item $bucketPath -Force).Attributes -band [IO.FileAttributes]::ReparsePoint) {
+            cmd /c rmdir "$bucketPath"
+        } else {
+            Write-Error "$bucketPath already exists and is not a junction; refusing to replace it."
+            exit 1
+        }
+    }
+    New-Item -ItemType Junction -Path $bucketPath -Target $dir | Out-Null
+    $linkBuckets[$dir] = $bucketName
+    $bucketIndex++
+}
+
+$watchdogObj = @{ watchdog_dirs = $watchdogDirs; link_buckets = $linkBuckets }
 $watchdogObj | ConvertTo-Json -Depth 2 | Out-File -Encoding UTF8 $WatchdogConfigFile
 Write-Host "SUCCESS: Saved directories to $WatchdogConfigFile"
 
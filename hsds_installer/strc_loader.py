@@ -0,0 +1,345 @@
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import h5py
+import h5pyd
+import numpy as np
+import requests
+from h5pyd._apps.utillib import expandChunk, get_fillvalue, is_vlen
+
+# ===================== GLOBAL CONST =====================
+MAX_REQUEST_BYTES = 32 * 1024 * 1024   # 单次 PUT /value 的最大字节数（服务器 max_request_size 默认 100m）
+DEFAULT_WRITE_WORKERS = 4              # 同时进行的 PUT /value 请求数（所有文件共享）
+HTTP_TIMEOUT = 300                     # 秒
+MIN_LINK_ELEMENTS = 512                # 元素数少于此值的数据集仍复制数据（与 hsload --link 相同）
+LINK_COMPRESSION = (None, "gzip")      # HSDS 能直接解码的 HDF5 分块压缩方式
+CHUNKTABLE_DTYPE = np.dtype([("offset", np.int64), ("size", np.int32)])
+DOMAIN_OBJECTS_LIMIT = 10000           # 增量更新时 getobjs 一次取回的对象数上限
+
+
+class StrcLoader:
+    """
+    在进程内把 .strc（HDF5）文件写入 HSDS，替代逐文件启动 hsload.exe：
+    用 h5py 读取源文件，通过 h5pyd 创建 domain、组、数据集和属性，
+    数据则以大块二进制 PUT /datasets/<id>/value 写入，
+    各数据集的写请求在共享的线程池中并行执行并复用同一个 keep-alive 会话。
+    """
+
+    def __init__(self, endpoint, username, password, max_workers=DEFAULT_WRITE_WORKERS,
+                 h5clear_path=None):
+        self.endpoint = endpoint
+        self.username = username
+        self.password = password
+        self.h5clear_path = h5clear_path
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def _open_source(self, file_path):
+        """
+        以 SWMR 只读方式打开，录制中的文件也能读到一致的内容。
+        只有错误信息提示使用 h5clear（写入程序未正常关闭文件残留的一致性标志）时才清除标志后重试一次；
+        文件被写入程序锁定等其他错误直接抛出，不能对正在写入的文件执行 h5clear。
+        """
+        try:
+            return h5py.File(file_path, "r", swmr=True)
+        except OSError as e:
+            if "h5clear" not in str(e) or not self.h5clear_path:
+                raise
+        print(f"Detected error on file consistency, trying to reset the flag of {file_path}...")
+        subprocess.run([self.h5clear_path, "-s", file_path], capture_output=True, text=True)
+        return h5py.File(file_path, "r", swmr=True)
+
+    def load(self, file_path, domain, file_uri=None):
+        """
+        把 file_path 写入新的 domain；失败时删除写了一半的 domain 并抛出异常。
+        给出 file_uri（HSDS 存储中指向同一文件的 "<bucket>/<key>"）时使用链接模式：
+        数据集布局直接引用原文件中的分块偏移，只写入元数据和分块表，不复制数据。
+        """
+        with self._open_source(file_path) as fin:
+            # domain 已存在时抛出 409，此时不能删除已有的 domain
+            fout = h5pyd.File(domain, "x", endpoint=self.endpoint,
+                              username=self.username, password=self.password)
+            try:
+                with fout:
+                    writes = self._copy_objects(fin, fout, file_uri)
+                    self._write_all(domain, [(src, dset_id, 0) for src, dset_id in writes])
+            except BaseException:
+                self.delete_domain(domain)
+                raise
+
+    def update(self, file_path, domain, file_uri=None):
+        """
+        把录制中继续增长的 file_path 同步到已存在的 domain，返回是否有变化。
+        复制模式下通过 PUT /datasets/<id>/shape 扩展第一维，只写入新增的行
+        （从上次末尾所在的分块开始，覆盖当时可能尚未写完的分块），新增的组和数据集直接创建。
+        形状变化不是第一维增长（或超出 maxshape）时删除 domain 后完整重写；
+        链接模式下数据仍在原文件中，有变化时重新注册即可（只写元数据，新的数据集 id 也避免读到旧缓存）。
+        """
+        with self._open_source(file_path) as fin:
+            objs = self._get_domain_objects(domain)
+            growth = self._get_growth(fin, objs) if objs is not None else None
+            if growth == []:
+                return False
+            if growth is not None and not file_uri:
+                self._append(fin, domain, growth)
+                return True
+        self.delete_domain(domain)
+        self.load(file_path, domain, file_uri=file_uri)
+        return True
+
+    def _get_domain_objects(self, domain):
+        """GET /?getobjs=1 一次取回所有对象，返回 {路径: 对象 json}（路径与 h5py visititems 相同）"""
+        params = {"domain": domain, "getobjs": 1, "max_objects_limit": DOMAIN_OBJECTS_LIMIT}
+        rsp = self.session.get(self.endpoint + "/", params=params, timeout=HTTP_TIMEOUT)
+        rsp.raise_for_status()
+        rsp_json = rsp.json()
+        objs = rsp_json.get("domain_objs")
+        if objs is None:
+            return None
+        paths = {}
+        stack = [("", rsp_json["root"])]
+        while stack:
+            prefix, obj_id = stack.pop()
+            for title, link in objs.get(obj_id, {}).get("links", {}).items():
+                if link.get("class") != "H5L_TYPE_HARD" or prefix + title in paths:
+                    continue
+                paths[prefix + title] = objs.get(link["id"], {"id": link["id"]})
+                if link["id"].startswith("g-"):
+                    stack.append((prefix + title + "/", link["id"]))
+        return paths
+
+    def _get_growth(self, fin, objs):
+        """
+        返回 [(路径, h5py 对象, 已有对象 json 或 None)]：新增的对象以及第一维增长的数据集；
+        存在无法按追加方式更新的数据集时返回 None。
+        """
+        growth = []
+        incompatible = []
+
+        def visitor(name, obj):
+            if not isinstance(obj, (h5py.Group, h5py.Dataset)):
+                return
+            dst = objs.get(name)
+            if dst is None:
+                growth.append((name, obj, None))
+                return
+            if isinstance(obj, h5py.Group) or not self._is_binary(obj):
+                return
+            shape = dst.get("shape", {})
+            dims = shape.get("dims")
+            if dims is None or tuple(dims) == obj.shape:
+                return
+            maxdims = shape.get("maxdims") or dims
+            extendable = maxdims[0] in (0, "H5S_UNLIMITED") or maxdims[0] >= obj.shape[0]
+            if (extendable and len(dims) == len(obj.shape)
+                    and tuple(dims[1:]) == obj.shape[1:] and obj.shape[0] > dims[0]):
+                growth.append((name, obj, dst))
+            else:
+                incompatible.append(name)
+
+        fin.visititems(visitor)
+        if incompatible:
+            print(f"Datasets {incompatible} can not be appended to, reloading")
+            return None
+        return growth
+
+    def _append(self, fin, domain, growth):
+        writes = []
+        with h5pyd.File(domain, "r+", endpoint=self.endpoint,
+                        username=self.username, password=self.password) as fout:
+            for name, src, dst in growth:
+                if dst is None:
+                    if isinstance(src, h5py.Group):
+                        created = fout.create_group(name)
+                    else:
+                        created = self._create_dataset(fout, name, src)
+                        if created is None:
+                            continue
+                        if self._is_binary(src) and src.size > 0:
+                            writes.append((src, created.id.id, 0))
+                    self._copy_attrs(src, created)
+                    continue
+                # getobjs 的结果可能已过期（SN 缓存），扩展前重新读取当前形状，并使用绝对形状扩展
+                shape_url = f"{self.endpoint}/datasets/{dst['id']}/shape"
+                rsp = self.session.get(shape_url, params={"domain": domain}, timeout=HTTP_TIMEOUT)
+                rsp.raise_for_status()
+                rows = rsp.json()["shape"]["dims"][0]
+                if rows >= src.shape[0]:
+                    continue   # 已由之前的更新扩展
+                rsp = self.session.put(
+                    shape_url,
+                    params={"domain": domain},
+                    json={"shape": [src.shape[0], *src.shape[1:]]},
+                    timeout=HTTP_TIMEOUT,
+                )
+                rsp.raise_for_status()
+                chunk_rows = src.chunks[0] if src.chunks else rows
+                writes.append((src, dst["id"], rows - rows % max(chunk_rows, 1)))
+        self._write_all(domain, writes)
+
+    def _write_all(self, domain, writes):
+        """并行写入 [(数据源, HSDS 数据集 id, 起始行)]，任一请求失败时取消其余请求并抛出异常"""
+        futures = []
+        try:
+            for src, dset_id, start in writes:
+                for begin, stop in self._batches(src, start):
+                    futures.append(self._executor.submit(
+                        self._write_rows, domain, dset_id, src, begin, stop))
+            for future in futures:
+                future.result()
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _copy_objects(self, fin, fout, file_uri=None):
+        """
+        复制组、数据集（不含数据）和属性，返回需要写入数据的 [(数据源, HSDS 数据集 id)]，
+        数据源为 h5py 数据集或（链接模式下的）分块表数组。
+        变长类型与标量数据集直接通过 h5pyd 写入。
+        """
+        writes = []
+        self._copy_attrs(fin, fout)
+
+        def visitor(name, obj):
+            if isinstance(obj, h5py.Group):
+                dst = fout.create_group(name)
+            elif isinstance(obj, h5py.Dataset):
+                link = self._link_layout(fout, obj, file_uri) if file_uri else None
+                if link is not None:
+                    layout, chunktable = link
+                    dst = self._create_dataset(fout, name, obj, layout=layout)
+                    if chunktable is not None:
+                        writes.append(chunktable)
+                else:
+                    dst = self._create_dataset(fout, name, obj)
+                    if dst is None:
+                        return
+                    if self._is_binary(obj) and obj.size > 0:
+                        writes.append((obj, dst.id.id))
+            else:
+                return
+            self._copy_attrs(obj, dst)
+
+        fin.visititems(visitor)
+        return writes
+
+    @staticmethod
+    def _copy_attrs(src, dst):
+        for name in src.attrs:
+            dst.attrs[name] = src.attrs[name]
+
+    @staticmethod
+    def _is_binary(src):
+        """定长类型的非标量数据集以二进制 PUT /value 写入"""
+        return bool(src.shape) and not src.dtype.hasobject and not is_vlen(src.dtype)
+
+    def _is_linkable(self, src):
+        if not self._is_binary(src) or src.size < MIN_LINK_ELEMENTS:
+            return False
+        if src.compression not in LINK_COMPRESSION or src.fletcher32 or src.scaleoffset:
+            return False
+        return src.id.get_create_plist().get_layout() != h5py.h5d.COMPACT
+
+    def _link_layout(self, fout, src, file_uri):
+        """
+        返回 (layout, 分块表写入项)，数据集无法链接时返回 None。
+        分块数据集使用 H5D_CHUNKED_REF_INDIRECT：分块表为匿名数据集，每项是原文件中的
+        (offset, size)；一维的小分块按 hsload 的规则合并为 hyper chunk，一次范围读取即可。
+        """
+        if not self._is_linkable(src):
+            return None
+        if src.chunks is None:
+            offset = src.id.get_offset()
+            if offset is None:
+                return None   # 尚未分配存储
+            layout = {"class": "H5D_CONTIGUOUS_REF", "file_uri": file_uri,
+                      "offset": offset, "size": src.id.get_storage_size()}
+            return layout, None
+        table = self._get_chunktable(src)
+        table_dset = fout.create_dataset(None, shape=table.shape, dtype=CHUNKTABLE_DTYPE)
+        layout = {"class": "H5D_CHUNKED_REF_INDIRECT", "file_uri": file_uri,
+                  "dims": list(src.chunks), "chunk_table": table_dset.id.id}
+        if len(src.chunks) == 1:
+            dims = expandChunk(src.chunks, src.shape, src.dtype.itemsize)
+            if tuple(dims) != tuple(src.chunks):
+                layout["hyper_dims"] = list(src.chunks)
+                layout["dims"] = list(dims)
+        return layout, (table, table_dset.id.id)
+
+    @staticmethod
+    def _get_chunktable(src):
+        """读取各分块在文件中的 (offset, size)，未分配的分块为 (0, 0)"""
+        table_shape = tuple(-(extent // -chunk) for extent, chunk in zip(src.shape, src.chunks))
+        table = np.zeros(table_shape, dtype=CHUNKTABLE_DTYPE)
+
+        def visit(info):
+            index = tuple(o // c for o, c in zip(info.chunk_offset, src.chunks))
+            table[index] = (info.byte_offset, info.size)
+
+        if hasattr(src.id, "chunk_iter"):
+            src.id.chunk_iter(visit)
+        else:
+            for i in range(src.id.get_num_chunks()):
+                visit(src.id.get_chunk_info(i))
+        return table
+
+    def _create_dataset(self, fout, name, src, layout=None):
+        if src.shape is None:
+            print(f"Skipping dataset {name} with null dataspace")
+            return None
+        if not self._is_binary(src):
+            return fout.create_dataset(name, data=src[()])
+        kwargs = {"shape": src.shape, "dtype": src.dtype, "maxshape": src.maxshape}
+        if layout is not None:
+            kwargs["chunks"] = layout
+        elif src.chunks and len(src.chunks) == 1:
+            # 与 hsload 相同，过小的一维分块合并为 HSDS 合适的大小
+            kwargs["chunks"] = expandChunk(src.chunks, src.shape, src.dtype.itemsize)
+        elif src.chunks:
+            kwargs["chunks"] = src.chunks
+        if src.compression:
+            kwargs["compression"] = src.compression
+            kwargs["compression_opts"] = src.compression_opts
+            kwargs["shuffle"] = src.shuffle
+        fillvalue = get_fillvalue(src)
+        if fillvalue is not None:
+            kwargs["fillvalue"] = fillvalue
+        return fout.create_dataset(name, **kwargs)
+
+    @staticmethod
+    def _batches(src, start=0):
+        """把第一维 [start, 行数) 切分为不超过 MAX_REQUEST_BYTES 的 [begin, stop) 行区间"""
+        row_bytes = src.dtype.itemsize * int(np.prod(src.shape[1:], dtype=np.int64))
+        rows = max(1, MAX_REQUEST_BYTES // max(row_bytes, 1))
+        return [(begin, min(begin + rows, src.shape[0]))
+                for begin in range(start, src.shape[0], rows)]
+
+    def _write_rows(self, domain, dset_id, src, start, stop):
+        data = src[start:stop]
+        dims = [f"{start}:{stop}"] + [f"0:{extent}" for extent in src.shape[1:]]
+        rsp = self.session.put(
+            f"{self.endpoint}/datasets/{dset_id}/value",
+            params={"domain": domain, "select": "[" + ",".join(dims) + "]"},
+            data=np.ascontiguousarray(data).tobytes(),
+            headers={"Content-Type": "application/octet-stream"},
+            timeout=HTTP_TIMEOUT,
+        )
+        rsp.raise_for_status()
+
+    def delete_domain(self, domain):
+        try:
+            rsp = self.session.delete(self.endpoint + "/", params={"domain": domain},
+                                      timeout=HTTP_TIMEOUT)
+            if rsp.status_code not in (200, 404):
+                print(f"Error removing incomplete domain {domain}: {rsp.status_code}")
+        except requests.RequestException as e:
+            print(f"Error removing incomplete domain {domain}: {e}")
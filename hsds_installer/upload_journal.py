@@ -0,0 +1,95 @@
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+
+JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "upload_journal.db")
+HASH_BLOCK_SIZE = 1024 * 1024          # 内容哈希读取文件开头和结尾各 1 MB
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    path         TEXT PRIMARY KEY,
+    size         INTEGER,
+    mtime        REAL,
+    content_hash TEXT,
+    domain       TEXT,
+    status       TEXT,
+    updated      REAL
+);
+"""
+
+
+def file_signature(file_path):
+    """返回 (size, mtime, content_hash)；哈希只取大小及首尾数据块，不必读完整个 trace 文件"""
+    stat = os.stat(file_path)
+    digest = hashlib.blake2b(str(stat.st_size).encode(), digest_size=16)
+    with open(file_path, "rb") as f:
+        digest.update(f.read(HASH_BLOCK_SIZE))
+        if stat.st_size > HASH_BLOCK_SIZE:
+            f.seek(max(HASH_BLOCK_SIZE, stat.st_size - HASH_BLOCK_SIZE))
+            digest.update(f.read(HASH_BLOCK_SIZE))
+    return stat.st_size, stat.st_mtime, digest.hexdigest()
+
+
+class UploadJournal:
+    """
+    本地上传记录（SQLite，默认位于安装目录下的 upload_journal.db），线程安全。
+    每个文件记录 size、mtime、内容哈希、domain 以及状态：
+    "uploading"（开始写入，进程中断后仍保持该状态）、"completed" 或 "failed"。
+    启动时只需比较 size/mtime 即可跳过已上传的文件，未完成的上传会被重新执行。
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, file_path):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime, content_hash, domain, status FROM uploads WHERE path = ?",
+                (file_path,)).fetchone()
+        if row is None:
+            return None
+        return {"size": row[0], "mtime": row[1], "content_hash": row[2],
+                "domain": row[3], "status": row[4]}
+
+    def completed(self):
+        """返回所有已完整上传的文件 {path: (size, mtime)}，启动扫描时一次查询即可"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime FROM uploads WHERE status = 'completed'").fetchall()
+        return {path: (size, mtime) for path, size, mtime in rows}
+
+    def paths_for_domain(self, domain):
+        """返回记录为上传到 domain 的所有文件路径"""
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM uploads WHERE domain = ?", (domain,)).fetchall()
+        return [row[0] for row in rows]
+
+    def record(self, file_path, domain, status, size=None, mtime=None, content_hash=None):
+        """写入或更新记录；未给出的 size/mtime/content_hash 保留原值"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO uploads (path, size, mtime, content_hash, domain, status, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET "
+                "size = COALESCE(excluded.size, size), "
+                "mtime = COALESCE(excluded.mtime, mtime), "
+                "content_hash = COALESCE(excluded.content_hash, content_hash), "
+                "domain = excluded.domain, status = excluded.status, updated = excluded.updated",
+                (file_path, size, mtime, content_hash, domain, status, time.time()))
+
+    def counts(self):
+        """返回 {status: 文件数}"""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM uploads GROUP BY status").fetchall()
+        return dict(rows)
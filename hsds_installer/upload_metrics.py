@@ -0,0 +1,177 @@
+import os
+import time
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MB = 1024 * 1024
+
+# 直方图分桶上限
+DURATION_BUCKETS = (0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600, 1800)          # 秒
+LATENCY_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)          # 秒
+SIZE_BUCKETS = (1 * MB, 10 * MB, 50 * MB, 100 * MB, 500 * MB, 1024 * MB, 4096 * MB)  # 字节
+THROUGHPUT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500)                       # MB/s
+
+
+class Histogram:
+    """Prometheus 风格的累积直方图（非线程安全，由 UploadMetrics 加锁）"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # 最后一个为 +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name, labels=""):
+        sep = "," if labels else ""
+        total = 0
+        for bound, n in zip(self.buckets + ("+Inf",), self.counts):
+            total += n
+            yield f'{name}_bucket{{{labels}{sep}le="{bound}"}} {total}'
+        suffix = f"{{{labels}}}" if labels else ""
+        yield f"{name}_sum{suffix} {self.sum:g}"
+        yield f"{name}_count{suffix} {self.count}"
+
+
+class UploadMetrics:
+    """
+    上传进度与吞吐量统计：每个文件结束后输出一行汇总，
+    同时以 Prometheus 文本格式提供计数器、队列深度和耗时/大小/吞吐量/延迟直方图。
+    延迟指文件最后一次修改（录制关闭）到 domain 可查询的时间。
+    """
+
+    STATUSES = ("completed", "updated", "skipped", "failed")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.retries = 0
+        self.bytes_uploaded = 0
+        self.started = time.time()
+        self.duration = {status: Histogram(DURATION_BUCKETS) for status in self.STATUSES}
+        self.file_size = Histogram(SIZE_BUCKETS)
+        self.throughput = Histogram(THROUGHPUT_BUCKETS)
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.last_success = 0.0
+
+    def record(self, status, nbytes=0, duration=None, mtime=None):
+        """记录一个文件的结果；duration 为上传耗时（秒），mtime 为文件最后修改时间"""
+        now = time.time()
+        with self._lock:
+            if status == "completed":
+                self.completed += 1
+                self.bytes_uploaded += nbytes
+            elif status == "updated":
+                self.updated += 1
+            elif status == "skipped":
+                self.skipped += 1
+            else:
+                status = "failed"
+                self.failed += 1
+            if duration is not None:
+                self.duration[status].observe(duration)
+            if status == "completed":
+                self.file_size.observe(nbytes)
+                if duration:
+                    self.throughput.observe(nbytes / MB / duration)
+            if status in ("completed", "updated"):
+                self.last_success = now
+                if mtime is not None:
+                    self.latency.observe(max(now - mtime, 0.0))
+
+    def record_retry(self):
+        """记录一次对之前失败或中断的上传的重试"""
+        with self._lock:
+            self.retries += 1
+
+    def summary(self, queued, active):
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-6)
+            mb = self.bytes_uploaded / MB
+            return (f"Upload progress: {self.completed} uploaded, {self.updated} updated, "
+                    f"{self.skipped} skipped, {self.failed} failed, "
+                    f"{active} in progress, {queued} queued; "
+                    f"{mb:.1f} MB total, {mb / elapsed:.2f} MB/s since start")
+
+    def render(self, gauges=None):
+        """返回 Prometheus 文本格式；gauges 为额外的 {指标名: (说明, 当前值)}（如队列深度）"""
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            metric("watchdog_uploads_total", "counter", "Files processed by the upload workers.")
+            for status in self.STATUSES:
+                lines.append(f'watchdog_uploads_total{{status="{status}"}} {getattr(self, status)}')
+            metric("watchdog_upload_retries_total", "counter",
+                   "Uploads resumed after a failed or interrupted attempt.")
+            lines.append(f"watchdog_upload_retries_total {self.retries}")
+            metric("watchdog_uploaded_bytes_total", "counter", "Bytes of trace files fully uploaded.")
+            lines.append(f"watchdog_uploaded_bytes_total {self.bytes_uploaded}")
+            metric("watchdog_start_time_seconds", "gauge", "Unix time the watchdog started.")
+            lines.append(f"watchdog_start_time_seconds {self.started:.3f}")
+            metric("watchdog_last_success_time_seconds", "gauge",
+                   "Unix time of the last successful upload or update.")
+            lines.append(f"watchdog_last_success_time_seconds {self.last_success:.3f}")
+            metric("watchdog_upload_duration_seconds", "histogram", "Wall time per file.")
+            for status in self.STATUSES:
+                lines.extend(self.duration[status].lines("watchdog_upload_duration_seconds",
+                                                         f'status="{status}"'))
+            metric("watchdog_upload_file_bytes", "histogram", "Size of fully uploaded files.")
+            lines.extend(self.file_size.lines("watchdog_upload_file_bytes"))
+            metric("watchdog_upload_throughput_mb_per_second", "histogram",
+                   "Throughput of full uploads.")
+            lines.extend(self.throughput.lines("watchdog_upload_throughput_mb_per_second"))
+            metric("watchdog_upload_latency_seconds", "histogram",
+                   "Time from the last file modification until the domain is queryable.")
+            lines.extend(self.latency.lines("watchdog_upload_latency_seconds"))
+
+        for name, (help_text, value) in (gauges or {}).items():
+            metric(name, "gauge", help_text)
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path, text):
+    """原子地写入 Prometheus textfile（先写临时文件再替换）"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def start_metrics_server(port, render, host="127.0.0.1"):
+    """
+    在后台线程中启动 HTTP 服务，GET /metrics 返回 render() 的结果。
+    默认只监听本机，返回 server 对象（调用 shutdown() 停止）。
+    """
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass   # 不把每次抓取写入运行日志
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,11 +1,11 @@
 
 import os
-import subprocess
 import threading
 import time
+import heapq
+import itertools
 import requests
 from datetime import datetime, timedelta
-from queue import Queue
 import base64
 import sys
 import logging
@@ -45,33 +45,181 @@ DEFAULT_SAMPLE_FREQUENCY = 4000
 GLOBAL_ENDPOINT = "http://localhost:5101"  # self-deployed hsds
 
 TRACE_PATH = os.path.join(os.path.dirname(__file__), "trace_path.json")
-def load_watchdog_dirs(trace_path=TRACE_PATH):
+DEFAULT_UPLOAD_WORKERS = 4             # 并发上传数，可在 trace_path.json 中用 "upload_workers" 配置
+DEFAULT_METRICS_PORT = 9109            # 指标端口，可在 trace_path.json 中用 "metrics_port" 配置
+
+def load_watchdog_config(trace_path=TRACE_PATH):
     try:
         with open(trace_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            dirs = data.get("watchdog_dirs", [])
-            if not isinstance(dirs, list):
-                raise ValueError("配置文件格式错误，'watchdog_dirs' 应为列表。")
-            return dirs
+            return json.load(f)
     except Exception as e:
         print(f"ERROR 无法加载配置文件 '{trace_path}'：{e}")
+        return {}
+
+def load_watchdog_dirs(trace_path=TRACE_PATH):
+    dirs = load_watchdog_config(trace_path).get("watchdog_dirs", [])
+    if not isinstance(dirs, list):
+        print(f"ERROR 配置文件 '{trace_path}' 格式错误，'watchdog_dirs' 应为列表。")
         return []
+    return dirs
+
+def load_upload_workers(trace_path=TRACE_PATH):
+    workers = load_watchdog_config(trace_path).get("upload_workers", DEFAULT_UPLOAD_WORKERS)
+    try:
+        return max(1, int(workers))
+    except (TypeError, ValueError):
+        print(f"ERROR 配置文件 '{trace_path}' 中 'upload_workers' 应为整数，使用默认值 {DEFAULT_UPLOAD_WORKERS}。")
+        return DEFAULT_UPLOAD_WORKERS
+
+def load_link_buckets(trace_path=TRACE_PATH):
+    """
+    "link_buckets": {"<监控目录>": "<bucket>"}，bucket 为 HSDS root_dir 下指向该目录的文件夹（目录联接）。
+    配置了 bucket 的目录中的文件以链接模式注册，HSDS 直接读取原文件，不复制数据。
+    """
+    buckets = load_watchdog_config(trace_path).get("link_buckets", {})
+    if not isinstance(buckets, dict):
+        print(f"ERROR 配置文件 '{trace_path}' 格式错误，'link_buckets' 应为字典。")
+        return {}
+    return {os.path.normcase(os.path.abspath(path)): bucket for path, bucket in buckets.items()}
+
+def load_metrics_port(trace_path=TRACE_PATH):
+    port = load_watchdog_config(trace_path).get("metrics_port", DEFAULT_METRICS_PORT)
+    try:
+        return int(port or 0)
+    except (TypeError, ValueError):
+        print(f"ERROR 配置文件 '{trace_path}' 中 'metrics_port' 应为整数，使用默认值 {DEFAULT_METRICS_PORT}。")
+        return DEFAULT_METRICS_PORT
 
 WATCHDOG_DIRS = load_watchdog_dirs()
+UPLOAD_WORKERS = load_upload_workers()
+LINK_BUCKETS = load_link_buckets()
+WATCHDOG_RECURSIVE = bool(load_watchdog_config().get("recursive", False))  # 是否包含子目录
+# 规范化后的监控目录，较长（嵌套更深）的在前
+WATCHDOG_ROOTS = sorted({os.path.normcase(os.path.abspath(path)) for path in WATCHDOG_DIRS}, key=len, reverse=True)
+# Prometheus 指标：METRICS_PORT 为本机 HTTP 端口（0 表示关闭），METRICS_FILE 为 textfile 输出路径
+METRICS_PORT = load_metrics_port()
+METRICS_FILE = load_watchdog_config().get("metrics_file")
 
 #=======================Background Upload Queue===========================
-upload_queue = Queue()
+
+from upload_metrics import UploadMetrics, start_metrics_server, write_metrics_file
+
+class UploadQueue:
+    """
+    上传队列：按文件修改时间优先上传最新的文件，
+    同一路径在排队过程中不会被重复加入；上传过程中再次加入的路径在本次上传结束后重新排队。
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._queued = set()
+        self._active = set()
+        self._rerun = set()     # 上传过程中又有新事件的路径
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, file_path):
+        try:
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            mtime = time.time()
+        with self._cond:
+            if file_path in self._queued:
+                return False
+            if file_path in self._active:
+                # 正在上传（如 on_live 更新），结束后需要再上传一次最新内容
+                self._rerun.add(file_path)
+                return True
+            self._push(file_path, mtime)
+            return True
+
+    def _push(self, file_path, mtime):
+        self._queued.add(file_path)
+        heapq.heappush(self._heap, (-mtime, next(self._counter), file_path))
+        self._cond.notify()
+
+    def get(self):
+        """阻塞直到有文件可上传；队列关闭后返回 None"""
+        with self._cond:
+            while not self._heap and not self._closed:
+                self._cond.wait()
+            if not self._heap:
+                return None
+            _, _, file_path = heapq.heappop(self._heap)
+            self._queued.discard(file_path)
+            self._active.add(file_path)
+            return file_path
+
+    def task_done(self, file_path):
+        with self._cond:
+            self._active.discard(file_path)
+            if file_path in self._rerun:
+                self._rerun.discard(file_path)
+                try:
+                    mtime = os.path.getmtime(file_path)
+                except OSError:
+                    return   # 文件已被删除
+                self._push(file_path, mtime)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def counts(self):
+        with self._cond:
+            return len(self._heap), len(self._active)
+
+
+upload_queue = UploadQueue()
+upload_metrics = UploadMetrics()
+watchdog_handlers = []
+
+def render_metrics():
+    queued, active = upload_queue.counts()
+    pending = sum(len(handler) for handler in watchdog_handlers)
+    return upload_metrics.render({
+        "watchdog_upload_queue_depth": ("Files waiting in the upload queue.", queued),
+        "watchdog_uploads_in_progress": ("Files currently being uploaded.", active),
+        "watchdog_files_pending": ("Files still being written, waiting to become stable.", pending),
+    })
 
 def upload_worker():
     while True:
         file_path = upload_queue.get()
-        if file_path is None:  
+        if file_path is None:
             break
-        default_upload_callback(file_path)
-        upload_queue.task_done()
-
-worker_thread = threading.Thread(target=upload_worker, daemon=True)
-worker_thread.start()
+        start = time.time()
+        try:
+            nbytes = os.path.getsize(file_path)
+            mtime = os.path.getmtime(file_path)
+        except OSError:
+            nbytes, mtime = 0, None
+        try:
+            status = default_upload_callback(file_path)
+            upload_metrics.record(status, nbytes, time.time() - start, mtime)
+            if status == "updated":
+                print(f"Updated {file_path} in {time.time() - start:.1f} s")
+            elif status == "completed":
+                print(f"Uploaded {file_path} ({nbytes / (1024 * 1024):.1f} MB) in {time.time() - start:.1f} s")
+        except Exception as e:
+            upload_metrics.record("failed", nbytes, time.time() - start)
+            print(f"Upload of {file_path} failed: {e}")
+        finally:
+            upload_queue.task_done(file_path)
+        print(upload_metrics.summary(*upload_queue.counts()))
+        if METRICS_FILE:
+            try:
+                write_metrics_file(METRICS_FILE, render_metrics())
+            except OSError as e:
+                print(f"Error writing metrics file {METRICS_FILE}: {e}")
+
+worker_threads = []
+for _ in range(UPLOAD_WORKERS):
+    worker_thread = threading.Thread(target=upload_worker, daemon=True)
+    worker_thread.start()
+    worker_threads.append(worker_thread)
 
 
 
@@ -82,169 +230,332 @@ worker_thread.start()
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
-HSLOAD_PATH = r"C:\Sioux\hsds_installer\venv\Scripts\hsload.exe"
-HSLS_PATH = r"C:\Sioux\hsds_installer\venv\Scripts\hsls.exe"
+from strc_loader import StrcLoader
+from upload_journal import UploadJournal, file_signature
+
+H5CLEAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bin", "h5clear.exe")
+HTTP_TIMEOUT = 30
+LIVE_UPDATE_INTERVAL = 30               # 秒，录制中的文件每隔多久增量上传一次
+
+http_session = requests.Session()
+http_session.auth = (ADMIN_USERNAME, ADMIN_PASSWORD)
+loader = StrcLoader(GLOBAL_ENDPOINT, ADMIN_USERNAME, ADMIN_PASSWORD, h5clear_path=H5CLEAR_PATH)
+journal = UploadJournal()
+domain_lock = threading.Lock()
+active_domains = {}                     # domain -> 正在上传到该 domain 的文件
+
+class FileDebouncer:
+    """
+    线程安全的去抖调度器：每个文件在最后一次修改 debounce_interval 秒后视为稳定并回调 on_stable。
+    最小堆中每个文件只保留一个到期时间，连续的修改事件只更新最后修改时间，
+    到期时若文件又被修改则按新的时间重新入堆；调度线程只在最早的到期时间醒来。
+    持续写入超过 live_interval 秒的文件每隔 live_interval 回调一次 on_live（增量上传）。
+    """
+
+    def __init__(self, on_stable, on_live, debounce_interval=1, live_interval=LIVE_UPDATE_INTERVAL):
+        self.on_stable = on_stable
+        self.on_live = on_live
+        self.debounce_interval = debounce_interval
+        self.live_interval = live_interval
+        self._files = {}   # {file_path: [last_modification_time, next_live_update_time]}
+        self._heap = []    # [(deadline, seq, file_path)]
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _deadline(self, state):
+        return min(state[0] + self.debounce_interval, state[1])
+
+    def touch(self, file_path, now=None):
+        """记录一次修改，返回文件是否为新加入（之前不在等待中）"""
+        now = time.time() if now is None else now
+        with self._cond:
+            state = self._files.get(file_path)
+            if state is not None:
+                state[0] = now
+                return False
+            state = [now, now + self.live_interval]
+            self._files[file_path] = state
+            deadline = self._deadline(state)
+            heapq.heappush(self._heap, (deadline, next(self._counter), file_path))
+            if self._heap[0][2] == file_path:
+                self._cond.notify()
+            return True
+
+    def __contains__(self, file_path):
+        with self._cond:
+            return file_path in self._files
+
+    def __len__(self):
+        with self._cond:
+            return len(self._files)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    now = time.time()
+                    if self._heap and self._heap[0][0] <= now:
+                        break
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+                if self._stopped:
+                    return
+                _, _, file_path = heapq.heappop(self._heap)
+                state = self._files[file_path]
+                if now >= state[0] + self.debounce_interval:
+                    del self._files[file_path]
+                    callback = self.on_stable
+                else:
+                    callback = None
+                    if now >= state[1]:
+                        state[1] = now + self.live_interval
+                        callback = self.on_live
+                    heapq.heappush(self._heap, (self._deadline(state), next(self._counter), file_path))
+            if callback is not None:
+                try:
+                    callback(file_path)
+                except Exception as e:
+                    print(f"Error scheduling upload of {file_path}: {e}")
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
 
 class HDF5UploadHandler(FileSystemEventHandler):
-    def __init__(self, upload_callback, debounce_interval=1):
+    def __init__(self, upload_callback, debounce_interval=1, live_interval=LIVE_UPDATE_INTERVAL):
 
         self.upload_callback = upload_callback
         self.debounce_interval = debounce_interval
-        self.pending_files = {}  # {file_path: last_modification_time}
-        self._stop_event = threading.Event()
-        self._checker_thread = threading.Thread(target=self._check_pending_files)
-        self._checker_thread.daemon = True
-        self._checker_thread.start()
+        self._debouncer = FileDebouncer(self._on_stable, self._on_live,
+                                        debounce_interval=debounce_interval, live_interval=live_interval)
 
     def on_created(self, event):
         if event.is_directory:
             return
         if event.src_path.lower().endswith('.strc'):
             print("Detected new file (created):", event.src_path)
-            self.pending_files[event.src_path] = time.time()
+            self._debouncer.touch(event.src_path)
 
     def on_modified(self, event):
         if event.is_directory:
             return
         if event.src_path.lower().endswith('.strc'):
-            if event.src_path not in self.pending_files:
+            if self._debouncer.touch(event.src_path):
                 print("Detected file modification:", event.src_path)
-            self.pending_files[event.src_path] = time.time()
-
-    def _check_pending_files(self):
-        while not self._stop_event.is_set():
-            now = time.time()
-            for file_path, last_mod in list(self.pending_files.items()):
-                if now - last_mod >= self.debounce_interval:
-                    print(f"File {file_path} is stable for {self.debounce_interval} seconds, uploading...")
-                    upload_queue.put(file_path)  
-                    del self.pending_files[file_path]
-            time.sleep(1)
+
+    def schedule(self, file_path):
+        """把文件交给去抖调度，稳定后加入上传队列"""
+        self._debouncer.touch(file_path)
+
+    def _on_stable(self, file_path):
+        print(f"File {file_path} is stable for {self.debounce_interval} seconds, uploading...")
+        upload_queue.put(file_path)
+
+    def _on_live(self, file_path):
+        # 仍在录制的文件定期增量上传新增的数据
+        print(f"File {file_path} is still being written, uploading new data...")
+        upload_queue.put(file_path)
+
+    def __len__(self):
+        return len(self._debouncer)
 
     def stop(self):
-        self._stop_event.set()
-        self._checker_thread.join()
+        self._debouncer.stop()
 
-def start_watchdog_for_dirs(dirs, upload_callback, debounce_interval=3):
+def start_watchdog_for_dirs(dirs, upload_callback, debounce_interval=3, recursive=False):
 
     observers = []
     handler = HDF5UploadHandler(upload_callback, debounce_interval=debounce_interval)
+    watchdog_handlers.append(handler)
     for path_to_watch in dirs:
         observer = Observer()
-        observer.schedule(handler, path=path_to_watch, recursive=False)
+        observer.schedule(handler, path=path_to_watch, recursive=recursive)
         observer.start()
         observers.append((observer, handler))
         print(f"Started monitoring directory: {path_to_watch}")
     return observers
 
-def domain_exists(domain):
-    try:
-        result = subprocess.run([
-            HSLS_PATH,
-            "-e", GLOBAL_ENDPOINT,
-            "-u", ADMIN_USERNAME,
-            "-p", ADMIN_PASSWORD,
-            DOMAIN_PREFIX
-        ],
-                                capture_output=True, text=True, check=True)
-        print(f"hsls output:\n{result.stdout}")
-        return domain in result.stdout
-    except subprocess.CalledProcessError as e:
-        print(f"Error running hsls: {e}")
-        print(f"hsls stderr: {e.stderr}")
-        return False
+def get_domain_last_modified(domain):
+    """直接 GET /?domain= 检查 domain，返回其 lastModified，不存在时返回 None；请求失败时抛出异常"""
+    rsp = http_session.get(GLOBAL_ENDPOINT + "/", params={"domain": domain}, timeout=HTTP_TIMEOUT)
+    if rsp.status_code in (404, 410):
+        return None
+    rsp.raise_for_status()
+    return rsp.json().get("lastModified", 0)
+
+def get_link_uri(file_path):
+    """返回文件在 HSDS 存储中的 "<bucket>/<相对路径>"，所在目录未配置 bucket 时返回 None"""
+    path = os.path.abspath(file_path)
+    for folder, bucket in LINK_BUCKETS.items():
+        if os.path.normcase(path).startswith(folder + os.sep):
+            return f"{bucket}/" + path[len(folder) + 1:].replace(os.sep, "/")
+    return None
+
+def get_domain_name(file_path):
+    """
+    返回文件对应的 domain：监控目录下的文件为 DOMAIN_PREFIX + 文件名，
+    子目录中的文件用 "__" 连接相对路径的各级名称，如 a/b/x.strc -> /home/admin/a__b__x.strc。
+    """
+    path = os.path.abspath(file_path)
+    for folder in WATCHDOG_ROOTS:
+        if os.path.normcase(path).startswith(folder + os.sep):
+            return DOMAIN_PREFIX + "__".join(path[len(folder) + 1:].split(os.sep))
+    return DOMAIN_PREFIX + os.path.basename(path)
+
+def claim_domain(file_path, domain):
+    """
+    登记 file_path 正在上传到 domain。domain 已属于另一个仍存在的文件时
+    （如两个监控目录中的同名文件）抛出 ValueError，避免两个文件互相覆盖或追加数据。
+    """
+    with domain_lock:
+        owner = active_domains.get(domain)
+        if owner is None:
+            for path in journal.paths_for_domain(domain):
+                if path != file_path and os.path.exists(path):
+                    owner = path
+                    break
+        if owner is not None and owner != file_path:
+            raise ValueError(f"domain {domain} is already used by {owner}, not uploading {file_path}")
+        active_domains[domain] = file_path
+
+def release_domain(domain):
+    with domain_lock:
+        active_domains.pop(domain, None)
 
 def default_upload_callback(file_path):
+    """
+    上传单个文件，返回 "completed"、"updated"（增量追加）或 "skipped"（domain 已是最新），
+    失败时抛出异常。上传状态记录在本地 journal 中，未完成的上传会删除残留的 domain 后重新执行。
+    """
     filename = os.path.basename(file_path)
-    domain = DOMAIN_PREFIX + filename
-
-    if domain_exists(domain):
-        print(f"Domain {domain} already exists (checked via hsls), skipping upload.")
-        return domain
-
-    print(f"Uploading file {filename} to domain {domain}...")
-    try:
-        result = subprocess.run(
-    [
-        HSLOAD_PATH,
-        "-e", GLOBAL_ENDPOINT,
-        "-u", ADMIN_USERNAME,
-        "-p", ADMIN_PASSWORD,
-        file_path,
-        domain
-    ],            capture_output=True, text=True, check=True
-        )
-        print(f"File {filename} has been successfully uploaded.")
-        print(f"hsload stdout: {result.stdout}")
-    except subprocess.CalledProcessError as err:
-        error_message = err.stderr or err.stdout
-        print(f"hsload stderr: {err.stderr}")
-        print(f"hsload stdout: {err.stdout}")
-        print(f"Upload failed with return code {err.returncode}")
-        
-        if "Unable to synchronously open file" in error_message:
-            print("Detected error on file consistency, trying to reset the flag...")
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            h5clear_path = os.path.join(script_dir, "bin", "h5clear.exe")
-            clear_cmd = [h5clear_path, "-s", file_path]
-            subprocess.run(clear_cmd, capture_output=True, text=True)
-            result = subprocess.run(
-    [
-        HSLOAD_PATH,
-        "-e", GLOBAL_ENDPOINT,
-        "-u", ADMIN_USERNAME,
-        "-p", ADMIN_PASSWORD,
-        file_path,
-        domain
-    ],                capture_output=True, text=True, check=True
-            )
-            print(f"File {filename} has been successfully uploaded.")
-        else:
-            raise
-    return domain
-
-def is_file_stable(file_path, debounce_interval=1): # 1s debounce interval
-
+    domain = get_domain_name(file_path)
+    claim_domain(file_path, domain)
     try:
-        initial_size = os.path.getsize(file_path)
-        initial_mtime = os.path.getmtime(file_path)
-    except Exception as e:
-        print(f"Error accessing {file_path}: {e}")
-        return False
-
-    time.sleep(debounce_interval)
-
+        return _upload_file(file_path, filename, domain)
+    finally:
+        release_domain(domain)
+
+def _upload_file(file_path, filename, domain):
+    file_uri = get_link_uri(file_path)
+
+    size, mtime, content_hash = file_signature(file_path)
+    entry = journal.get(file_path)
+    if entry and entry["status"] == "completed" and entry["domain"] == domain and entry["size"] == size:
+        if entry["mtime"] == mtime or entry["content_hash"] == content_hash:
+            journal.record(file_path, domain, "completed", size, mtime, content_hash)
+            print(f"Domain {domain} is up to date, skipping upload.")
+            return "skipped"
+
+    last_modified = get_domain_last_modified(domain)
+    if entry and entry["status"] != "completed":
+        upload_metrics.record_retry()
+        if last_modified is not None:
+            print(f"Previous upload of {filename} did not complete, removing domain {domain}...")
+            loader.delete_domain(domain)
+            last_modified = None
+
+    journal.record(file_path, domain, "uploading", size, mtime, content_hash)
     try:
-        new_size = os.path.getsize(file_path)
-        new_mtime = os.path.getmtime(file_path)
-    except Exception as e:
-        print(f"Error accessing {file_path} after waiting: {e}")
-        return False
-
-    if initial_size == new_size and initial_mtime == new_mtime:
-        return True
+        if last_modified is not None:
+            if entry is None and mtime <= last_modified:
+                # 在使用 journal 之前已上传过
+                status = "skipped"
+            else:
+                print(f"Updating domain {domain} with new data from {filename}...")
+                status = "updated" if loader.update(file_path, domain, file_uri=file_uri) else "skipped"
+        else:
+            if file_uri:
+                print(f"Linking file {filename} to domain {domain} via {file_uri}...")
+            else:
+                print(f"Uploading file {filename} to domain {domain}...")
+            loader.load(file_path, domain, file_uri=file_uri)
+            status = "completed"
+    except Exception:
+        journal.record(file_path, domain, "failed")
+        raise
+    journal.record(file_path, domain, "completed")
+
+    if status == "skipped":
+        print(f"Domain {domain} is up to date, skipping upload.")
     else:
-        return False
-
-def scan_and_upload_all(dirs, debounce_interval=1):
+        print(f"File {filename} has been successfully {'updated' if status == 'updated' else 'uploaded'}.")
+    return status
+
+def snapshot_strc_files(dirs, recursive=False):
+    """用 os.scandir 一次列出所有 .strc 文件，返回 {file_path: (size, mtime)}"""
+    snapshot = {}
+    pending = list(dirs)
+    while pending:
+        path = pending.pop()
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                pending.append(entry.path)
+                        elif entry.name.lower().endswith('.strc'):
+                            stat = entry.stat()
+                            snapshot[entry.path] = (stat.st_size, stat.st_mtime)
+                    except OSError as e:
+                        print(f"Error accessing {entry.path}: {e}")
+        except OSError as e:
+            print(f"Error scanning directory {path}: {e}")
+    return snapshot
+
+def scan_and_upload_all(dirs, debounce_interval=1, recursive=False):
+    """
+    启动时扫描所有目录：journal 中已上传且未修改的文件直接跳过，
+    其余文件统一等待一次 debounce_interval 后再次快照，大小和修改时间未变的文件加入上传队列。
+    返回仍在写入的文件列表。
+    """
+    existing = []
     for path in dirs:
-        if not os.path.exists(path):
+        if os.path.exists(path):
+            existing.append(path)
+        else:
             print(f"Directory {path} does not exist, skipping...")
-            continue
-        for file in os.listdir(path):
-            if file.lower().endswith('.strc'):
-                file_path = os.path.join(path, file)
-                print(f"Found file {file_path}, checking stability...")
-                if is_file_stable(file_path, debounce_interval):
-                    print(f"File {file_path} is stable, adding to upload queue...")
-                    upload_queue.put(file_path)
-                else:
-                    print(f"File {file_path} is not stable yet, skipping for now.")
+
+    before = snapshot_strc_files(existing, recursive)
+    completed = journal.completed()
+    candidates = {path: sig for path, sig in before.items() if completed.get(path) != sig}
+    print(f"Found {len(before)} files, {len(before) - len(candidates)} already uploaded according to the journal.")
+    if not candidates:
+        return []
+
+    time.sleep(debounce_interval)
+    after = snapshot_strc_files(existing, recursive)
+    unstable = []
+    queued = 0
+    for path, sig in candidates.items():
+        if after.get(path) == sig:
+            upload_queue.put(path)
+            queued += 1
+        elif path in after:
+            unstable.append(path)
+    print(f"Queued {queued} stable files for upload, {len(unstable)} still being written.")
+    return unstable
 
 def main():
     print("Starting Watchdog Service for HSDS file upload...")
-    scan_and_upload_all(WATCHDOG_DIRS)
-    observers = start_watchdog_for_dirs(WATCHDOG_DIRS, default_upload_callback)
+    if METRICS_PORT:
+        try:
+            start_metrics_server(METRICS_PORT, render_metrics)
+            print(f"Serving upload metrics on http://127.0.0.1:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"ERROR 无法在端口 {METRICS_PORT} 上启动指标服务：{e}")
+    # 先启动监控，扫描期间发生的修改也不会遗漏；扫描时仍在写入的文件交给监控继续等待
+    observers = start_watchdog_for_dirs(WATCHDOG_DIRS, default_upload_callback, recursive=WATCHDOG_RECURSIVE)
+    unstable = scan_and_upload_all(WATCHDOG_DIRS, recursive=WATCHDOG_RECURSIVE)
+    if observers:
+        handler = observers[0][1]
+        for file_path in unstable:
+            handler.schedule(file_path)
     while True:
         time.sleep(10)
 